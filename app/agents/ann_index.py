@@ -0,0 +1,475 @@
+# app/agents/ann_index.py
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .versioned_dir import DATA_KEY, commit_meta, load_versioned, write_arrays
+
+# تحت هذا العدد البحث الكامل (exact) أسرع وأدق من الـ IVF
+DEFAULT_EXACT_THRESHOLD = 20_000
+DEFAULT_N_PROBE = 16
+KMEANS_ITERS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+_BLOCK = 65_536
+_QUERY_BLOCK = 256
+# rows dequantized at a time by the exact quantized scan (float32 copy of one block only)
+_DEQUANT_BLOCK = 8192
+
+# Optional compressed search matrix (ANN_QUANTIZATION=none|float16|int8);
+# the top top_k * ANN_RERANK_FACTOR candidates are re-ranked in float32.
+QUANTIZATIONS = ("none", "float16", "int8")
+DEFAULT_RERANK_FACTOR = 4
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Unit-length float32 rows (zero rows stay zero).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first (argpartition, not a full sort).
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(scores.shape[0])
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Row-wise _top_k for a (queries, candidates) score matrix.
+    """
+    rows, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros((rows, 0), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n), (rows, n))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def exact_search_batch(
+    unit_vectors: np.ndarray, queries: np.ndarray, top_k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brute-force cosine search for many queries: one matmul per block of
+    queries, argpartition per row. Returns (ids, scores), both (queries, k).
+    """
+    q = normalize_rows(np.asarray(queries).reshape(len(queries), -1))
+    k = min(top_k, unit_vectors.shape[0])
+    ids = np.zeros((q.shape[0], max(k, 0)), dtype=np.int64)
+    out = np.zeros((q.shape[0], max(k, 0)), dtype=np.float32)
+
+    # blocks عشان مصفوفة الـ scores ما تكبر مع عدد الأسئلة
+    for start in range(0, q.shape[0], _QUERY_BLOCK):
+        scores = q[start:start + _QUERY_BLOCK] @ unit_vectors.T
+        idx = _top_k_rows(scores, k)
+        ids[start:start + idx.shape[0]] = idx
+        out[start:start + idx.shape[0]] = np.take_along_axis(scores, idx, axis=1)
+
+    return ids, out
+
+
+def exact_search(unit_vectors: np.ndarray, query: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Brute-force cosine search over pre-normalized vectors.
+    """
+    ids, scores = exact_search_batch(unit_vectors, np.asarray(query).reshape(1, -1), top_k)
+    return ids[0], scores[0]
+
+
+def quantize_rows(unit: np.ndarray, mode: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    (codes, scales) for the search matrix:
+    - float16: codes = float16 rows, no scales
+    - int8:    codes = round(row / scale), scale = max|row| / 127 per row
+    - none:    (None, None)
+    """
+    if mode == "float16":
+        return unit.astype(np.float16), None
+
+    if mode == "int8":
+        codes = np.empty(unit.shape, dtype=np.int8)
+        scales = np.empty(unit.shape[0], dtype=np.float32)
+        for start in range(0, unit.shape[0], _BLOCK):
+            block = np.asarray(unit[start:start + _BLOCK], dtype=np.float32)
+            scale = np.abs(block).max(axis=1) / 127.0 if block.size else np.zeros(0)
+            scale[scale == 0] = 1.0
+            codes[start:start + block.shape[0]] = np.clip(
+                np.rint(block / scale[:, None]), -127, 127
+            )
+            scales[start:start + block.shape[0]] = scale
+        return codes, scales
+
+    return None, None
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _BLOCK):
+        block = vectors[start:start + _BLOCK]
+        out[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, rng: np.random.RandomState) -> np.ndarray:
+    n = vectors.shape[0]
+    sample_size = min(n, n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(n, sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERS):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+
+        # cluster فاضي نعطيه نقطة عشوائية
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            sums[empty] = sample[rng.choice(sample_size, empty.size, replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over cosine similarity (pure NumPy).
+
+    - build(): spherical k-means picks `n_lists` centroids; every vector is
+      stored (pre-normalized) in the list of its nearest centroid, lists are
+      laid out contiguously so a probe is one slice + one matmul.
+    - search(): scores the centroids, scans the `n_probe` best lists.
+    - Corpora smaller than `exact_threshold` skip clustering and use an
+      exact scan over the same pre-normalized matrix.
+    """
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: Optional[int] = None,
+        exact_threshold: Optional[int] = None,
+        seed: int = 0,
+        quantization: Optional[str] = None,
+        rerank_factor: Optional[int] = None,
+    ):
+        self.n_lists = n_lists
+        self.n_probe = n_probe or int(os.environ.get("ANN_N_PROBE", DEFAULT_N_PROBE))
+        self.exact_threshold = (
+            exact_threshold
+            if exact_threshold is not None
+            else int(os.environ.get("ANN_EXACT_THRESHOLD", DEFAULT_EXACT_THRESHOLD))
+        )
+        self.seed = seed
+        self.quantization = quantization or os.environ.get("ANN_QUANTIZATION", "none")
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"ANN quantization must be one of {QUANTIZATIONS}")
+        self.rerank_factor = rerank_factor or int(
+            os.environ.get("ANN_RERANK_FACTOR", DEFAULT_RERANK_FACTOR)
+        )
+
+        self.vectors = np.zeros((0, 1), dtype=np.float32)  # sorted by list
+        self.ids = np.zeros(0, dtype=np.int64)              # row in vectors -> original id
+        self.centroids = np.zeros((0, 1), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)          # list l = rows offsets[l]:offsets[l+1]
+        self.codes: Optional[np.ndarray] = None              # quantized vectors (same row order)
+        self.scales: Optional[np.ndarray] = None             # int8 only: per-row scale
+        self.meta: Dict[str, Any] = {}
+
+    # ---------- build ----------
+
+    @property
+    def size(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @property
+    def is_exact(self) -> bool:
+        return self.centroids.shape[0] == 0
+
+    def build(self, vectors: np.ndarray) -> "IVFIndex":
+        unit = normalize_rows(vectors)
+        n = unit.shape[0]
+
+        if n < max(self.exact_threshold, 1):
+            self.vectors = unit
+            self.ids = np.arange(n, dtype=np.int64)
+            self.centroids = np.zeros((0, unit.shape[1] if unit.ndim == 2 else 1), dtype=np.float32)
+            self.offsets = np.array([0, n], dtype=np.int64)
+            self.codes, self.scales = quantize_rows(self.vectors, self.quantization)
+            return self
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        rng = np.random.RandomState(self.seed)
+
+        self.centroids = _spherical_kmeans(unit, n_lists, rng)
+        assign = _assign(unit, self.centroids)
+        order = np.argsort(assign, kind="stable")
+
+        self.vectors = np.ascontiguousarray(unit[order])
+        self.ids = order.astype(np.int64)
+        counts = np.bincount(assign, minlength=n_lists)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.n_lists = n_lists
+        self.codes, self.scales = quantize_rows(self.vectors, self.quantization)
+        return self
+
+    # ---------- quantized scoring ----------
+
+    def _dequantize(self, a: int, b: int) -> np.ndarray:
+        rows = self.codes[a:b].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[a:b, None]
+        return rows
+
+    def _rerank(self, q: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exact float32 scores for candidate rows (only these rows of the
+        float32 matrix are touched), best k first.
+        """
+        rows = np.sort(rows)  # قراءة مرتبة من الـ mmap
+        exact = np.asarray(self.vectors[rows], dtype=np.float32) @ q
+        best = _top_k(exact, k)
+        return self.ids[rows[best]], exact[best]
+
+    # ---------- search ----------
+
+    def search(self, query: np.ndarray, top_k: int = 3, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, cosine scores) of the approximate top_k neighbours, best first.
+        """
+        ids, scores = self.search_batch(np.asarray(query).reshape(1, -1), top_k, n_probe)
+        return ids[0], scores[0]
+
+    def search_batch(
+        self, queries: np.ndarray, top_k: int = 3, n_probe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        search() for many queries at once; (ids, scores) are (queries, k) arrays
+        with k = min(top_k, size). search() is this with a single row, so both
+        paths return identical results.
+        """
+        queries = np.asarray(queries).reshape(len(queries), -1)
+        k = min(max(top_k, 0), self.size)
+        if k == 0:
+            return (
+                np.zeros((queries.shape[0], 0), dtype=np.int64),
+                np.zeros((queries.shape[0], 0), dtype=np.float32),
+            )
+
+        if self.is_exact and self.codes is None:
+            idx, scores = exact_search_batch(self.vectors, queries, k)
+            return self.ids[idx], scores
+
+        if self.is_exact:
+            return self._search_quantized_exact(normalize_rows(queries), k)
+
+        q = normalize_rows(queries)
+        n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+        probes = _top_k_rows(q @ self.centroids.T, n_probe)
+
+        ids = np.zeros((q.shape[0], k), dtype=np.int64)
+        out = np.zeros((q.shape[0], k), dtype=np.float32)
+        for row, lists in enumerate(probes):
+            ids[row], out[row] = self._scan(q[row], lists, k)
+        return ids, out
+
+    def _search_quantized_exact(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        n_cand = min(k * self.rerank_factor, self.size)
+
+        ids = np.zeros((q.shape[0], k), dtype=np.int64)
+        out = np.zeros((q.shape[0], k), dtype=np.float32)
+        for start in range(0, q.shape[0], _QUERY_BLOCK):
+            block = q[start:start + _QUERY_BLOCK]
+            cand = self._quantized_candidates(block, n_cand)
+            for i, rows in enumerate(cand):
+                ids[start + i], out[start + i] = self._rerank(block[i], rows, k)
+        return ids, out
+
+    def _quantized_candidates(self, q: np.ndarray, n_cand: int) -> np.ndarray:
+        """
+        Rows of the n_cand best quantized scores per query, scanning the codes
+        in blocks of _DEQUANT_BLOCK rows: only one block is ever held as float32.
+        """
+        best_rows = np.zeros((q.shape[0], 0), dtype=np.int64)
+        best_scores = np.zeros((q.shape[0], 0), dtype=np.float32)
+        for a in range(0, self.size, _DEQUANT_BLOCK):
+            b = min(a + _DEQUANT_BLOCK, self.size)
+            scores = q @ self._dequantize(a, b).T
+            top = _top_k_rows(scores, n_cand)
+
+            # ندمج أفضل مرشحين الـ block مع اللي قبله ونبقي n_cand
+            rows = np.concatenate([best_rows, top + a], axis=1)
+            merged = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            keep = _top_k_rows(merged, n_cand)
+            best_rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores = np.take_along_axis(merged, keep, axis=1)
+        return best_rows
+
+    def _scan(self, q: np.ndarray, lists: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        spans = [(int(self.offsets[l]), int(self.offsets[l + 1])) for l in lists]
+
+        # لو الـ lists المختارة صغيرة ما تكفي top_k نرجع للـ exact
+        if sum(b - a for a, b in spans) < k:
+            idx, scores = exact_search(self.vectors, q, k)
+            return self.ids[idx], scores
+
+        # كل list متجاورة في الذاكرة: slice + matmul بدون نسخ
+        rows = np.concatenate([np.arange(a, b) for a, b in spans])
+
+        if self.codes is None:
+            scores = np.concatenate([self.vectors[a:b] @ q for a, b in spans])
+            best = _top_k(scores, k)
+            return self.ids[rows[best]], scores[best]
+
+        scores = np.concatenate([self._dequantize(a, b) @ q for a, b in spans])
+        cand = _top_k(scores, k * self.rerank_factor)
+        return self._rerank(q, rows[cand], k)
+
+    # ---------- persistence ----------
+
+    def save(self, folder: str, fingerprint: str = ""):
+        """
+        Save as separate .npy files (so load() can memory-map them) in a new
+        version folder, then swap meta.json to name it (one atomic step).
+        """
+        os.makedirs(folder, exist_ok=True)
+        names = ["vectors", "ids", "centroids", "offsets"]
+        if self.codes is not None:
+            names.append("codes")
+        if self.scales is not None:
+            names.append("scales")
+
+        version = write_arrays(folder, {name: getattr(self, name) for name in names})
+        self.meta = commit_meta(
+            folder,
+            {
+                **{k: v for k, v in self.meta.items() if k != DATA_KEY},
+                "fingerprint": fingerprint,
+                "size": self.size,
+                "n_lists": int(self.centroids.shape[0]),
+                "n_probe": self.n_probe,
+                "quantization": self.quantization,
+            },
+            version,
+        )
+
+    @classmethod
+    def load(cls, folder: str) -> "IVFIndex":
+        return load_versioned(folder, cls._load_files)
+
+    @classmethod
+    def _load_files(cls, meta: Dict[str, Any], path: str) -> "IVFIndex":
+        quantization = meta.get("quantization", "none")
+        index = cls(n_lists=meta.get("n_lists") or None, quantization=quantization)
+        # float32 rows stay on disk (mmap); with quantization only the
+        # re-ranked candidates are ever paged in
+        index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        index.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        index.centroids = np.load(os.path.join(path, "centroids.npy"))
+        index.offsets = np.load(os.path.join(path, "offsets.npy"))
+        if quantization != "none":
+            index.codes = np.load(os.path.join(path, "codes.npy"))
+        if quantization == "int8":
+            index.scales = np.load(os.path.join(path, "scales.npy"))
+        index.meta = meta
+        return index
+
+    def memory_bytes(self) -> int:
+        """
+        Size of the matrix every query scans (the quantized codes when enabled).
+        """
+        if self.codes is None:
+            return int(self.vectors.nbytes)
+        extra = self.scales.nbytes if self.scales is not None else 0
+        return int(self.codes.nbytes + extra)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "mode": "exact" if self.is_exact else "ivf",
+            "n_lists": int(self.centroids.shape[0]),
+            "n_probe": self.n_probe,
+            "quantization": self.quantization,
+            "search_matrix_bytes": self.memory_bytes(),
+            **{k: v for k, v in self.meta.items() if k.startswith("recall")},
+        }
+
+
+def recall_at_k(index: IVFIndex, unit_vectors: np.ndarray, queries: np.ndarray, k: int = 10) -> float:
+    """
+    Mean fraction of the exact top-k that the index returns.
+    `unit_vectors` are the pre-normalized vectors in original id order.
+    """
+    if queries.shape[0] == 0:
+        return 1.0
+
+    hits = 0
+    for q in queries:
+        exact_ids, _ = exact_search(unit_vectors, q, k)
+        approx_ids, _ = index.search(q, k)
+        hits += len(np.intersect1d(exact_ids, approx_ids))
+    return hits / float(queries.shape[0] * min(k, unit_vectors.shape[0]))
+
+
+def load_or_build(
+    vectors: np.ndarray,
+    folder: str,
+    fingerprint: str,
+    recall_queries: int = 100,
+) -> IVFIndex:
+    """
+    Load the saved index if its fingerprint matches `vectors`,
+    otherwise build it, measure recall@10 on a sample, and save it.
+    """
+    meta_path = os.path.join(folder, "meta.json")
+    if os.path.exists(meta_path):
+        try:
+            index = IVFIndex.load(folder)
+            if (
+                index.meta.get("fingerprint") == fingerprint
+                and index.size == len(vectors)
+                and index.quantization == os.environ.get("ANN_QUANTIZATION", "none")
+            ):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = IVFIndex().build(vectors)
+
+    if not index.is_exact and recall_queries:
+        rng = np.random.RandomState(0)
+        unit = normalize_rows(vectors)
+        sample = unit[rng.choice(len(unit), min(recall_queries, len(unit)), replace=False)]
+        noisy = sample + rng.normal(scale=0.05, size=sample.shape).astype(np.float32)
+        index.meta["recall_at_10"] = round(recall_at_k(index, unit, noisy, k=10), 4)
+
+    try:
+        index.save(folder, fingerprint)
+    except OSError as e:
+        print("WARNING: could not save ANN index:", e)
+        return index
+
+    # نرجع النسخة المحفوظة (mmap) عشان الـ float32 ما يبقى كامل في الذاكرة
+    return IVFIndex.load(folder)
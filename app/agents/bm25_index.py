@@ -0,0 +1,249 @@
+# app/agents/bm25_index.py
+
+import os
+import string
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .versioned_dir import commit_meta, load_versioned, write_arrays
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+
+# أقصى عدد postings نقرأه لكل term (الـ postings مرتبة حسب الوزن)
+DEFAULT_MAX_POSTINGS = 2048
+
+# ==========================
+# Tokenization
+# ==========================
+# نفس خطوات f1_data_pipeline.preprocess_text (lowercase → حذف الترقيم →
+# tokens → حذف stopwords → stem) بدون nltk، عشان السيرفر ما يحتاج
+# الـ corpora ونفس الكلمة تعطي نفس الـ token في كل worker.
+
+_PUNCT_TABLE = str.maketrans("", "", string.punctuation)
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can could did do does doing
+    down during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more most
+    my myself no nor not now of off on once only or other our ours ourselves
+    out over own same she should so some such than that the their theirs them
+    themselves then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would
+    you your yours yourself yourselves
+    """.split()
+)
+
+
+def clean_text(text: str) -> str:
+    """Lowercase + remove punctuation (same as f1_data_pipeline.clean_text)."""
+    return text.lower().translate(_PUNCT_TABLE)
+
+
+def light_stem(token: str) -> str:
+    """
+    Small suffix stripper: tyres → tyre, pitted → pit, braking → brak.
+    Numbers and short tokens are kept as-is (lap numbers, car numbers).
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+
+    stripped = False
+    if token.endswith("ies") and len(token) > 4:
+        return token[:-3] + "y"
+    if token.endswith("sses"):
+        return token[:-2]
+    if token.endswith("ing") and len(token) > 5:
+        token, stripped = token[:-3], True
+    elif token.endswith("ed") and len(token) > 4:
+        token, stripped = token[:-2], True
+    elif token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+
+    # pitted → pitt → pit
+    if stripped and len(token) > 2 and token[-1] == token[-2] and token[-1] not in "lsz":
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [light_stem(t) for t in clean_text(text).split() if t not in STOPWORDS]
+
+
+# ==========================
+# Inverted index
+# ==========================
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index stored as CSR arrays:
+
+    - vocab:    term → term id
+    - indptr:   postings of term t are rows indptr[t]:indptr[t+1]
+    - doc_ids:  int32 doc id per posting
+    - impacts:  float32 BM25 weight per posting (idf and length norm folded in
+                at build time, so a query is gather + bincount, no float math
+                per document)
+
+    Each posting list is impact-ordered (highest weight first), so a query
+    reads at most `max_postings` entries per term. Rare terms (names, lap
+    numbers) are always scored exactly; only very common, low-idf terms are
+    cut short, which keeps queries sub-millisecond at 1M passages.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.impacts = np.zeros(0, dtype=np.float32)
+        self.n_docs = 0
+        self.meta: Dict[str, Any] = {}
+
+    def build(self, texts: List[str]) -> "BM25Index":
+        vocab: Dict[str, int] = {}
+        term_col = array("q")  # array بدل list: 8 bytes لكل posting
+        doc_col = array("q")
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc] = len(tokens)
+            for tok in tokens:
+                term_col.append(vocab.setdefault(tok, len(vocab)))
+            doc_col.extend([doc] * len(tokens))
+
+        self.vocab = vocab
+        self.n_docs = len(texts)
+        n_terms = len(vocab)
+
+        terms = np.frombuffer(term_col, dtype=np.int64)
+        docs = np.frombuffer(doc_col, dtype=np.int64)
+
+        # (term, doc) pairs → term frequency
+        pair = terms * max(self.n_docs, 1) + docs
+        pair, tf = np.unique(pair, return_counts=True)
+        terms = pair // max(self.n_docs, 1)
+        docs = pair % max(self.n_docs, 1)
+
+        df = np.bincount(terms, minlength=n_terms).astype(np.float32)
+        idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len[docs] / max(avgdl, 1e-9))
+        tf = tf.astype(np.float32)
+
+        impacts = (idf[terms] * tf * (self.k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+        # داخل كل term: الأعلى وزناً أول
+        order = np.lexsort((docs, -impacts, terms))
+        self.impacts = impacts[order]
+        self.doc_ids = docs[order].astype(np.int32)
+        self.indptr = np.concatenate(([0], np.cumsum(df.astype(np.int64)))).astype(np.int64)
+        return self
+
+    def search(
+        self, query: str, top_k: int = 10, max_postings: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (doc ids, BM25 scores) of the best top_k documents sharing a term with the query.
+        """
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or top_k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        limit = max_postings or int(os.environ.get("BM25_MAX_POSTINGS", DEFAULT_MAX_POSTINGS))
+        limit = max(limit, top_k)
+        spans = [
+            (int(self.indptr[t]), int(min(self.indptr[t + 1], self.indptr[t] + limit)))
+            for t in term_ids
+        ]
+        docs = np.concatenate([self.doc_ids[a:b] for a, b in spans])
+        weights = np.concatenate([self.impacts[a:b] for a, b in spans])
+
+        if len(spans) == 1:
+            cand, scores = docs.astype(np.int64), weights
+        else:
+            cand, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=weights).astype(np.float32)
+
+        k = min(top_k, scores.shape[0])
+        part = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(k)
+        best = part[np.argsort(-scores[part], kind="stable")]
+        return cand[best].astype(np.int64), scores[best]
+
+    # ---------- persistence ----------
+
+    def save(self, folder: str, fingerprint: str = ""):
+        """
+        The CSR arrays go to a new version folder and meta.json (swapped
+        last) names it, so indptr / doc_ids / impacts always come from one build.
+        """
+        os.makedirs(folder, exist_ok=True)
+        version = write_arrays(
+            folder, {name: getattr(self, name) for name in ("indptr", "doc_ids", "impacts")}
+        )
+        self.meta = commit_meta(
+            folder,
+            {
+                "fingerprint": fingerprint,
+                "n_docs": self.n_docs,
+                "k1": self.k1,
+                "b": self.b,
+                "vocab": self.vocab,
+            },
+            version,
+        )
+
+    @classmethod
+    def load(cls, folder: str) -> "BM25Index":
+        return load_versioned(folder, cls._load_files)
+
+    @classmethod
+    def _load_files(cls, meta: Dict[str, Any], path: str) -> "BM25Index":
+        index = cls(k1=meta["k1"], b=meta["b"])
+        index.vocab = meta["vocab"]
+        index.n_docs = meta["n_docs"]
+        index.indptr = np.load(os.path.join(path, "indptr.npy"))
+        index.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        index.impacts = np.load(os.path.join(path, "impacts.npy"), mmap_mode="r")
+        index.meta = meta
+        return index
+
+
+def load_or_build(texts: List[str], folder: str, fingerprint: str) -> BM25Index:
+    """
+    Load the saved BM25 index if it matches `fingerprint`, else build and save it.
+    """
+    if os.path.exists(os.path.join(folder, "meta.json")):
+        try:
+            index = BM25Index.load(folder)
+            if index.meta.get("fingerprint") == fingerprint:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = BM25Index().build(texts)
+    try:
+        index.save(folder, fingerprint)
+    except OSError as e:
+        print("WARNING: could not save BM25 index:", e)
+    return index
+
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int = RRF_K) -> Dict[int, float]:
+    """
+    RRF: score(d) = Σ 1 / (k + rank_i(d)), rank starting at 1.
+    Returns {doc id: fused score}.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking.tolist(), start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    return fused
@@ -0,0 +1,187 @@
+# app/agents/circuit_breaker.py
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the LLM while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed → Open → Half-open breaker for the LLM dependency.
+
+    - closed:    calls go through; outcomes are kept for `window` seconds.
+                 Once there are at least `min_requests` outcomes and the error
+                 rate (or the rate of calls slower than `slow_seconds`) reaches
+                 its threshold, the breaker opens.
+    - open:      calls fail fast (CircuitOpenError) for `open_seconds`.
+    - half_open: up to `half_open_max_calls` probe calls are let through;
+                 a successful probe closes the breaker, a failed one re-opens it.
+    """
+
+    def __init__(
+        self,
+        window: float = 30.0,
+        min_requests: int = 5,
+        error_rate: float = 0.5,
+        slow_seconds: float = 10.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 15.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (timestamp, ok, slow)
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            window=float(os.environ.get("LLM_BREAKER_WINDOW", 30.0)),
+            min_requests=int(os.environ.get("LLM_BREAKER_MIN_REQUESTS", 5)),
+            error_rate=float(os.environ.get("LLM_BREAKER_ERROR_RATE", 0.5)),
+            slow_seconds=float(os.environ.get("LLM_BREAKER_SLOW_SECONDS", 10.0)),
+            slow_rate=float(os.environ.get("LLM_BREAKER_SLOW_RATE", 0.8)),
+            open_seconds=float(os.environ.get("LLM_BREAKER_OPEN_SECONDS", 15.0)),
+        )
+
+    # ---------- state ----------
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._probes = 0
+        self._outcomes.clear()
+
+    # ---------- calls ----------
+
+    def allow_request(self) -> bool:
+        """
+        True if a call may go upstream now. Cheap enough to call on every request.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+
+            if self._state == CLOSED:
+                return True
+
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """
+        allow_request() that raises CircuitOpenError when the call is not allowed.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError("LLM circuit is open")
+
+    def record_success(self, latency: float = 0.0):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._close()
+                return
+            self._record(now, ok=True, latency=latency)
+
+    def record_failure(self, latency: float = 0.0):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._record(now, ok=False, latency=latency)
+
+    def release(self):
+        """
+        Give back a call allowed by allow_request() that ended with no outcome
+        (e.g. the client went away mid-stream), so a half-open probe slot is freed.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _record(self, now: float, ok: bool, latency: float):
+        if self._state != CLOSED:
+            return
+
+        self._outcomes.append((now, ok, latency >= self.slow_seconds))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+        total = len(self._outcomes)
+        if total < self.min_requests:
+            return
+
+        errors = sum(1 for _, good, _ in self._outcomes if not good)
+        slow = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        if errors / total >= self.error_rate or slow / total >= self.slow_rate:
+            self._open(now)
+
+    def reset(self):
+        with self._lock:
+            self._close()
+            self.rejected = 0
+            self.times_opened = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            total = len(self._outcomes)
+            errors = sum(1 for _, good, _ in self._outcomes if not good)
+            return {
+                "state": self._state,
+                "window_requests": total,
+                "window_error_rate": (errors / total) if total else 0.0,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in_seconds": (
+                    round(max(0.0, self.open_seconds - (now - self._opened_at)), 3)
+                    if self._state == OPEN
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,162 @@
+# app/agents/embedding_store.py
+
+import hashlib
+import json
+import os
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBED_DIM = 64
+
+
+def content_hash(text: str) -> str:
+    """
+    Stable hash of a passage text (same value in every process,
+    unlike Python's randomized hash()).
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def corpus_fingerprint(texts: List[str]) -> str:
+    """
+    One hash for the whole ordered corpus (used to tell if a saved index is stale).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for text in texts:
+        h.update(content_hash(text).encode("ascii"))
+    return h.hexdigest()
+
+
+def stable_seed(text: str) -> int:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _index_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def _read_index(index_path: str) -> Optional[dict]:
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _matrix_path(path: str, index: dict) -> str:
+    # stores written before versioned matrices keep the matrix at `path`
+    name = index.get("matrix")
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name) if name else path
+
+
+def load_store(path: str, dim: int = EMBED_DIM) -> Tuple[List[str], Optional[np.ndarray]]:
+    """
+    Open a saved store read-only.
+    The matrix is memory-mapped, so every worker shares the same pages.
+    Returns ([], None) if the store is missing or does not match its index.
+    """
+    index_path = _index_path(path)
+
+    # محاولتين: لو save_store بدّل الـ index وحذف الـ matrix القديمة بين القراءتين
+    for _ in range(2):
+        index = _read_index(index_path)
+        if index is None:
+            return [], None
+        try:
+            matrix = np.load(_matrix_path(path, index), mmap_mode="r")
+            break
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError):
+            return [], None
+    else:
+        return [], None
+
+    hashes = index.get("hashes", [])
+    if (
+        index.get("dim") != dim
+        or matrix.dtype != np.float32
+        or matrix.shape != (len(hashes), dim)
+    ):
+        return [], None
+
+    return hashes, matrix
+
+
+def save_store(path: str, hashes: List[str], matrix: np.ndarray):
+    """
+    Write the matrix to a new versioned file (<name>.<version>.npy) and
+    then replace the hash index (.json) that names it. Replacing the index
+    is the only swap, so readers see either the old pair or the new one.
+    The previous matrix file is removed afterwards (workers that mapped it
+    keep their pages).
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    index_path = _index_path(path)
+    old = _read_index(index_path)
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}.{uuid.uuid4().hex[:12]}.npy"
+    tmp = os.path.join(folder, f"{name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+    os.replace(tmp, os.path.join(folder, name))
+
+    tmp = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"dim": int(matrix.shape[1]), "matrix": name, "hashes": list(hashes)}, f)
+    os.replace(tmp, index_path)
+
+    if old is not None:
+        try:
+            os.remove(_matrix_path(path, old))
+        except OSError:
+            # Windows: ملف mapped ما ينحذف، يبقى على الديسك بدون ما ينقرا
+            pass
+
+
+def sync_embeddings(
+    texts: List[str],
+    embed_fn: Callable[[List[str]], np.ndarray],
+    path: str,
+    dim: int = EMBED_DIM,
+) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Return a (len(texts), dim) float32 matrix for `texts`, backed by the
+    store at `path`. Only passages whose content hash is not in the store
+    are embedded; the store is rewritten only when something changed.
+
+    If the store cannot be written (read-only disk) the fresh matrix is
+    returned in memory.
+    """
+    hashes = [content_hash(t) for t in texts]
+    saved_hashes, saved = load_store(path, dim)
+
+    if saved is not None and saved_hashes == hashes:
+        return saved, {"reused": len(hashes), "embedded": 0}
+
+    row_of = {h: i for i, h in enumerate(saved_hashes)}
+    src = np.array([row_of.get(h, -1) for h in hashes], dtype=np.int64)
+    have = src >= 0
+    missing = np.flatnonzero(~have).tolist()
+
+    matrix = np.empty((len(texts), dim), dtype=np.float32)
+    if have.any():
+        matrix[have] = saved[src[have]]
+    if missing:
+        matrix[missing] = embed_fn([texts[i] for i in missing])
+
+    stats = {"reused": len(hashes) - len(missing), "embedded": len(missing)}
+
+    try:
+        save_store(path, hashes, matrix)
+    except OSError as e:
+        print("WARNING: could not save passage embeddings:", e)
+        return matrix, stats
+
+    _, mapped = load_store(path, dim)
+    return (mapped if mapped is not None else matrix), stats
@@ -0,0 +1,108 @@
+# app/agents/latency.py
+
+import bisect
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# حدود الـ buckets بالثواني (log-spaced من 1ms لين ~2 دقيقة)
+_BUCKET_GROWTH = 1.25
+_BUCKET_MIN = 0.001
+_BUCKET_MAX = 120.0
+
+
+def _bucket_bounds() -> List[float]:
+    bounds = []
+    edge = _BUCKET_MIN
+    while edge < _BUCKET_MAX:
+        bounds.append(round(edge, 6))
+        edge *= _BUCKET_GROWTH
+    bounds.append(_BUCKET_MAX)
+    return bounds
+
+
+BUCKET_BOUNDS = _bucket_bounds()
+
+
+class LatencyHistogram:
+    """
+    Thread-safe latency recorder.
+
+    - buckets: cumulative log-spaced histogram since the last reset
+               (what /api/llm/stats reports, p50/p95/p99 included)
+    - recent:  the last `window` samples, used for "running" percentiles
+               (hedge delay, adaptive timeouts) so they follow drift.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._recent: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        seconds = max(0.0, float(seconds))
+        idx = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self._counts[idx] += 1
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def running_percentile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """
+        q-th percentile (0-100) of the recent samples,
+        or None while fewer than min_samples have been recorded.
+        """
+        with self._lock:
+            if len(self._recent) < max(1, min_samples):
+                return None
+            samples = sorted(self._recent)
+        idx = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+    def percentile(self, q: float) -> float:
+        """
+        q-th percentile (0-100) from the cumulative buckets (bucket upper bound).
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = q / 100.0 * self.count
+            seen = 0
+            for idx, n in enumerate(self._counts):
+                seen += n
+                if n and seen >= target:
+                    if idx >= len(BUCKET_BOUNDS):
+                        return self.max
+                    return min(BUCKET_BOUNDS[idx], self.max)
+            return self.max
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+            self._recent.clear()
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95, p99 = self.percentile(50), self.percentile(95), self.percentile(99)
+        with self._lock:
+            buckets = {
+                (f"le_{BUCKET_BOUNDS[i]}" if i < len(BUCKET_BOUNDS) else "inf"): n
+                for i, n in enumerate(self._counts)
+                if n
+            }
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 6) if self.count else 0.0,
+                "max": round(self.max, 6),
+                "p50": round(p50, 6),
+                "p95": round(p95, 6),
+                "p99": round(p99, 6),
+                "buckets": buckets,
+            }
@@ -0,0 +1,368 @@
+# app/agents/llm_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_ENTRIES = 1024
+
+FALLBACK_PREFIX = "[Local fallback answer]"
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    """
+    Stable hash of everything that changes the completion.
+    Whitespace is normalized so "what is DRS " and "what is DRS" share a key.
+    """
+    normalized = {
+        "model": model,
+        "system": " ".join((system_prompt or "").split()),
+        "prompt": " ".join((prompt or "").split()),
+        "max_tokens": int(max_tokens),
+        "temperature": round(float(temperature), 4),
+    }
+    raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemoryCache:
+    """
+    In-process LRU + TTL tier (OrderedDict: oldest entry first).
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = _Counters()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """(value, expires_at) for a live key, else None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.counters.misses += 1
+                return None
+
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._data[key]
+                self.counters.expirations += 1
+                self.counters.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.counters.hits += 1
+            return item
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        # expires_at: عند الـ back-fill من tier أبطأ نحتفظ بانتهاء الصلاحية الأصلي
+        expires = time.time() + self.ttl
+        if expires_at is not None:
+            expires = min(expires, expires_at)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.counters.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._data), **self.counters.as_dict()}
+
+
+class SQLiteCache:
+    """
+    On-disk tier that survives restarts (and is shared by workers on one host).
+    """
+
+    name = "sqlite"
+    blocking = True  # disk I/O: run through asyncio.to_thread from async code
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.counters = _Counters()
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[str, float]]:
+        """(value, expires_at) for a live key, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.counters.misses += 1
+                return None
+
+            value, expires_at = row
+            if expires_at < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.counters.expirations += 1
+                self.counters.misses += 1
+                return None
+
+            self.counters.hits += 1
+            return value, expires_at
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        expires = time.time() + self.ttl
+        if expires_at is not None:
+            expires = min(expires, expires_at)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"size": size, "path": self.path, **self.counters.as_dict()}
+
+
+def _get_entry(tier: Any, key: str) -> Optional[Tuple[str, Optional[float]]]:
+    get_entry = getattr(tier, "get_entry", None)
+    if get_entry is not None:
+        return get_entry(key)
+    value = tier.get(key)
+    return (value, None) if value is not None else None
+
+
+def _set_entry(tier: Any, key: str, value: str, expires_at: Optional[float]):
+    if expires_at is None:
+        tier.set(key, value)
+    else:
+        tier.set(key, value, expires_at=expires_at)
+
+
+def _is_blocking(tier: Any) -> bool:
+    # tiers اللي ما تحدد نعتبرها blocking (أأمن للـ event loop)
+    return getattr(tier, "blocking", True)
+
+
+class LLMResponseCache:
+    """
+    Tiered cache: checks each backend in order (memory first) and
+    back-fills the faster tiers on a hit from a slower one, keeping the
+    expiry stored there (the TTL is not restarted).
+    Any object with get/set/clear/stats can be plugged in as a tier;
+    get_entry(key) -> (value, expires_at) and set(..., expires_at=) are
+    used when the tier has them.
+
+    aget/aset are for async code: tiers with blocking = True (SQLite, and
+    any tier that does not say) run in asyncio.to_thread so disk I/O never
+    stalls the event loop.
+    """
+
+    def __init__(self, tiers: List[Any]):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        for i, tier in enumerate(self.tiers):
+            entry = _get_entry(tier, key)
+            if entry is not None:
+                value, expires_at = entry
+                for faster in self.tiers[:i]:
+                    _set_entry(faster, key, value, expires_at)
+                return self._count_hit(value)
+
+        return self._count_miss()
+
+    async def aget(self, key: str) -> Optional[str]:
+        for i, tier in enumerate(self.tiers):
+            if _is_blocking(tier):
+                entry = await asyncio.to_thread(_get_entry, tier, key)
+            else:
+                entry = _get_entry(tier, key)
+            if entry is not None:
+                value, expires_at = entry
+                for faster in self.tiers[:i]:
+                    if _is_blocking(faster):
+                        await asyncio.to_thread(_set_entry, faster, key, value, expires_at)
+                    else:
+                        _set_entry(faster, key, value, expires_at)
+                return self._count_hit(value)
+
+        return self._count_miss()
+
+    def _count_hit(self, value: str) -> str:
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        # الفالباك المحلي ما ينحفظ أبداً
+        if not _cacheable(value):
+            return
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    async def aset(self, key: str, value: str):
+        if not _cacheable(value):
+            return
+        for tier in self.tiers:
+            if _is_blocking(tier):
+                await asyncio.to_thread(tier.set, key, value)
+            else:
+                tier.set(key, value)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            out: Dict[str, Any] = {
+                "enabled": True,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+        out["tiers"] = {tier.name: tier.stats() for tier in self.tiers}
+        return out
+
+
+def _cacheable(value: Any) -> bool:
+    return isinstance(value, str) and not value.startswith(FALLBACK_PREFIX)
+
+
+# ==========================
+# Process-wide cache
+# ==========================
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMResponseCache]:
+    """
+    Build the cache from env on first use:
+      LLM_CACHE_ENABLED      (default 1)
+      LLM_CACHE_TTL          seconds (default 3600)
+      LLM_CACHE_MAX_ENTRIES  memory tier size (default 1024)
+      LLM_CACHE_SQLITE_PATH  enables the on-disk tier when set
+    Returns None when caching is disabled.
+    """
+    global _cache
+
+    if os.environ.get("LLM_CACHE_ENABLED", "1") in ("0", "false", "False"):
+        return None
+
+    if _cache is not None:
+        return _cache
+
+    with _cache_lock:
+        if _cache is None:
+            ttl = float(os.environ.get("LLM_CACHE_TTL", DEFAULT_TTL))
+            max_entries = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            tiers: List[Any] = [MemoryCache(max_entries=max_entries, ttl=ttl)]
+
+            sqlite_path = os.environ.get("LLM_CACHE_SQLITE_PATH")
+            if sqlite_path:
+                tiers.append(SQLiteCache(sqlite_path, ttl=ttl))
+
+            _cache = LLMResponseCache(tiers)
+
+    return _cache
+
+
+def reset_cache():
+    """
+    Drop the process-wide cache (the next call rebuilds it from env).
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is not None:
+            for tier in _cache.tiers:
+                if hasattr(tier, "close"):
+                    tier.close()
+        _cache = None
+
+
+def cache_stats() -> Dict[str, Any]:
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return cache.stats()
@@ -0,0 +1,591 @@
+# app/agents/llm_client.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .latency import LatencyHistogram
+
+# Endpoint + pool settings (كلها تنقرى من البيئة عشان نقدر نغيرها بدون تعديل كود)
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_IN_FLIGHT = 256
+
+# Adaptive read timeout = clamp(p99 * multiplier, min, LLM_READ_TIMEOUT)
+DEFAULT_TIMEOUT_MULTIPLIER = 3.0
+DEFAULT_MIN_READ_TIMEOUT = 5.0
+DEFAULT_LATENCY_MIN_SAMPLES = 20
+
+# Hedging (off by default): second request after the running p95
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_BUDGET = 0.1  # at most 10% of calls send a hedge
+
+# Process-wide session (one per worker process)
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+_pool_size = DEFAULT_POOL_SIZE
+
+
+class _PoolStats:
+    """
+    Counters for the pooled session.
+    new_connections / num_requests come from urllib3 itself,
+    waits are counted when every pool slot is busy.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+
+
+_stats = _PoolStats()
+
+# upstream: one sample per HTTP attempt (drives hedge delay + adaptive timeout)
+# calls:    one sample per post_json_hedged / apost_json_hedged call (what users see)
+upstream_latency = LatencyHistogram()
+call_latency = LatencyHistogram()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default) not in ("0", "false", "False")
+
+
+def get_base_url() -> str:
+    return os.environ.get("OPENAI_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def get_timeouts() -> Tuple[float, float]:
+    """
+    (connect, read) timeouts for requests.
+    Connect is short so a dead endpoint fails fast; read covers slow completions.
+
+    With LLM_ADAPTIVE_TIMEOUT on (default) and enough samples, the read timeout
+    follows the observed upstream p99: p99 * LLM_TIMEOUT_MULTIPLIER, never below
+    LLM_MIN_READ_TIMEOUT and never above LLM_READ_TIMEOUT.
+    """
+    connect = float(os.environ.get("LLM_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT))
+    read = float(os.environ.get("LLM_READ_TIMEOUT", DEFAULT_READ_TIMEOUT))
+
+    if _env_flag("LLM_ADAPTIVE_TIMEOUT", "1"):
+        min_samples = int(
+            os.environ.get("LLM_LATENCY_MIN_SAMPLES", DEFAULT_LATENCY_MIN_SAMPLES)
+        )
+        p99 = upstream_latency.running_percentile(99, min_samples=min_samples)
+        if p99 is not None:
+            multiplier = float(
+                os.environ.get("LLM_TIMEOUT_MULTIPLIER", DEFAULT_TIMEOUT_MULTIPLIER)
+            )
+            floor = float(os.environ.get("LLM_MIN_READ_TIMEOUT", DEFAULT_MIN_READ_TIMEOUT))
+            read = min(read, max(floor, p99 * multiplier))
+
+    return connect, read
+
+
+def get_session() -> requests.Session:
+    """
+    Lazily create the shared keep-alive session.
+    pool_block=True means that at most LLM_POOL_SIZE sockets are ever open
+    per host; extra callers wait for a free connection instead of opening a new one.
+    """
+    global _session, _slots, _pool_size
+
+    if _session is not None:
+        return _session
+
+    with _session_lock:
+        if _session is None:
+            _pool_size = int(os.environ.get("LLM_POOL_SIZE", DEFAULT_POOL_SIZE))
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=_pool_size,
+                pool_block=True,
+                max_retries=0,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _slots = threading.BoundedSemaphore(_pool_size)
+            _session = session
+
+    return _session
+
+
+def reset_session():
+    """
+    Close the shared session (e.g. after changing LLM_POOL_SIZE) and clear stats.
+    """
+    global _session, _slots
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _slots = None
+    _stats.reset()
+    _astats.reset()
+    _hedge.reset()
+    upstream_latency.reset()
+    call_latency.reset()
+
+
+def _urllib3_counters(session: requests.Session) -> Tuple[int, int]:
+    """
+    Sum (num_connections, num_requests) over all urllib3 pools of the session.
+    """
+    new_conns = 0
+    num_requests = 0
+    seen = set()
+
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            new_conns += pool.num_connections
+            num_requests += pool.num_requests
+
+    return new_conns, num_requests
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of the pooled session:
+    - requests / new_connections / reused_connections / reuse_rate
+    - waits: how many calls had to wait for a free connection (and for how long)
+    """
+    new_conns, num_requests = (0, 0)
+    if _session is not None:
+        new_conns, num_requests = _urllib3_counters(_session)
+
+    reused = max(num_requests - new_conns, 0)
+
+    with _stats.lock:
+        return {
+            "pool_size": _pool_size,
+            "requests": _stats.requests,
+            "errors": _stats.errors,
+            "new_connections": new_conns,
+            "reused_connections": reused,
+            "reuse_rate": (reused / num_requests) if num_requests else 0.0,
+            "waits": _stats.waits,
+            "wait_seconds": round(_stats.wait_seconds, 6),
+            "in_flight": _stats.in_flight,
+            "peak_in_flight": _stats.peak_in_flight,
+        }
+
+
+def post_json(path: str, body: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """
+    POST a JSON body to the LLM endpoint over the pooled session
+    and return the decoded JSON response. Raises on HTTP / network errors.
+    """
+    session = get_session()
+    slots = _slots
+    url = f"{get_base_url()}/{path.lstrip('/')}"
+    headers = _auth_headers(api_key)
+
+    # لو كل الاتصالات مشغولة نحسبها wait
+    if not slots.acquire(blocking=False):
+        t0 = time.perf_counter()
+        slots.acquire()
+        with _stats.lock:
+            _stats.waits += 1
+            _stats.wait_seconds += time.perf_counter() - t0
+
+    with _stats.lock:
+        _stats.requests += 1
+        _stats.in_flight += 1
+        _stats.peak_in_flight = max(_stats.peak_in_flight, _stats.in_flight)
+
+    t0 = time.perf_counter()
+    try:
+        resp = session.post(url, headers=headers, json=body, timeout=get_timeouts())
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        # timeout نسجله كعينة عشان الـ adaptive timeout يقدر يكبر مرة ثانية
+        if isinstance(e, requests.Timeout):
+            upstream_latency.record(time.perf_counter() - t0)
+        with _stats.lock:
+            _stats.errors += 1
+        raise
+    else:
+        upstream_latency.record(time.perf_counter() - t0)
+        return data
+    finally:
+        with _stats.lock:
+            _stats.in_flight -= 1
+        slots.release()
+
+
+# ==========================
+# Async gateway (asyncio-native)
+# ==========================
+# asyncio objects belong to one event loop, so each loop gets its own
+# AsyncClient + Semaphore (في الإنتاج فيه loop واحد لكل worker).
+
+def _httpx_timeout() -> httpx.Timeout:
+    connect, read = get_timeouts()
+    return httpx.Timeout(read, connect=connect)
+
+
+class _AsyncGateway:
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.client = httpx.AsyncClient(
+            timeout=_httpx_timeout(),
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=int(
+                    os.environ.get("LLM_POOL_SIZE", DEFAULT_POOL_SIZE)
+                ),
+            ),
+        )
+
+
+_gateways: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncGateway]" = (
+    weakref.WeakKeyDictionary()
+)
+_astats = _PoolStats()
+
+
+def _get_gateway() -> _AsyncGateway:
+    loop = asyncio.get_running_loop()
+    gateway = _gateways.get(loop)
+    if gateway is None:
+        max_in_flight = int(os.environ.get("LLM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+        gateway = _AsyncGateway(max_in_flight)
+        _gateways[loop] = gateway
+    return gateway
+
+
+async def aclose_gateway():
+    """
+    Close the AsyncClient of the running loop (called on app shutdown).
+    """
+    loop = asyncio.get_running_loop()
+    gateway = _gateways.pop(loop, None)
+    if gateway is not None:
+        await gateway.client.aclose()
+
+
+def gateway_stats() -> Dict[str, Any]:
+    """
+    Snapshot of the async gateway: in-flight calls and how many
+    had to queue on the semaphore.
+    """
+    max_in_flight = int(os.environ.get("LLM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    with _astats.lock:
+        return {
+            "max_in_flight": max_in_flight,
+            "requests": _astats.requests,
+            "errors": _astats.errors,
+            "waits": _astats.waits,
+            "wait_seconds": round(_astats.wait_seconds, 6),
+            "in_flight": _astats.in_flight,
+            "peak_in_flight": _astats.peak_in_flight,
+        }
+
+
+@asynccontextmanager
+async def _gateway_slot(gateway: _AsyncGateway):
+    """
+    Hold one of the LLM_MAX_IN_FLIGHT slots for the duration of a request.
+    """
+    if gateway.semaphore.locked():
+        t0 = time.perf_counter()
+        await gateway.semaphore.acquire()
+        with _astats.lock:
+            _astats.waits += 1
+            _astats.wait_seconds += time.perf_counter() - t0
+    else:
+        await gateway.semaphore.acquire()
+
+    with _astats.lock:
+        _astats.requests += 1
+        _astats.in_flight += 1
+        _astats.peak_in_flight = max(_astats.peak_in_flight, _astats.in_flight)
+
+    try:
+        yield
+    except Exception:
+        with _astats.lock:
+            _astats.errors += 1
+        raise
+    finally:
+        with _astats.lock:
+            _astats.in_flight -= 1
+        gateway.semaphore.release()
+
+
+def _auth_headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+
+
+async def apost_json(path: str, body: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """
+    Async version of post_json. At most LLM_MAX_IN_FLIGHT requests
+    are in flight per event loop; the rest wait on the semaphore
+    without holding a thread.
+    """
+    gateway = _get_gateway()
+    url = f"{get_base_url()}/{path.lstrip('/')}"
+
+    async with _gateway_slot(gateway):
+        t0 = time.perf_counter()
+        try:
+            resp = await gateway.client.post(
+                url, headers=_auth_headers(api_key), json=body, timeout=_httpx_timeout()
+            )
+            resp.raise_for_status()
+            data = resp.json()
+        except httpx.TimeoutException:
+            upstream_latency.record(time.perf_counter() - t0)
+            raise
+        upstream_latency.record(time.perf_counter() - t0)
+        return data
+
+
+async def astream_json(
+    path: str, body: Dict[str, Any], api_key: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    POST with "stream": true and yield each decoded Server-Sent Event
+    ("data: {...}" lines) as it arrives, until "data: [DONE]".
+    """
+    gateway = _get_gateway()
+    url = f"{get_base_url()}/{path.lstrip('/')}"
+
+    async with _gateway_slot(gateway):
+        async with gateway.client.stream(
+            "POST", url, headers=_auth_headers(api_key), json=body, timeout=_httpx_timeout()
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)
+
+
+# ==========================
+# Hedged requests
+# ==========================
+# لو الرد تأخر أكثر من p95 نرسل نفس الطلب مرة ثانية وناخذ أول رد يوصل.
+# LLM_HEDGE_BUDGET caps the extra load (hedges / calls).
+
+class _HedgeStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def reset(self):
+        with self.lock:
+            self.calls = 0
+            self.hedged = 0
+            self.hedge_wins = 0
+
+
+_hedge = _HedgeStats()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _hedge_budget() -> float:
+    return float(os.environ.get("LLM_HEDGE_BUDGET", DEFAULT_HEDGE_BUDGET))
+
+
+def hedge_delay() -> Optional[float]:
+    """
+    Seconds to wait before hedging (running upstream p95),
+    or None when hedging is off or there are not enough samples yet.
+    """
+    if not _env_flag("LLM_HEDGE_ENABLED", "0"):
+        return None
+    percentile = float(os.environ.get("LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE))
+    min_samples = int(
+        os.environ.get("LLM_LATENCY_MIN_SAMPLES", DEFAULT_LATENCY_MIN_SAMPLES)
+    )
+    return upstream_latency.running_percentile(percentile, min_samples=min_samples)
+
+
+def _start_call():
+    with _hedge.lock:
+        _hedge.calls += 1
+
+
+def _take_hedge_token() -> bool:
+    with _hedge.lock:
+        if _hedge.hedged + 1 > _hedge_budget() * _hedge.calls:
+            return False
+        _hedge.hedged += 1
+        return True
+
+
+def _hedge_won():
+    with _hedge.lock:
+        _hedge.hedge_wins += 1
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+
+    if _hedge_executor is None:
+        with _session_lock:
+            if _hedge_executor is None:
+                workers = 2 * int(os.environ.get("LLM_POOL_SIZE", DEFAULT_POOL_SIZE))
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="llm-hedge"
+                )
+    return _hedge_executor
+
+
+def post_json_hedged(path: str, body: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    """
+    post_json with optional hedging (LLM_HEDGE_ENABLED=1): if no response
+    has arrived after the running upstream p95, an identical request is
+    sent and whichever succeeds first wins. The loser is left to finish
+    in the background and its result is dropped.
+    """
+    t0 = time.perf_counter()
+    try:
+        return _post_json_hedged(path, body, api_key)
+    finally:
+        call_latency.record(time.perf_counter() - t0)
+
+
+def _post_json_hedged(path: str, body: Dict[str, Any], api_key: str) -> Dict[str, Any]:
+    _start_call()
+    delay = hedge_delay()
+    if delay is None:
+        return post_json(path, body, api_key)
+
+    pool = _get_hedge_executor()
+    primary = pool.submit(post_json, path, body, api_key)
+    done, _ = wait([primary], timeout=delay)
+    if done or not _take_hedge_token():
+        return primary.result()
+
+    hedge = pool.submit(post_json, path, body, api_key)
+    pending = {primary, hedge}
+    first_error: Optional[BaseException] = None
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            error = fut.exception()
+            if error is None:
+                if fut is hedge:
+                    _hedge_won()
+                return fut.result()
+            first_error = first_error or error
+
+    raise first_error
+
+
+async def apost_json_hedged(
+    path: str, body: Dict[str, Any], api_key: str
+) -> Dict[str, Any]:
+    """
+    Async version of post_json_hedged; the losing request is cancelled.
+    """
+    t0 = time.perf_counter()
+    try:
+        return await _apost_json_hedged(path, body, api_key)
+    finally:
+        call_latency.record(time.perf_counter() - t0)
+
+
+async def _apost_json_hedged(
+    path: str, body: Dict[str, Any], api_key: str
+) -> Dict[str, Any]:
+    _start_call()
+    delay = hedge_delay()
+    if delay is None:
+        return await apost_json(path, body, api_key)
+
+    primary = asyncio.ensure_future(apost_json(path, body, api_key))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or not _take_hedge_token():
+        return await primary
+
+    hedge = asyncio.ensure_future(apost_json(path, body, api_key))
+    pending = {primary, hedge}
+    first_error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    if task is hedge:
+                        _hedge_won()
+                    return task.result()
+                first_error = first_error or error
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise first_error
+
+
+def hedge_stats() -> Dict[str, Any]:
+    delay = hedge_delay()
+    with _hedge.lock:
+        return {
+            "enabled": _env_flag("LLM_HEDGE_ENABLED", "0"),
+            "budget": _hedge_budget(),
+            "delay_seconds": round(delay, 6) if delay is not None else None,
+            "calls": _hedge.calls,
+            "hedged": _hedge.hedged,
+            "hedge_wins": _hedge.hedge_wins,
+        }
+
+
+def latency_stats() -> Dict[str, Any]:
+    return {
+        "read_timeout": round(get_timeouts()[1], 3),
+        "upstream": upstream_latency.stats(),
+        "calls": call_latency.stats(),
+    }
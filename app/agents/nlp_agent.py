@@ -1,10 +1,17 @@
 # app/agents/nlp_agent.py
 
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Any, AsyncIterator, List, Tuple
+import asyncio
 import json
+import os
 import re
 
-from .summarizer import call_llm_system
+import numpy as np
+
+from .summarizer import call_llm_system, acall_llm_system, astream_llm_text
 
 
 # ---------- 1) Simple offline sentiment fallback ----------
@@ -18,60 +25,159 @@ _NEGATIVE_WORDS = {
     "disappointed", "sad", "awful", "horrible", "frustrating"
 }
 
+# نفس الفكرة بالعربي (جذور/كلمات شائعة في تعليقات الجمهور)
+_POSITIVE_WORDS_AR = {
+    "رائع", "ممتاز", "جميل", "احب", "أحب", "سعيد", "مذهل", "انبهر",
+    "افضل", "أفضل", "ممتع", "حلو", "ذكي", "بطل", "فوز", "سريع"
+}
+_NEGATIVE_WORDS_AR = {
+    "سيء", "سيئ", "ممل", "اكره", "أكره", "حزين", "غاضب", "فاشل",
+    "محبط", "اسوأ", "أسوأ", "مخيب", "كارث", "خرب", "اخطاء", "أخطاء", "بطيء"
+}
+
+# Lexicon as arrays: index → word, polarity (+1 / -1)
+_LEXICON = (
+    sorted(_POSITIVE_WORDS) + sorted(_POSITIVE_WORDS_AR)
+    + sorted(_NEGATIVE_WORDS) + sorted(_NEGATIVE_WORDS_AR)
+)
+_LEXICON_POLARITY = np.array(
+    [1] * (len(_POSITIVE_WORDS) + len(_POSITIVE_WORDS_AR))
+    + [-1] * (len(_NEGATIVE_WORDS) + len(_NEGATIVE_WORDS_AR)),
+    dtype=np.int8,
+)
+_DOC_SEP = "\x00"
+_OFFLINE_BLOCK = 65_536
+
+
+@lru_cache(maxsize=200_000)
+def _token_lexicon_hits(token: str) -> Tuple[int, ...]:
+    """
+    Lexicon entries contained in one token (substring match, like the
+    original `w in text` test; also catches Arabic prefixes such as ال / و).
+    Cached, so each distinct token is checked against the lexicon only once.
+    """
+    return tuple(i for i, w in enumerate(_LEXICON) if w in token)
+
+
+def _count_lexicon_hits(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (positive_hits, negative_hits) per text, each lexicon word counted once per text.
+    """
+    n = len(texts)
+    n_lex = len(_LEXICON)
+    clean = [t.replace(_DOC_SEP, " ") if t and _DOC_SEP in t else (t or "") for t in texts]
+
+    # 1) tokenize the whole batch at once; a separator token marks each text boundary
+    tokens = f" {_DOC_SEP} ".join(clean).lower().split()
+
+    # 2) lexicon lookup once per distinct token → row in a small CSR table
+    #    (row 0 = no hits, -1 = text separator)
+    row_of: Dict[str, int] = {_DOC_SEP: -1}
+    rows: List[Tuple[int, ...]] = [()]
+    for tok in set(tokens):
+        if tok == _DOC_SEP:
+            continue
+        hits = _token_lexicon_hits(tok)
+        if hits:
+            row_of[tok] = len(rows)
+            rows.append(hits)
+        else:
+            row_of[tok] = 0
+
+    tok_rows = np.fromiter(map(row_of.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    tok_docs = np.cumsum(tok_rows == -1)
+
+    keep = tok_rows > 0
+    tok_rows = tok_rows[keep]
+    tok_docs = tok_docs[keep]
+
+    if tok_rows.size == 0:
+        zeros = np.zeros(n, dtype=np.int64)
+        return zeros, zeros.copy()
+
+    row_len = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    row_ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(row_len, out=row_ptr[1:])
+    row_lex = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=int(row_ptr[-1]))
+
+    # 3) expand every hit token into its (text, lexicon id) pairs
+    occ = row_len[tok_rows]
+    total = int(occ.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(occ) - occ, occ)
+    lex = row_lex[np.repeat(row_ptr[tok_rows], occ) + offsets]
+    docs = np.repeat(tok_docs, occ)
+
+    # 4) presence matrix (text × lexicon word): each word counts once per text
+    present = np.zeros((n, n_lex), dtype=bool)
+    present[docs, lex] = True
+    pos = present[:, _LEXICON_POLARITY > 0].sum(axis=1)
+    neg = present[:, _LEXICON_POLARITY < 0].sum(axis=1)
+    return pos, neg
+
+
+def offline_sentiment_batch(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Rule-based sentiment for a whole list of texts (English + Arabic).
+    The batch is tokenized once and lexicon hits are counted with NumPy,
+    so this keeps up with bulk feeds when the LLM is unavailable.
+    Returns the same dicts as _offline_sentiment, in order.
+    """
+    if not texts:
+        return []
+
+    # blocks keep the presence matrix small for very large feeds
+    counts = [
+        _count_lexicon_hits(texts[i:i + _OFFLINE_BLOCK])
+        for i in range(0, len(texts), _OFFLINE_BLOCK)
+    ]
+    pos = np.concatenate([c[0] for c in counts])
+    neg = np.concatenate([c[1] for c in counts])
+
+    # label + score, same rule as the single-text version
+    diff = pos - neg
+    scores = (np.minimum(np.abs(diff) / 5.0, 1.0) * np.sign(diff)).tolist()
+    labels = np.where(diff > 0, "positive", np.where(diff < 0, "negative", "neutral")).tolist()
+    pos = pos.tolist()
+    neg = neg.tolist()
+
+    return [
+        {
+            "type": "sentiment",
+            "label": labels[i],
+            "score": scores[i],
+            "explanation": (
+                "Offline sentiment estimate based on simple keyword matching. "
+                f"Positive hits: {pos[i]}, negative hits: {neg[i]}."
+            ),
+            "raw_text": texts[i],
+        }
+        for i in range(len(texts))
+    ]
+
 
 def _offline_sentiment(text: str) -> Dict[str, Any]:
     """
     Very simple rule-based sentiment for offline fallback.
     Returns label + score + explanation.
     """
-    t = (text or "").lower()
-    pos = sum(w in t for w in _POSITIVE_WORDS)
-    neg = sum(w in t for w in _NEGATIVE_WORDS)
-
-    if pos == 0 and neg == 0:
-        label = "neutral"
-        score = 0.0
-    elif pos > neg:
-        label = "positive"
-        score = min(1.0, (pos - neg) / 5.0)
-    elif neg > pos:
-        label = "negative"
-        score = -min(1.0, (neg - pos) / 5.0)
-    else:
-        label = "neutral"
-        score = 0.0
-
-    explanation = (
-        "Offline sentiment estimate based on simple keyword matching. "
-        f"Positive hits: {pos}, negative hits: {neg}."
-    )
+    return offline_sentiment_batch([text])[0]
 
+
+# ---------- 2) LLM-based sentiment analysis ----------
+
+def _empty_sentiment(text: str) -> Dict[str, Any]:
     return {
         "type": "sentiment",
-        "label": label,
-        "score": score,
-        "explanation": explanation,
+        "label": "unknown",
+        "score": 0.0,
+        "explanation": "No text was provided.",
         "raw_text": text,
     }
 
 
-# ---------- 2) LLM-based sentiment analysis ----------
-def analyze_sentiment(text: str, language: str | None = None) -> Dict[str, Any]:
-    """
-    Use LLM (OpenAI via call_llm_system) to analyze sentiment of a comment.
-    Falls back to a simple offline classifier if LLM is unavailable.
-    """
-    if not text:
-        return {
-            "type": "sentiment",
-            "label": "unknown",
-            "score": 0.0,
-            "explanation": "No text was provided.",
-            "raw_text": text,
-        }
-
+def _sentiment_prompt(text: str, language: str | None = None) -> str:
     lang_hint = f" The text is in {language}." if language else ""
-    prompt = (
+    return (
         "You are a sentiment analysis engine for Formula 1 related comments, "
         "team radio messages and social media posts.\n"
         "Classify the overall sentiment of the given text as one of "
@@ -88,67 +194,296 @@ def analyze_sentiment(text: str, language: str | None = None) -> Dict[str, Any]:
         "JSON:"
     )
 
+
+def _clean_llm_json(raw: str) -> str:
+    # ====== تنظيف استجابة الـ LLM قبل json.loads ======
+    clean = str(raw).strip()
+    clean = re.sub(r"```json", "", clean, flags=re.IGNORECASE)
+    clean = clean.replace("```", "").strip()
+    clean = re.sub(r"^json", "", clean, flags=re.IGNORECASE).strip()
+    return clean
+
+
+def _sentiment_from_dict(data: Dict[str, Any], text: str) -> Dict[str, Any]:
+    label = data.get("label", "unknown")
+
+    # نحاول نحول الـ score لرقم، لو فشل نحط فالباك حسب الـ label
     try:
-        raw = call_llm_system(prompt)
+        score = float(data.get("score"))
+    except (TypeError, ValueError):
+        score = None
+
+    if score is None:
+        if label == "positive":
+            score = 0.7
+        elif label == "negative":
+            score = -0.7
+        elif label == "neutral":
+            score = 0.0
+        else:
+            score = 0.0
 
-        # لو summarizer في وضع offline
-        if isinstance(raw, str) and raw.startswith("[Local fallback answer]"):
-            return _offline_sentiment(text)
+    return {
+        "type": "sentiment",
+        "label": label,
+        "score": float(score),
+        "explanation": data.get("explanation", ""),
+        "raw_text": text,
+    }
 
-        # ====== تنظيف استجابة الـ LLM قبل json.loads ======
-        clean = str(raw).strip()
-        clean = re.sub(r"```json", "", clean, flags=re.IGNORECASE)
-        clean = clean.replace("```", "").strip()
-        clean = re.sub(r"^json", "", clean, flags=re.IGNORECASE).strip()
 
-        try:
-            data = json.loads(clean)
-            label = data.get("label", "unknown")
+def _parse_sentiment(raw: str, text: str) -> Dict[str, Any]:
+    """
+    Turn the raw LLM reply into the sentiment dict.
+    """
+    # لو summarizer في وضع offline
+    if isinstance(raw, str) and raw.startswith("[Local fallback answer]"):
+        return _offline_sentiment(text)
 
-            # نحاول نحول الـ score لرقم، لو فشل نحط فالباك حسب الـ label
-            try:
-                score = float(data.get("score"))
-            except (TypeError, ValueError):
-                score = None
-
-            if score is None:
-                if label == "positive":
-                    score = 0.7
-                elif label == "negative":
-                    score = -0.7
-                elif label == "neutral":
-                    score = 0.0
-                else:
-                    score = 0.0
-
-            explanation = data.get("explanation", "")
+    clean = _clean_llm_json(raw)
 
-        except Exception:
-            # لو فشل البارس برضو، رجّع الرسالة الخام عشان نقدر نشوفها
-            return {
-                "type": "sentiment",
-                "label": "unknown",
-                "score": 0.0,
-                "explanation": f"LLM response (unparsed): {raw}",
-                "raw_text": text,
-            }
+    try:
+        return _sentiment_from_dict(json.loads(clean), text)
 
+    except Exception:
+        # لو فشل البارس برضو، رجّع الرسالة الخام عشان نقدر نشوفها
         return {
             "type": "sentiment",
-            "label": label,
-            "score": float(score),
-            "explanation": explanation,
+            "label": "unknown",
+            "score": 0.0,
+            "explanation": f"LLM response (unparsed): {raw}",
             "raw_text": text,
         }
 
+
+def analyze_sentiment(text: str, language: str | None = None) -> Dict[str, Any]:
+    """
+    Use LLM (OpenAI via call_llm_system) to analyze sentiment of a comment.
+    Falls back to a simple offline classifier if LLM is unavailable.
+    """
+    if not text:
+        return _empty_sentiment(text)
+
+    prompt = _sentiment_prompt(text, language)
+
+    try:
+        raw = call_llm_system(prompt)
+        return _parse_sentiment(raw, text)
+
     except Exception:
         # أي خطأ غير متوقّع → fallback
         return _offline_sentiment(text)
 
 
+async def aanalyze_sentiment(text: str, language: str | None = None) -> Dict[str, Any]:
+    """
+    Async version of analyze_sentiment (awaits acall_llm_system).
+    """
+    if not text:
+        return _empty_sentiment(text)
+
+    prompt = _sentiment_prompt(text, language)
+
+    try:
+        raw = await acall_llm_system(prompt)
+        return _parse_sentiment(raw, text)
+
+    except Exception:
+        return _offline_sentiment(text)
+
+
+# ---------- 2b) Batch sentiment (many comments per LLM call) ----------
+
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", "20"))
+_BATCH_TOKENS_PER_ITEM = 80
+
+
+def _batch_sentiment_prompt(texts: List[str], language: str | None = None) -> str:
+    lang_hint = f" The texts are in {language}." if language else ""
+    items = "\n".join(
+        json.dumps({"id": i, "text": t}, ensure_ascii=False) for i, t in enumerate(texts)
+    )
+    return (
+        "You are a sentiment analysis engine for Formula 1 related comments, "
+        "team radio messages and social media posts.\n"
+        f"Classify the overall sentiment of EACH of the {len(texts)} texts below as one of "
+        "'positive', 'negative', or 'neutral'.\n"
+        "Return a STRICT JSON array with exactly one object per text, in the same order "
+        "(no additional text, no Markdown, no code fences):\n"
+        "[ { \"id\": <number>, \"label\": <string>, \"score\": <number>, "
+        "\"explanation\": <string> }, ... ]\n"
+        "- id: the id of the text\n"
+        "- label: 'positive' | 'negative' | 'neutral'\n"
+        "- score: a number between -1.0 (very negative) and 1.0 (very positive)\n"
+        "- explanation: one short sentence explaining why.\n"
+        f"{lang_hint}\n\n"
+        f"Texts (one JSON object per line):\n{items}\n\n"
+        "JSON:"
+    )
+
+
+def _parse_sentiment_batch(raw: str, texts: List[str]) -> List[Dict[str, Any] | None] | None:
+    """
+    Parse the JSON array reply of a batch prompt.
+    Returns None if the whole reply can't be parsed; otherwise one entry per
+    text, with None for items the model skipped (those get retried one by one).
+    """
+    try:
+        data = json.loads(_clean_llm_json(raw))
+    except Exception:
+        return None
+
+    if isinstance(data, dict):
+        data = data.get("results")
+    if not isinstance(data, list):
+        return None
+
+    results: List[Dict[str, Any] | None] = [None] * len(texts)
+    for pos, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        try:
+            i = int(item.get("id", pos))
+        except (TypeError, ValueError):
+            i = pos
+        if 0 <= i < len(texts) and results[i] is None:
+            results[i] = _sentiment_from_dict(item, texts[i])
+
+    return results
+
+
+def _chunks(items: List[Any], size: int) -> List[List[Any]]:
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def analyze_sentiment_batch(
+    texts: List[str],
+    language: str | None = None,
+    batch_size: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Sentiment for many texts with one LLM call per chunk of batch_size texts.
+    Returns one result per input (same shape as analyze_sentiment), in order.
+    Chunks that fail to parse are retried per item with analyze_sentiment.
+    """
+    batch_size = batch_size or SENTIMENT_BATCH_SIZE
+    results: List[Dict[str, Any] | None] = [None] * len(texts)
+
+    pending = []
+    for i, t in enumerate(texts):
+        if t:
+            pending.append(i)
+        else:
+            results[i] = _empty_sentiment(t)
+
+    for chunk in _chunks(pending, batch_size):
+        chunk_texts = [texts[i] for i in chunk]
+        prompt = _batch_sentiment_prompt(chunk_texts, language)
+
+        try:
+            raw = call_llm_system(prompt, max_tokens=_BATCH_TOKENS_PER_ITEM * len(chunk))
+        except Exception:
+            raw = "[Local fallback answer]"
+
+        if isinstance(raw, str) and raw.startswith("[Local fallback answer]"):
+            for i, item in zip(chunk, offline_sentiment_batch(chunk_texts)):
+                results[i] = item
+            continue
+
+        parsed = _parse_sentiment_batch(raw, chunk_texts) or [None] * len(chunk)
+        for i, item in zip(chunk, parsed):
+            results[i] = item if item is not None else analyze_sentiment(texts[i], language)
+
+    return results
+
+
+async def aanalyze_sentiment_batch(
+    texts: List[str],
+    language: str | None = None,
+    batch_size: int | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Async version of analyze_sentiment_batch; the chunks are sent concurrently.
+    """
+    batch_size = batch_size or SENTIMENT_BATCH_SIZE
+    results: List[Dict[str, Any] | None] = [None] * len(texts)
+
+    pending = []
+    for i, t in enumerate(texts):
+        if t:
+            pending.append(i)
+        else:
+            results[i] = _empty_sentiment(t)
+
+    async def _run_chunk(chunk: List[int]):
+        chunk_texts = [texts[i] for i in chunk]
+        prompt = _batch_sentiment_prompt(chunk_texts, language)
+
+        try:
+            raw = await acall_llm_system(prompt, max_tokens=_BATCH_TOKENS_PER_ITEM * len(chunk))
+        except Exception:
+            raw = "[Local fallback answer]"
+
+        if isinstance(raw, str) and raw.startswith("[Local fallback answer]"):
+            for i, item in zip(chunk, offline_sentiment_batch(chunk_texts)):
+                results[i] = item
+            return
+
+        parsed = _parse_sentiment_batch(raw, chunk_texts) or [None] * len(chunk)
+        retry = []
+        for i, item in zip(chunk, parsed):
+            if item is not None:
+                results[i] = item
+            else:
+                retry.append(i)
+
+        retried = await asyncio.gather(*[aanalyze_sentiment(texts[i], language) for i in retry])
+        for i, item in zip(retry, retried):
+            results[i] = item
+
+    await asyncio.gather(*[_run_chunk(c) for c in _chunks(pending, batch_size)])
+    return results
+
 
 # ---------- 3) Summarization ----------
 
+def _summary_prompt(text: str, max_words: int) -> str:
+    return (
+        "You are a helpful assistant summarizing Formula 1 related text "
+        "such as race reports, news articles, or fan discussions.\n"
+        f"Rewrite the following text as a concise summary of at most {max_words} words.\n"
+        "Preserve the key events, drivers, and outcomes. "
+        "Use the same language as the original text.\n\n"
+        f"Original text:\n{text}\n\n"
+        "Summary:"
+    )
+
+
+def _truncate_summary(text: str, max_words: int) -> Dict[str, Any]:
+    """
+    Offline summary: first max_words words of the text.
+    """
+    words = text.split()
+    short = " ".join(words[:max_words])
+    return {
+        "type": "summary",
+        "summary": short,
+        "original_length": len(words),
+    }
+
+
+def _parse_summary(summary: str, text: str, max_words: int) -> Dict[str, Any]:
+    if isinstance(summary, str) and summary.startswith("[Local fallback answer]"):
+        return _truncate_summary(text, max_words)
+
+    return {
+        "type": "summary",
+        "summary": summary.strip(),
+        "original_length": len(text.split()),
+    }
+
+
 def summarize_text(text: str, max_words: int = 70) -> Dict[str, Any]:
     """
     Summarize a long F1-related text (article, review, race report, etc.).
@@ -161,51 +496,333 @@ def summarize_text(text: str, max_words: int = 70) -> Dict[str, Any]:
             "original_length": 0,
         }
 
-    prompt = (
+    prompt = _summary_prompt(text, max_words)
+
+    try:
+        summary = call_llm_system(prompt)
+        return _parse_summary(summary, text, max_words)
+
+    except Exception:
+        return _truncate_summary(text, max_words)
+
+
+async def asummarize_text(text: str, max_words: int = 70) -> Dict[str, Any]:
+    """
+    Async version of summarize_text (awaits acall_llm_system).
+    """
+    if not text:
+        return {
+            "type": "summary",
+            "summary": "",
+            "original_length": 0,
+        }
+
+    prompt = _summary_prompt(text, max_words)
+
+    try:
+        summary = await acall_llm_system(prompt)
+        return _parse_summary(summary, text, max_words)
+
+    except Exception:
+        return _truncate_summary(text, max_words)
+
+
+# ---------- 3b) Chunked (map-reduce) summarization for long texts ----------
+
+SUMMARY_CHUNK_WORDS = int(os.environ.get("SUMMARY_CHUNK_WORDS", "1500"))
+SUMMARY_PARALLELISM = int(os.environ.get("SUMMARY_PARALLELISM", "4"))
+SUMMARY_CHUNKED_THRESHOLD = int(os.environ.get("SUMMARY_CHUNKED_THRESHOLD", "3000"))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?؟。])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _split_into_chunks(text: str, chunk_words: int) -> List[str]:
+    """
+    Split text into chunks of at most chunk_words words, cutting on
+    paragraph and sentence boundaries (a single over-long sentence is cut by words).
+    """
+    chunk_words = max(1, int(chunk_words))
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    def _flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append(" ".join(current))
+        current = []
+        current_len = 0
+
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        for sentence in _SENTENCE_END.split(paragraph.strip()):
+            words = sentence.split()
+            if not words:
+                continue
+
+            # جملة أطول من الـ chunk نفسه → نقصها على الكلمات
+            while len(words) > chunk_words:
+                _flush()
+                chunks.append(" ".join(words[:chunk_words]))
+                words = words[chunk_words:]
+
+            if current_len + len(words) > chunk_words:
+                _flush()
+            current.append(" ".join(words))
+            current_len += len(words)
+
+        # a paragraph break is a good place to end a chunk once it is half full
+        if current_len >= chunk_words // 2:
+            _flush()
+
+    _flush()
+    return chunks
+
+
+def _chunk_summary_prompt(chunk: str, index: int, total: int, max_words: int) -> str:
+    return (
         "You are a helpful assistant summarizing Formula 1 related text "
         "such as race reports, news articles, or fan discussions.\n"
-        f"Rewrite the following text as a concise summary of at most {max_words} words.\n"
-        "Preserve the key events, drivers, and outcomes. "
+        f"This is part {index} of {total} of a longer text.\n"
+        f"Summarize this part in at most {max_words} words. "
+        "Keep the key events, drivers, laps and outcomes. "
         "Use the same language as the original text.\n\n"
-        f"Original text:\n{text}\n\n"
+        f"Text (part {index}/{total}):\n{chunk}\n\n"
+        "Summary:"
+    )
+
+
+def _reduce_summary_prompt(partials: List[str], max_words: int) -> str:
+    joined = "\n\n".join(f"Part {i}: {p}" for i, p in enumerate(partials, start=1))
+    return (
+        "You are a helpful assistant summarizing Formula 1 related text.\n"
+        "Below are summaries of consecutive parts of one long text (race report, "
+        "transcript or article), in order.\n"
+        f"Combine them into one concise summary of at most {max_words} words. "
+        "Preserve the key events, drivers, and outcomes in chronological order. "
+        "Use the same language as the original text.\n\n"
+        f"{joined}\n\n"
         "Summary:"
     )
 
+
+def _is_fallback(answer: Any) -> bool:
+    return isinstance(answer, str) and answer.startswith("[Local fallback answer]")
+
+
+def _chunk_budget(max_words: int, n_chunks: int, chunk_words: int) -> int:
+    # كل جزء ياخذ نصيبه، بحيث مجموع الملخصات يدخل في chunk واحد للـ reduce
+    return max(max_words, min(chunk_words // max(n_chunks, 1), 3 * max_words))
+
+
+def _needs_another_map(answers: List[str], chunk_words: int) -> List[str] | None:
+    """
+    If the partial summaries together are still longer than one chunk,
+    re-chunk them for another map round; None means they fit in the reduce prompt.
+    """
+    total = sum(len(a.split()) for a in answers)
+    if total <= chunk_words or len(answers) <= 1:
+        return None
+
+    regrouped = _split_into_chunks("\n\n".join(answers), chunk_words)
+    if len(regrouped) >= len(answers):
+        # الملخصات ما صغرت، نكتفي بالـ reduce
+        return None
+    return regrouped
+
+
+def summarize_text_chunked(
+    text: str,
+    max_words: int = 70,
+    chunk_words: int | None = None,
+    parallelism: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Map-reduce summary for long texts: summarize chunks in parallel threads,
+    then combine the partial summaries in a reduce pass (repeated if needed).
+    Falls back to the truncation summary if the LLM is unavailable.
+    """
+    chunk_words = chunk_words or SUMMARY_CHUNK_WORDS
+    parallelism = parallelism or SUMMARY_PARALLELISM
+
+    if not text:
+        return {"type": "summary", "summary": "", "original_length": 0, "chunks": 0}
+
+    chunks = _split_into_chunks(text, chunk_words)
+    if len(chunks) <= 1:
+        return {**summarize_text(text, max_words=max_words), "chunks": len(chunks)}
+
+    partials = chunks
+
     try:
-        summary = call_llm_system(prompt)
-        if isinstance(summary, str) and summary.startswith("[Local fallback answer]"):
-            words = text.split()
-            short = " ".join(words[:max_words])
-            return {
-                "type": "summary",
-                "summary": short,
-                "original_length": len(words),
-            }
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+            while True:
+                # map: كل جزء يتلخص لحاله (بالتوازي)
+                budget = _chunk_budget(max_words, len(partials), chunk_words)
+                prompts = [
+                    _chunk_summary_prompt(c, i, len(partials), budget)
+                    for i, c in enumerate(partials, start=1)
+                ]
+                answers = list(
+                    pool.map(lambda p: call_llm_system(p, max_tokens=2 * budget), prompts)
+                )
+                if any(_is_fallback(a) for a in answers):
+                    return {**_truncate_summary(text, max_words), "chunks": len(chunks)}
+
+                answers = [a.strip() for a in answers]
+                next_partials = _needs_another_map(answers, chunk_words)
+                if next_partials is None:
+                    break
+                partials = next_partials
+
+        # reduce
+        summary = call_llm_system(
+            _reduce_summary_prompt(answers, max_words), max_tokens=2 * max_words + 50
+        )
 
-        return {
-            "type": "summary",
-            "summary": summary.strip(),
-            "original_length": len(text.split()),
-        }
+    except Exception:
+        return {**_truncate_summary(text, max_words), "chunks": len(chunks)}
+
+    return {**_parse_summary(summary, text, max_words), "chunks": len(chunks)}
+
+
+async def _amap_chunk_summaries(
+    chunks: List[str],
+    max_words: int,
+    chunk_words: int,
+    parallelism: int,
+) -> List[str] | None:
+    """
+    Map phase of the async map-reduce: partial summaries ready for the
+    reduce prompt, or None if the LLM is unavailable.
+    """
+    partials = chunks
+    limit = asyncio.Semaphore(max(1, parallelism))
+
+    async def _summarize_part(prompt: str, budget: int) -> str:
+        async with limit:
+            return await acall_llm_system(prompt, max_tokens=2 * budget)
+
+    while True:
+        budget = _chunk_budget(max_words, len(partials), chunk_words)
+        answers = await asyncio.gather(*[
+            _summarize_part(_chunk_summary_prompt(c, i, len(partials), budget), budget)
+            for i, c in enumerate(partials, start=1)
+        ])
+        if any(_is_fallback(a) for a in answers):
+            return None
+
+        answers = [a.strip() for a in answers]
+        next_partials = _needs_another_map(answers, chunk_words)
+        if next_partials is None:
+            return answers
+        partials = next_partials
+
+
+async def asummarize_text_chunked(
+    text: str,
+    max_words: int = 70,
+    chunk_words: int | None = None,
+    parallelism: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Async version of summarize_text_chunked: chunk summaries are awaited
+    concurrently, at most `parallelism` at a time.
+    """
+    chunk_words = chunk_words or SUMMARY_CHUNK_WORDS
+    parallelism = parallelism or SUMMARY_PARALLELISM
+
+    if not text:
+        return {"type": "summary", "summary": "", "original_length": 0, "chunks": 0}
+
+    chunks = _split_into_chunks(text, chunk_words)
+    if len(chunks) <= 1:
+        return {**(await asummarize_text(text, max_words=max_words)), "chunks": len(chunks)}
+
+    try:
+        answers = await _amap_chunk_summaries(chunks, max_words, chunk_words, parallelism)
+        if answers is None:
+            return {**_truncate_summary(text, max_words), "chunks": len(chunks)}
+
+        summary = await acall_llm_system(
+            _reduce_summary_prompt(answers, max_words), max_tokens=2 * max_words + 50
+        )
 
     except Exception:
-        words = text.split()
-        short = " ".join(words[:max_words])
+        return {**_truncate_summary(text, max_words), "chunks": len(chunks)}
+
+    return {**_parse_summary(summary, text, max_words), "chunks": len(chunks)}
+
+
+async def astream_summarize_text(
+    text: str,
+    max_words: int = 70,
+    chunked: bool = False,
+    chunk_words: int | None = None,
+    parallelism: int | None = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming summary: {"event": "token"} pieces, then {"event": "done"}.
+    In chunked mode the map phase runs first and the reduce pass is streamed.
+    """
+    words = (text or "").split()
+
+    def _done(n_chunks: int) -> Dict[str, Any]:
         return {
+            "event": "done",
             "type": "summary",
-            "summary": short,
             "original_length": len(words),
+            "chunks": n_chunks,
         }
 
+    if not words:
+        yield _done(0)
+        return
+
+    def _fallback() -> str:
+        return _truncate_summary(text, max_words)["summary"]
+
+    prompt = _summary_prompt(text, max_words)
+    max_tokens = 250  # same request as summarize_text (shares its cache entry)
+    n_chunks = 1
+
+    if chunked:
+        chunk_words = chunk_words or SUMMARY_CHUNK_WORDS
+        chunks = _split_into_chunks(text, chunk_words)
+        n_chunks = len(chunks)
+
+        if n_chunks > 1:
+            try:
+                answers = await _amap_chunk_summaries(
+                    chunks, max_words, chunk_words, parallelism or SUMMARY_PARALLELISM
+                )
+            except Exception:
+                answers = None
+
+            if answers is None:
+                yield {"event": "token", "text": _fallback()}
+                yield _done(n_chunks)
+                return
+
+            prompt = _reduce_summary_prompt(answers, max_words)
+            max_tokens = 2 * max_words + 50
+
+    async for piece in astream_llm_text(prompt, fallback=_fallback, max_tokens=max_tokens):
+        yield {"event": "token", "text": piece}
+
+    yield _done(n_chunks)
+
 
 # ---------- 4) Multilingual QA helper ----------
 
-def multilingual_qa(context: str, question: str, target_lang: str = "en") -> Dict[str, Any]:
-    """
-    Answer a question based on the given context and respond in target_lang.
-    This can be used later for a multilingual chat interface.
-    """
-    prompt = (
+_MULTI_QA_UNAVAILABLE = (
+    "Multilingual QA model is currently unavailable. "
+    "Please try again later with a simpler question."
+)
+
+
+def _multilingual_prompt(context: str, question: str, target_lang: str) -> str:
+    return (
         "You are a multilingual assistant answering questions about Formula 1.\n"
         "Use ONLY the context below and your general F1 knowledge when needed.\n"
         f"Answer the user's question in the target language: {target_lang}.\n\n"
@@ -214,16 +831,53 @@ def multilingual_qa(context: str, question: str, target_lang: str = "en") -> Dic
         "Answer:"
     )
 
+
+def multilingual_qa(context: str, question: str, target_lang: str = "en") -> Dict[str, Any]:
+    """
+    Answer a question based on the given context and respond in target_lang.
+    This can be used later for a multilingual chat interface.
+    """
+    prompt = _multilingual_prompt(context, question, target_lang)
+
     try:
         answer = call_llm_system(prompt)
     except Exception:
-        answer = (
-            "Multilingual QA model is currently unavailable. "
-            "Please try again later with a simpler question."
-        )
+        answer = _MULTI_QA_UNAVAILABLE
+
+    return {
+        "type": "multilingual_qa",
+        "answer": str(answer).strip(),
+        "target_language": target_lang,
+    }
+
+
+async def amultilingual_qa(context: str, question: str, target_lang: str = "en") -> Dict[str, Any]:
+    """
+    Async version of multilingual_qa (awaits acall_llm_system).
+    """
+    prompt = _multilingual_prompt(context, question, target_lang)
+
+    try:
+        answer = await acall_llm_system(prompt)
+    except Exception:
+        answer = _MULTI_QA_UNAVAILABLE
 
     return {
         "type": "multilingual_qa",
         "answer": str(answer).strip(),
         "target_language": target_lang,
     }
+
+
+async def astream_multilingual_qa(
+    context: str, question: str, target_lang: str = "en"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming version of multilingual_qa (token events, then done).
+    """
+    prompt = _multilingual_prompt(context, question, target_lang)
+
+    async for piece in astream_llm_text(prompt, fallback=lambda: _MULTI_QA_UNAVAILABLE):
+        yield {"event": "token", "text": piece}
+
+    yield {"event": "done", "type": "multilingual_qa", "target_language": target_lang}
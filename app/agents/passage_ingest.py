@@ -0,0 +1,294 @@
+# app/agents/passage_ingest.py
+
+import base64
+import copy
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from .ann_index import normalize_rows
+from .bm25_index import BM25Index
+from .embedding_store import EMBED_DIM, content_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class DeltaSegment:
+    """
+    Passages added since the last compaction + tombstones (deleted content
+    hashes). Never modified in place: with_added / with_deleted return a
+    new segment, so a query that grabbed the old one keeps a consistent view.
+
+    Each op only touches the rows of the hashes it changes: the tombstone
+    mask is copied from the previous segment and updated through hash → row
+    maps, and the delta BM25 index is rebuilt only when delta texts change.
+    """
+
+    def __init__(
+        self,
+        base_hashes: List[str],
+        passages: Optional[List[Dict[str, Any]]] = None,
+        embs: Optional[np.ndarray] = None,
+        deleted: FrozenSet[str] = frozenset(),
+        dim: int = EMBED_DIM,
+    ):
+        self.base_hashes = base_hashes
+        self.n_base = len(base_hashes)
+        # ممكن يتكرر نفس النص في passages.json → أكثر من row للـ hash
+        self.base_rows: Dict[str, List[int]] = {}
+        for row, h in enumerate(base_hashes):
+            self.base_rows.setdefault(h, []).append(row)
+
+        self.passages = list(passages or [])
+        self.texts = [p["text"] for p in self.passages]
+        self.hashes = [content_hash(t) for t in self.texts]
+        self.delta_rows: Dict[str, int] = {h: j for j, h in enumerate(self.hashes)}
+        self.embs = embs if embs is not None else np.zeros((0, dim), dtype=np.float32)
+        self.unit = normalize_rows(self.embs) if len(self.embs) else self.embs
+        self.bm25 = BM25Index().build(self.texts) if self.texts else None
+
+        # tombstone mask over global ids (base rows first, then delta rows), True = deleted
+        self.dead = np.zeros(self.n_base + len(self.hashes), dtype=bool)
+        self.deleted: FrozenSet[str] = frozenset()
+        self.tombstones = 0
+        self.base_tombstones = 0
+        self._mark(self._present(deleted), True)
+        self.deleted = frozenset(deleted)
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    @property
+    def base_deleted(self) -> np.ndarray:
+        return self.dead[: self.n_base]
+
+    @property
+    def delta_deleted(self) -> np.ndarray:
+        return self.dead[self.n_base :]
+
+    def _present(self, hashes) -> set:
+        return {h for h in hashes if h in self.base_rows or h in self.delta_rows}
+
+    def _mark(self, hashes, value: bool):
+        """Set the mask rows of `hashes` (in place, only on a fresh copy) and update the counts."""
+        base = [row for h in hashes for row in self.base_rows.get(h, ())]
+        delta = [self.n_base + self.delta_rows[h] for h in hashes if h in self.delta_rows]
+        for rows, is_base in ((base, True), (delta, False)):
+            if not rows:
+                continue
+            changed = int(np.count_nonzero(self.dead[rows] != value))
+            self.dead[rows] = value
+            step = changed if value else -changed
+            self.tombstones += step
+            if is_base:
+                self.base_tombstones += step
+
+    def with_added(self, passages: List[Dict[str, Any]], embs: np.ndarray) -> "DeltaSegment":
+        """
+        Add passages. Re-adding a deleted text revives it; re-adding a live
+        text is a no-op (so replaying the journal is idempotent).
+        """
+        seen = set()
+        revive = set()
+        new_passages, new_rows = [], []
+
+        for row, p in enumerate(passages):
+            h = content_hash(p["text"])
+            if h in self.base_rows or h in self.delta_rows or h in seen:
+                if h in self.deleted:
+                    revive.add(h)
+                continue
+            seen.add(h)
+            new_passages.append(p)
+            new_rows.append(row)
+
+        if not new_passages and not revive:
+            return self
+
+        seg = copy.copy(self)
+        if new_passages:
+            new_embs = np.asarray(embs, dtype=np.float32)[new_rows]
+            new_texts = [p["text"] for p in new_passages]
+            seg.passages = self.passages + new_passages
+            seg.texts = self.texts + new_texts
+            seg.hashes = self.hashes + [content_hash(t) for t in new_texts]
+            seg.delta_rows = dict(self.delta_rows)
+            for j, h in enumerate(seg.hashes[len(self.hashes):], start=len(self.hashes)):
+                seg.delta_rows[h] = j
+            seg.embs = np.concatenate([self.embs, new_embs])
+            seg.unit = np.concatenate([self.unit, normalize_rows(new_embs)])
+            seg.bm25 = BM25Index().build(seg.texts)
+            seg.dead = np.concatenate([self.dead, np.zeros(len(new_passages), dtype=bool)])
+        else:
+            seg.dead = self.dead.copy()
+
+        seg._mark(revive, False)
+        seg.deleted = self.deleted - revive
+        return seg
+
+    def with_deleted(self, ids: List[str]) -> "DeltaSegment":
+        hashes = self._present(ids) - self.deleted
+        if not hashes:
+            return self
+
+        # النصوص ما تغيرت: نفس الـ BM25 والـ embeddings، بس نسخة من الـ mask
+        seg = copy.copy(self)
+        seg.dead = self.dead.copy()
+        seg._mark(hashes, True)
+        seg.deleted = self.deleted | hashes
+        return seg
+
+
+# ==========================
+# On-disk journal
+# ==========================
+# كل سطر عملية وحدة (add / delete) والـ embedding محفوظ base64 float32،
+# فالـ append كتابة وحدة وأي worker يقدر يعيد تشغيل السطور بنفس النتيجة.
+
+def encode_embedding(vec: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vec, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_embedding(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<f4").astype(np.float32)
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Exclusive lock across processes (flock on `path`). Where fcntl is not
+    available (Windows) only the in-process locks apply.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class PassageJournal:
+    """
+    Append-only ops file. Compaction rotates it (rename to
+    <path>.compacting) under the journal lock, so ops appended while the
+    indexes are rebuilt go to a fresh file and none are lost.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self.lock_path = path + ".lock"
+        self.compact_lock_path = path + ".compact.lock"
+
+    def append(self, ops: List[Dict[str, Any]]):
+        if not ops:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        with file_lock(self.lock_path):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read_from(self, offset: int = 0) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+        """
+        Ops written after byte `offset` (a partial last line is left for later).
+        Returns (ops, new offset, inode of the file read) — the inode changes
+        when the journal is rotated, and then offsets start again at 0.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return [], 0, None
+
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            f.seek(offset)
+            raw = f.read()
+
+        end = raw.rfind(b"\n") + 1
+        return _parse(raw[:end]), offset + end, inode
+
+    def stamp(self) -> Tuple[Optional[int], int]:
+        """(inode, size) of the journal; (None, 0) when there is none."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def size(self) -> int:
+        return self.stamp()[1]
+
+    def rotate(self):
+        """
+        Move the current ops aside for compaction. A rotated file left by a
+        crashed compaction is kept and the current ops are appended to it.
+        """
+        with file_lock(self.lock_path):
+            if not os.path.exists(self.path):
+                return
+            if not os.path.exists(self.rotated_path):
+                os.replace(self.path, self.rotated_path)
+                return
+            with open(self.path, "rb") as src, open(self.rotated_path, "ab") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.path)
+
+    def read_rotated(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.rotated_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        return _parse(raw[: raw.rfind(b"\n") + 1])
+
+    def drop_rotated(self):
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def truncate(self):
+        with file_lock(self.lock_path):
+            for path in (self.path, self.rotated_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def _parse(raw: bytes) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in raw.decode("utf-8").splitlines() if line.strip()]
+
+
+def apply_ops(delta: DeltaSegment, ops: List[Dict[str, Any]]) -> DeltaSegment:
+    """
+    Replay journal ops on a segment (consecutive adds are applied together).
+    """
+    pending: List[Dict[str, Any]] = []
+
+    def flush(seg: DeltaSegment) -> DeltaSegment:
+        if not pending:
+            return seg
+        passages = [op["passage"] for op in pending]
+        embs = np.stack([decode_embedding(op["emb"]) for op in pending])
+        pending.clear()
+        return seg.with_added(passages, embs)
+
+    for op in ops:
+        if op.get("op") == "add":
+            pending.append(op)
+        elif op.get("op") == "delete":
+            delta = flush(delta)
+            delta = delta.with_deleted(op.get("ids", []))
+    return flush(delta)
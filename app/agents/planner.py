@@ -1,20 +1,40 @@
 # app/agents/planner.py
 
-from typing import Dict, Any
-
-from .qa_agent import answer_question
-from .nlp_agent import analyze_sentiment, summarize_text, multilingual_qa
-from .summarizer import call_llm_system
+from typing import Dict, Any, AsyncIterator
+
+from .qa_agent import aanswer_question, astream_answer_question
+from .nlp_agent import (
+    aanalyze_sentiment,
+    asummarize_text,
+    amultilingual_qa,
+    astream_multilingual_qa,
+)
+from .summarizer import acall_llm_system, astream_llm_text
 from .calendar_agent import is_calendar_question, answer_calendar_question
 from .knowledge_agent import is_knowledge_question, answer_knowledge_question
 
 
-def general_f1_answer(question: str) -> Dict[str, Any]:
-    """
-    General-purpose F1 Q&A (بدون تليمتري).
-    مفيد لشرح المفاهيم والقوانين والاستراتيجيات.
-    """
-    prompt = (
+_GENERAL_UNAVAILABLE = (
+    "I can't access live Formula 1 data right now. "
+    "For the latest calendar and race information, "
+    "please check the official Formula 1 website or app."
+)
+
+_DEFINITION_TRIGGERS = [
+    "what is formula 1",
+    "what is f1",
+    "what is drs",
+    "what is drag reduction system",
+    "ما هي الفورمولا 1",
+    "ماهي الفورمولا 1",
+    "ما هي f1",
+    "ماهو نظام drs",
+    "ما هو نظام drs",
+]
+
+
+def _general_prompt(question: str) -> str:
+    return (
         "You are an expert on Formula 1.\n"
         "Answer the user's question clearly in 2–4 sentences.\n"
         "If the user asks about live data such as the exact date of the next race, "
@@ -25,14 +45,18 @@ def general_f1_answer(question: str) -> Dict[str, Any]:
         "Answer:"
     )
 
+
+async def general_f1_answer(question: str) -> Dict[str, Any]:
+    """
+    General-purpose F1 Q&A (بدون تليمتري).
+    مفيد لشرح المفاهيم والقوانين والاستراتيجيات.
+    """
+    prompt = _general_prompt(question)
+
     try:
-        answer = call_llm_system(prompt)
+        answer = await acall_llm_system(prompt)
     except Exception:
-        answer = (
-            "I can't access live Formula 1 data right now. "
-            "For the latest calendar and race information, "
-            "please check the official Formula 1 website or app."
-        )
+        answer = _GENERAL_UNAVAILABLE
 
     return {
         "type": "general",
@@ -42,9 +66,23 @@ def general_f1_answer(question: str) -> Dict[str, Any]:
     }
 
 
-def handle_query(payload: Dict[str, Any]) -> Dict[str, Any]:
+async def astream_general_f1_answer(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming version of general_f1_answer (token events, then done).
+    """
+    async for piece in astream_llm_text(
+        _general_prompt(question), fallback=lambda: _GENERAL_UNAVAILABLE
+    ):
+        yield {"event": "token", "text": piece}
+
+    yield {"event": "done", "type": "general", "confidence": None, "evidence": []}
+
+
+async def handle_query(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
     Central planner/router for different query types.
+    Async: every LLM-backed agent is awaited, so slow completions
+    don't block a worker thread.
       - 'qa'        → race / telemetry QA (Albatool + Sarah)
       - 'sentiment' → NLP sentiment (Somaya)
       - 'summary'   → NLP summarization
@@ -62,19 +100,8 @@ def handle_query(payload: Dict[str, Any]) -> Dict[str, Any]:
         low_q = question.lower()
 
         #  أسئلة عامة)
-        definition_triggers = [
-            "what is formula 1",
-            "what is f1",
-            "what is drs",
-            "what is drag reduction system",
-            "ما هي الفورمولا 1",
-            "ماهي الفورمولا 1",
-            "ما هي f1",
-            "ماهو نظام drs",
-            "ما هو نظام drs",
-        ]
-        if any(kw in low_q for kw in definition_triggers):
-            return general_f1_answer(question)
+        if any(kw in low_q for kw in _DEFINITION_TRIGGERS):
+            return await general_f1_answer(question)
 
         # إذا مافيه driver ولا lap → يا Calendar يا Knowledge يا General
         if not driver_id and lap is None:
@@ -87,37 +114,97 @@ def handle_query(payload: Dict[str, Any]) -> Dict[str, Any]:
                 return answer_knowledge_question(question)
 
             # 3) سؤال عام عن F1 (مثل: what is DRS? ، strategies, rules ...)
-            return general_f1_answer(question)
+            return await general_f1_answer(question)
 
         
-        return answer_question(**payload)
+        return await aanswer_question(**payload)
 
     # ---------- 2) Explicit general mode ----------
     if qtype == "general":
         question = payload.get("question") or ""
-        return general_f1_answer(question)
+        return await general_f1_answer(question)
 
     # ---------- 3) Sentiment ----------
     if qtype == "sentiment":
         text = payload.get("question") or ""
         language = payload.get("language")
-        return analyze_sentiment(text, language=language)
+        return await aanalyze_sentiment(text, language=language)
 
     # ---------- 4) Summary ----------
     if qtype == "summary":
         text = payload.get("question") or ""
         max_words = payload.get("max_words") or 70
-        return summarize_text(text, max_words=int(max_words))
+        return await asummarize_text(text, max_words=int(max_words))
 
     # ---------- 5) Multilingual QA ----------
     if qtype == "multi_qa":
         context = payload.get("context") or ""
         question = payload.get("question") or ""
         target_lang = payload.get("target_lang") or "en"
-        return multilingual_qa(context, question, target_lang=target_lang)
+        return await amultilingual_qa(context, question, target_lang=target_lang)
 
     # ---------- 6) Unknown ----------
     return {
         "type": "error",
         "message": f"Unknown query type: {qtype}",
     }
+
+
+def _result_events(result: Dict[str, Any]) -> list:
+    """
+    Wrap a non-streaming agent result as token + done events.
+    """
+    text = result.get("answer")
+    if text is None:
+        text = result.get("summary") or result.get("message") or ""
+    rest = {k: v for k, v in result.items() if k not in ("answer", "summary")}
+    return [{"event": "token", "text": str(text)}, {"event": "done", **rest}]
+
+
+async def astream_query(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of handle_query for the /stream endpoints.
+    LLM-backed routes (general, qa_agent, multi_qa) stream their tokens;
+    the instant ones (calendar / knowledge / others) come back as one token.
+    Always ends with a {"event": "done", ...} carrying evidence/confidence.
+    """
+    qtype = (payload.get("type") or "").lower()
+    question = payload.get("question") or ""
+
+    if qtype == "qa":
+        driver_id = payload.get("driver_id")
+        lap = payload.get("lap")
+        low_q = question.lower()
+
+        if any(kw in low_q for kw in _DEFINITION_TRIGGERS):
+            stream = astream_general_f1_answer(question)
+        elif not driver_id and lap is None:
+            if is_calendar_question(question):
+                for ev in _result_events(answer_calendar_question(question)):
+                    yield ev
+                return
+            if is_knowledge_question(question):
+                for ev in _result_events(answer_knowledge_question(question)):
+                    yield ev
+                return
+            stream = astream_general_f1_answer(question)
+        else:
+            stream = astream_answer_question(**payload)
+
+    elif qtype == "general":
+        stream = astream_general_f1_answer(question)
+
+    elif qtype == "multi_qa":
+        stream = astream_multilingual_qa(
+            payload.get("context") or "",
+            question,
+            target_lang=payload.get("target_lang") or "en",
+        )
+
+    else:
+        for ev in _result_events(await handle_query(payload)):
+            yield ev
+        return
+
+    async for ev in stream:
+        yield ev
@@ -1,11 +1,12 @@
 # app/agents/qa_agent.py
 
-from typing import List, Dict, Any, Tuple
+import asyncio
+from typing import List, Dict, Any, AsyncIterator, Tuple
 
 from .retriever_text import text_retriever
 from .retriever_telemetry import telemetry_retriever
 from .filter_verifier import verify_evidence
-from .summarizer import call_llm_system
+from .summarizer import call_llm_system, acall_llm_system, astream_llm_text
 
 
 def _local_qa_answer(question: str, evidence: List[Dict[str, Any]]) -> str:
@@ -71,15 +72,12 @@ def _local_qa_answer(question: str, evidence: List[Dict[str, Any]]) -> str:
     )
 
 
-def answer_question(**payload: Any) -> Dict[str, Any]:
+def _prepare_qa(payload: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]], float, str]:
     """
-    Main QA agent:
-    - retrieves text and telemetry evidence
-    - verifies/filters evidence
-    - tries to answer via Gemini
-    - if Gemini fails or returns a local fallback tag, use offline logic instead
+    Steps 1-3 of the QA agent (shared by the sync and async versions):
+    retrieve evidence, verify it and build the LLM prompt.
+    Returns (question, vetted_evidence, confidence, prompt).
     """
-
     question: str = payload.get("question") or ""
     driver_id = payload.get("driver_id")
     lap = payload.get("lap")
@@ -110,6 +108,19 @@ def answer_question(**payload: Any) -> Dict[str, Any]:
         "Answer:"
     )
 
+    return question, vetted_evidence, confidence, prompt
+
+
+def answer_question(**payload: Any) -> Dict[str, Any]:
+    """
+    Main QA agent:
+    - retrieves text and telemetry evidence
+    - verifies/filters evidence
+    - tries to answer via Gemini
+    - if Gemini fails or returns a local fallback tag, use offline logic instead
+    """
+    question, vetted_evidence, confidence, prompt = _prepare_qa(payload)
+
     # --- 4. Try Gemini; if it fails, use offline answer ---
     try:
         answer = call_llm_system(prompt)
@@ -129,3 +140,48 @@ def answer_question(**payload: Any) -> Dict[str, Any]:
         "confidence": confidence,
         "evidence": vetted_evidence,
     }
+
+
+async def aanswer_question(**payload: Any) -> Dict[str, Any]:
+    """
+    Async version of answer_question: same retrieval/verification,
+    but the LLM call is awaited (acall_llm_system).
+    Retrieval (NumPy / file I/O) runs in a worker thread, off the event loop.
+    """
+    question, vetted_evidence, confidence, prompt = await asyncio.to_thread(_prepare_qa, payload)
+
+    try:
+        answer = await acall_llm_system(prompt)
+
+        if isinstance(answer, str) and answer.startswith("[Local fallback answer]"):
+            answer = _local_qa_answer(question, vetted_evidence)
+
+    except Exception:
+        answer = _local_qa_answer(question, vetted_evidence)
+
+    return {
+        "type": "qa",
+        "answer": answer,
+        "confidence": confidence,
+        "evidence": vetted_evidence,
+    }
+
+
+async def astream_answer_question(**payload: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming QA agent: yields {"event": "token", "text": ...} pieces as the
+    LLM produces them, then one {"event": "done", ...} with evidence + confidence.
+    """
+    question, vetted_evidence, confidence, prompt = await asyncio.to_thread(_prepare_qa, payload)
+
+    async for piece in astream_llm_text(
+        prompt, fallback=lambda: _local_qa_answer(question, vetted_evidence)
+    ):
+        yield {"event": "token", "text": piece}
+
+    yield {
+        "event": "done",
+        "type": "qa",
+        "confidence": confidence,
+        "evidence": vetted_evidence,
+    }
@@ -1,6 +1,14 @@
 # app/agents/retriever_telemetry.py
 import os
 import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .latency import LatencyHistogram
+from .telemetry_store import TelemetryStore, load_or_build, source_fingerprint
 
 TELEMETRY_EMB_FILE = os.path.join(
     os.path.dirname(__file__), "..", "models", "telemetry_embeddings.json"
@@ -27,8 +35,130 @@ def load_telemetry_embeddings():
         return json.load(f)
 
 
-# Load once at import time
-telemetry_index = load_telemetry_embeddings()
+def store_dir() -> str:
+    """
+    Folder of the binary columnar store built from TELEMETRY_EMB_FILE
+    (override with TELEMETRY_STORE_DIR).
+    """
+    default = os.path.join(os.path.dirname(TELEMETRY_EMB_FILE), "telemetry_store")
+    return os.environ.get("TELEMETRY_STORE_DIR", default)
+
+
+def load_telemetry_store() -> TelemetryStore:
+    """
+    Open the columnar store (memory-mapped .npy columns). The JSON is only
+    parsed when it changed since the store was written.
+    """
+    if not os.path.exists(TELEMETRY_EMB_FILE):
+        return TelemetryStore.from_records({})
+    return load_or_build(TELEMETRY_EMB_FILE, store_dir(), load_telemetry_embeddings)
+
+
+# Loaded at import time, then hot-reloaded when TELEMETRY_EMB_FILE changes
+telemetry_store = load_telemetry_store()
+
+# ==========================
+# Hot reload
+# ==========================
+# كل TELEMETRY_RELOAD_INTERVAL ثانية نشيك size + mtime حق الملف؛ لو تغير
+# نبني store جديد في thread والـ queries تكمل على القديم لين الـ swap
+# (assignment واحد، فكل query تشوف store كامل قديم أو جديد).
+
+DEFAULT_RELOAD_INTERVAL = 1.0
+
+_source_fp = source_fingerprint(TELEMETRY_EMB_FILE)
+_last_check = time.monotonic()
+_reload_lock = threading.Lock()
+reload_latency = LatencyHistogram()
+_reload_stats: Dict[str, Any] = {"reloads": 0, "failures": 0, "last_reload_at": None, "last_error": None}
+
+
+def reload_telemetry_store() -> bool:
+    """
+    Rebuild the store from TELEMETRY_EMB_FILE and swap it in.
+    Returns False if another reload is already running or the build failed
+    (the current store is kept).
+    """
+    global telemetry_store, _source_fp
+
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    try:
+        fingerprint = source_fingerprint(TELEMETRY_EMB_FILE)
+        t0 = time.perf_counter()
+        try:
+            store = load_telemetry_store()
+        except Exception as e:
+            # ملف نص مكتوب أو record شكله غلط (KeyError / TypeError ...):
+            # نخلي الـ store القديم ونحاول مرة ثانية بس لما يتغير الملف
+            _source_fp = fingerprint
+            _reload_stats["failures"] += 1
+            _reload_stats["last_error"] = str(e)
+            print(f"WARNING: telemetry reload failed: {type(e).__name__}: {e}")
+            return False
+
+        telemetry_store = store
+        _source_fp = fingerprint
+        reload_latency.record(time.perf_counter() - t0)
+        _reload_stats["reloads"] += 1
+        _reload_stats["last_reload_at"] = time.time()
+        _reload_stats["last_error"] = None
+        return True
+    finally:
+        _reload_lock.release()
+
+
+def current_telemetry_store() -> TelemetryStore:
+    """
+    The live store. If the source file changed, a background rebuild is
+    started and this call (and the ones after it) keep the old store until
+    the new one is swapped in. TELEMETRY_HOT_RELOAD=0 turns the check off.
+    """
+    global _last_check
+
+    if os.environ.get("TELEMETRY_HOT_RELOAD", "1") != "0":
+        interval = float(os.environ.get("TELEMETRY_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+        now = time.monotonic()
+        if now - _last_check >= interval:
+            _last_check = now
+            if source_fingerprint(TELEMETRY_EMB_FILE) != _source_fp and not _reload_lock.locked():
+                threading.Thread(target=reload_telemetry_store, daemon=True).start()
+
+    return telemetry_store
+
+
+def telemetry_stats() -> Dict[str, Any]:
+    return {
+        "store": telemetry_store.stats(),
+        "reload": {
+            **_reload_stats,
+            "in_progress": _reload_lock.locked(),
+            "duration": reload_latency.stats(),
+        },
+    }
+
+
+def telemetry_query(
+    drivers: Optional[List[Any]] = None,
+    lap_min: Optional[int] = None,
+    lap_max: Optional[int] = None,
+    top_k: int = 5,
+    sessions: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top_k records by score over a lap window for several drivers
+    (drivers=None → whole field), e.g. laps 25-35 for 44 and 1, or the
+    top-5 pace-drop laps across the field. Each record gets "driver_id".
+    No fallback: an empty window returns [].
+    """
+    store = current_telemetry_store()
+    rows = store.select(drivers, lap_min, lap_max, sessions)
+    return store.records(store.top_k(rows, top_k), with_driver=True)
+
+
+def _lap_window(lap) -> Tuple[Optional[int], Optional[int]]:
+    lo, hi = (list(lap) + [None, None])[:2]
+    return (int(lo) if lo is not None else None), (int(hi) if hi is not None else None)
 
 
 def telemetry_retriever(driver_id, lap=None, top_k: int = 1):
@@ -37,18 +167,37 @@ def telemetry_retriever(driver_id, lap=None, top_k: int = 1):
 
     This is Sarah's GNN/telemetry output exposed in a simple way so that
     the planner (Albatool) can plug it into the QA / summary pipeline.
+
+    driver_id can also be a list of drivers and lap a [first, last] window;
+    those go through telemetry_query.
     """
-    hits = telemetry_index.get(str(driver_id), [])
+    if isinstance(driver_id, (list, tuple)) or isinstance(lap, (list, tuple)):
+        drivers = list(driver_id) if isinstance(driver_id, (list, tuple)) else (
+            None if driver_id is None else [driver_id]
+        )
+        if isinstance(lap, (list, tuple)):
+            lap_min, lap_max = _lap_window(lap)
+        else:
+            lap_min = lap_max = lap
+        return telemetry_query(drivers, lap_min, lap_max, top_k=top_k)
+
+    store = current_telemetry_store()
+    start, end = store.driver_rows(driver_id)
 
-    if not hits:
+    if start == end:
         return []
 
+    rows = np.arange(start, end)
+
     # Filter by lap if provided
     if lap is not None:
-        lap_hits = [h for h in hits if h.get("lap") == lap]
-        hits = lap_hits or hits  # fallback to all laps if there is no exact match
+        try:
+            lap_start, lap_end = store.lap_rows(driver_id, int(lap))
+        except (TypeError, ValueError):
+            lap_start = lap_end = 0
+        if lap_end > lap_start:
+            rows = np.arange(lap_start, lap_end)
+        # fallback to all laps if there is no exact match
 
     # Sort descending by score
-    sorted_hits = sorted(hits, key=lambda x: x.get("score", 1.0), reverse=True)
-
-    return sorted_hits[:top_k]
+    return store.records(store.top_k(rows, top_k))
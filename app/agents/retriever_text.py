@@ -2,8 +2,28 @@
 
 import os
 import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
 import numpy as np
 
+from . import bm25_index
+from .ann_index import IVFIndex, load_or_build, normalize_rows
+from .embedding_store import (
+    EMBED_DIM,
+    content_hash,
+    corpus_fingerprint,
+    stable_seed,
+    sync_embeddings,
+)
+from .passage_ingest import (
+    DeltaSegment,
+    PassageJournal,
+    apply_ops,
+    encode_embedding,
+    file_lock,
+)
+
 # ---- Config ----
 PASSAGES_FILE = os.path.join(
     os.path.dirname(__file__), "..", "models", "passages.json"
@@ -13,15 +33,34 @@ PASSAGES_FILE = os.path.join(
 _passages = None
 _passage_texts = None
 _passage_embs = None
+_embedding_stats = {"reused": 0, "embedded": 0}
+_passage_index = None
+_passage_bm25 = None
 
+# كم مرشح ناخذ من كل retriever قبل الدمج (RRF)
+FUSION_CANDIDATES = 50
 
-def _local_embed_one(text: str, dim: int = 64):
+# Live corpus = base (passages.json + saved indexes) + delta segment from the
+# journal. Queries read the whole tuple once, ingestion swaps it in one
+# assignment, so a query never sees a half-applied update.
+_corpus: Optional[Tuple[Any, ...]] = None
+_corpus_lock = threading.RLock()
+_journal_offset = 0
+_journal_inode: Optional[int] = None
+_base_stamp: Optional[Tuple[int, int]] = None
+_compacting = threading.Lock()
+_ingest_stats = {"added": 0, "deleted": 0, "compactions": 0}
+
+DEFAULT_COMPACT_AFTER = 1000
+
+
+def _local_embed_one(text: str, dim: int = EMBED_DIM):
     """
     Deterministic local 'embedding' used as a fallback.
-    Same text -> same vector.
+    Same text -> same vector, in every process (the seed is a content
+    hash, not Python's per-process randomized hash()).
     """
-    seed = abs(hash(text)) % (2**32)
-    rng = np.random.RandomState(seed)
+    rng = np.random.RandomState(stable_seed(text))
     return rng.normal(size=dim).astype("float32")
 
 
@@ -53,18 +92,31 @@ def google_embed(texts):
     return _local_embed(texts)
 
 
+def embeddings_file() -> str:
+    """
+    Binary float32 store next to passages.json
+    (override with PASSAGE_EMBEDDINGS_FILE).
+    """
+    default = os.path.join(os.path.dirname(PASSAGES_FILE), "passage_embeddings.npy")
+    return os.environ.get("PASSAGE_EMBEDDINGS_FILE", default)
+
+
 def load_passage_embeddings():
     """
-    Lazily load passages and compute embeddings once.
+    Lazily load passages and their embeddings.
+    Embeddings come from the memory-mapped store (embeddings_file());
+    only passages whose text changed since the last run are re-embedded.
     """
-    global _passages, _passage_texts, _passage_embs
+    global _passages, _passage_texts, _passage_embs, _embedding_stats
 
     if _passages is None:
         _passages = load_passages()
 
         if _passages:
             _passage_texts = [p["text"] for p in _passages]
-            _passage_embs = google_embed(_passage_texts)
+            _passage_embs, _embedding_stats = sync_embeddings(
+                _passage_texts, google_embed, embeddings_file()
+            )
         else:
             _passage_texts = []
             _passage_embs = np.zeros((0, 1), dtype="float32")
@@ -72,38 +124,431 @@ def load_passage_embeddings():
     return _passage_texts, _passage_embs, _passages
 
 
-def text_retriever(query: str, top_k: int = 3):
+def index_dir() -> str:
     """
-    Retrieve the top_k passages most similar to the query
-    using cosine similarity on embeddings.
+    Folder of the saved ANN index (override with PASSAGE_INDEX_DIR).
     """
-    passage_texts, passage_embs, passages = load_passage_embeddings()
+    default = os.path.join(os.path.dirname(PASSAGES_FILE), "passage_index")
+    return os.environ.get("PASSAGE_INDEX_DIR", default)
 
-    if passage_embs.shape[0] == 0:
-        return []
 
-    # Embed query
-    q_emb = google_embed([query])[0]
+def load_passage_index() -> IVFIndex:
+    """
+    Lazily load (or build + save) the ANN index over passage embeddings.
+    Small corpora get an exact index over the same pre-normalized vectors.
+    """
+    global _passage_index
+
+    if _passage_index is None:
+        passage_texts, passage_embs, _ = load_passage_embeddings()
+        if passage_texts:
+            _passage_index = load_or_build(
+                passage_embs, index_dir(), corpus_fingerprint(passage_texts)
+            )
+        else:
+            _passage_index = IVFIndex().build(np.zeros((0, EMBED_DIM), dtype="float32"))
+
+    return _passage_index
+
+
+def load_passage_bm25() -> bm25_index.BM25Index:
+    """
+    Lazily load (or build + save) the BM25 inverted index over passage texts.
+    """
+    global _passage_bm25
+
+    if _passage_bm25 is None:
+        passage_texts, _, _ = load_passage_embeddings()
+        folder = os.path.join(index_dir(), "bm25")
+        _passage_bm25 = bm25_index.load_or_build(
+            passage_texts, folder, corpus_fingerprint(passage_texts)
+        )
+
+    return _passage_bm25
+
+
+def reset_passage_cache():
+    """
+    Forget the loaded passages and indexes (next call reloads them from disk).
+    """
+    global _passages, _passage_texts, _passage_embs, _passage_index, _passage_bm25
+    global _corpus, _journal_offset, _journal_inode, _base_stamp
+
+    with _corpus_lock:
+        _passages = None
+        _passage_texts = None
+        _passage_embs = None
+        _passage_index = None
+        _passage_bm25 = None
+        _corpus = None
+        _journal_offset = 0
+        _journal_inode = None
+        _base_stamp = None
 
-    # Cosine similarity
-    passage_norms = np.linalg.norm(passage_embs, axis=1, keepdims=True) + 1e-8
-    q_norm = np.linalg.norm(q_emb) + 1e-8
 
-    passage_unit = passage_embs / passage_norms
-    q_unit = q_emb / q_norm
+# ==========================
+# Incremental ingestion
+# ==========================
 
-    sims = np.dot(passage_unit, q_unit)
+def journal_file() -> str:
+    return os.path.join(os.path.dirname(PASSAGES_FILE), "passages.journal.jsonl")
 
-    # Indices of top_k highest similarity
-    idx = np.argsort(-sims)[:top_k]
 
-    results = [
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _current_corpus() -> Tuple[Any, ...]:
+    """
+    (texts, embs, passages, index, bm25, delta) of the live corpus.
+    Also picks up journal ops / compactions written by other workers.
+    """
+    corpus = _corpus
+    # أثناء الـ compaction نخدم من النسخة الحالية بدون ما ننتظر
+    if corpus is not None and _compacting.locked():
+        return corpus
+    return _refresh_corpus()
+
+
+def _refresh_corpus() -> Tuple[Any, ...]:
+    global _corpus, _journal_offset, _journal_inode, _base_stamp
+
+    if _corpus is not None:
+        stamp_changed = _file_stamp(PASSAGES_FILE) != _base_stamp
+        inode, size = PassageJournal(journal_file()).stamp()
+        # journal جديد (rotate من worker ثاني) → الـ offset القديم ما له معنى
+        rotated = inode != _journal_inode and _journal_offset > 0
+        if not stamp_changed and not rotated and size == _journal_offset:
+            return _corpus
+        if stamp_changed or rotated or size < _journal_offset:
+            reset_passage_cache()
+        else:
+            _follow_journal()
+            return _corpus
+
+    with _corpus_lock:
+        if _corpus is None:
+            _base_stamp = _file_stamp(PASSAGES_FILE)
+            texts, embs, passages = load_passage_embeddings()
+            index = load_passage_index()
+            bm25 = load_passage_bm25()
+
+            # ops اللي تحت الـ compaction (لو فيه) ثم الـ journal الحالي
+            journal = PassageJournal(journal_file())
+            ops, _journal_offset, _journal_inode = journal.read_from(0)
+            delta = apply_ops(_base_delta(texts, embs), journal.read_rotated() + ops)
+            _corpus = (texts, embs, passages, index, bm25, delta)
+
+        return _corpus
+
+
+def _base_delta(texts: List[str], embs: np.ndarray) -> DeltaSegment:
+    dim = embs.shape[1] if len(texts) else EMBED_DIM
+    return DeltaSegment([content_hash(t) for t in texts], dim=dim)
+
+
+def _follow_journal():
+    """
+    Apply journal ops appended since the last read (ours or another worker's).
+    """
+    global _corpus, _journal_offset, _journal_inode
+
+    with _corpus_lock:
+        if _corpus is None:
+            return
+        ops, offset, inode = PassageJournal(journal_file()).read_from(_journal_offset)
+        if inode != _journal_inode and _journal_offset > 0:
+            # انعمل rotate بين الـ stat والقراءة: الـ refresh الجاي يعيد التحميل
+            return
+        if ops:
+            delta = apply_ops(_corpus[5], ops)
+            _corpus = _corpus[:5] + (delta,)
+        _journal_offset, _journal_inode = offset, inode
+
+
+def add_passages(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Append passages ({"text": ..., "source": ...}) to the live corpus.
+    They are embedded once, written to the journal and searchable right
+    away; compaction later folds them into passages.json and the indexes.
+    Returns the passage ids (content hashes).
+    """
+    passages = [dict(p) for p in items if isinstance(p.get("text"), str) and p["text"].strip()]
+    if not passages:
+        return []
+
+    embs = google_embed([p["text"] for p in passages])
+    ops = [
         {
-            "text": passage_texts[i],
-            "score": float(sims[i]),
-            "source": passages[i].get("source"),
+            "op": "add",
+            "id": content_hash(p["text"]),
+            "passage": p,
+            "emb": encode_embedding(e),
         }
-        for i in idx
+        for p, e in zip(passages, embs)
     ]
 
+    _current_corpus()
+    with _corpus_lock:
+        PassageJournal(journal_file()).append(ops)
+        _follow_journal()
+        _ingest_stats["added"] += len(ops)
+
+    _maybe_compact()
+    return [op["id"] for op in ops]
+
+
+def delete_passages(ids: List[str]) -> int:
+    """
+    Tombstone passages by id (content hash). Returns how many were live.
+    """
+    with _corpus_lock:
+        before = _current_corpus()[5]
+        PassageJournal(journal_file()).append([{"op": "delete", "ids": list(ids)}])
+        _follow_journal()
+        removed = _corpus[5].tombstones - before.tombstones
+        _ingest_stats["deleted"] += removed
+
+    _maybe_compact()
+    return removed
+
+
+def _maybe_compact():
+    limit = int(os.environ.get("PASSAGE_COMPACT_AFTER", DEFAULT_COMPACT_AFTER))
+    delta = _current_corpus()[5]
+    if limit > 0 and len(delta) + delta.tombstones >= limit and not _compacting.locked():
+        threading.Thread(target=compact_passages, daemon=True).start()
+
+
+def compact_passages() -> Dict[str, Any]:
+    """
+    Fold the delta segment into the base: rewrite passages.json without
+    tombstoned passages, update the embedding store (nothing is re-embedded),
+    rebuild the ANN + BM25 indexes, then swap the live corpus.
+
+    The journal is rotated first (PassageJournal.rotate) and only the
+    rotated ops are compacted: ops appended meanwhile, by this or another
+    worker, land in the fresh journal and are replayed on the new base.
+    The rebuild runs outside _corpus_lock, so queries and ingestion carry on
+    against the old corpus until the swap.
+    """
+    global _passages, _passage_texts, _passage_embs, _passage_index, _passage_bm25
+    global _corpus, _journal_offset, _journal_inode, _base_stamp
+
+    journal = PassageJournal(journal_file())
+
+    with _compacting, file_lock(journal.compact_lock_path):
+        # worker ثاني ممكن كمّل compaction قبلنا: نبدأ من الـ base اللي على الديسك
+        _refresh_corpus()
+        with _corpus_lock:
+            _follow_journal()
+            journal.rotate()
+            # الـ corpus الحالي فيه كل الـ ops اللي انقلبت؛ الجديدة تبدأ من 0
+            _journal_offset, _journal_inode = 0, None
+            texts, embs, passages = _corpus[:3]
+
+        delta = apply_ops(_base_delta(texts, embs), journal.read_rotated())
+
+        keep = [passages[i] for i in np.flatnonzero(~delta.base_deleted)]
+        keep += [delta.passages[j] for j in np.flatnonzero(~delta.delta_deleted)]
+        new_texts = [p["text"] for p in keep]
+
+        tmp = f"{PASSAGES_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(keep, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, PASSAGES_FILE)
+
+        def embed(batch: List[str]) -> np.ndarray:
+            rows = [delta.delta_rows.get(content_hash(t)) for t in batch]
+            if all(r is not None for r in rows):
+                return delta.embs[rows]
+            return google_embed(batch)
+
+        if keep:
+            new_embs, _ = sync_embeddings(new_texts, embed, embeddings_file())
+            fingerprint = corpus_fingerprint(new_texts)
+            new_index = load_or_build(new_embs, index_dir(), fingerprint)
+            new_bm25 = bm25_index.load_or_build(
+                new_texts, os.path.join(index_dir(), "bm25"), fingerprint
+            )
+        else:
+            new_embs = np.zeros((0, EMBED_DIM), dtype="float32")
+            new_index = IVFIndex().build(new_embs)
+            new_bm25 = bm25_index.BM25Index().build([])
+
+        with _corpus_lock:
+            ops, offset, inode = journal.read_from(0)
+            _passages, _passage_texts, _passage_embs = keep, new_texts, new_embs
+            _passage_index, _passage_bm25 = new_index, new_bm25
+            new_delta = apply_ops(_base_delta(new_texts, new_embs), ops)
+            _corpus = (new_texts, new_embs, keep, new_index, new_bm25, new_delta)
+            _journal_offset, _journal_inode = offset, inode
+            _base_stamp = _file_stamp(PASSAGES_FILE)
+            _ingest_stats["compactions"] += 1
+
+        # بعد ما صار الـ base الجديد على الديسك (إعادة تشغيلها عليه ما تغير شي)
+        journal.drop_rotated()
+
+        return {"passages": len(keep), "removed": delta.tombstones, "merged": len(delta)}
+
+
+def corpus_stats() -> Dict[str, Any]:
+    texts, _, _, index, _, delta = _current_corpus()
+    return {
+        "base_passages": len(texts),
+        "delta_passages": len(delta),
+        "tombstones": delta.tombstones,
+        "live_passages": len(texts) + len(delta) - delta.tombstones,
+        "journal_bytes": PassageJournal(journal_file()).size(),
+        "index": index.stats(),
+        **_ingest_stats,
+    }
+
+
+def text_retriever(query: str, top_k: int = 3):
+    """
+    Retrieve the top_k passages for the query (hybrid search):
+    - vector: cosine similarity on embeddings (ANN index, see ann_index.py)
+    - lexical: BM25 on the inverted index (driver names, lap numbers, compounds)
+    The two rankings are merged with reciprocal rank fusion.
+
+    "score" stays the cosine similarity (used as confidence downstream);
+    "bm25_score" and "rrf_score" are added for inspection.
+    """
+    return text_retriever_batch([query], top_k=top_k)[0]
+
+
+def text_retriever_batch(queries: List[str], top_k: int = 3) -> List[List[Dict[str, Any]]]:
+    """
+    text_retriever for many queries: all queries are embedded together and
+    the vector search is one matmul + a row-wise argpartition.
+    Returns one result list per query with the same passages in the same
+    order as text_retriever(query).
+
+    Passages added through add_passages (delta segment) are searched exactly
+    next to the base index; tombstoned passages are filtered out.
+    """
+    if not queries:
+        return []
+
+    passage_texts, passage_embs, passages, index, bm25, delta = _current_corpus()
+    n_base = index.size
+
+    if n_base + len(delta) - delta.tombstones <= 0:
+        return [[] for _ in queries]
+
+    n_candidates = max(top_k, FUSION_CANDIDATES)
+    # نطلب زيادة بعدد المحذوفات عشان الفلترة ما تنقص النتائج
+    n_fetch = n_candidates + delta.base_tombstones
+
+    # Embed queries
+    q_embs = google_embed(list(queries))
+    vec_ids, vec_scores = index.search_batch(q_embs, n_fetch)
+
+    delta_ids = delta_scores = None
+    if len(delta):
+        delta_ids = np.arange(len(delta), dtype=np.int64)
+        delta_scores = normalize_rows(q_embs) @ delta.unit.T
+
+    out = []
+    for row, query in enumerate(queries):
+        v_ids, v_scores = _merge(
+            vec_ids[row],
+            vec_scores[row],
+            delta_ids,
+            delta_scores[row] if delta_scores is not None else None,
+            delta,
+            n_base,
+            n_candidates,
+        )
+
+        b_ids, b_scores = bm25.search(query, n_fetch)
+        d_ids = d_scores = None
+        if delta.bm25 is not None:
+            d_ids, d_scores = delta.bm25.search(query, n_candidates)
+        b_ids, b_scores = _merge(b_ids, b_scores, d_ids, d_scores, delta, n_base, n_candidates)
+
+        out.append(
+            _fuse(
+                q_embs[row],
+                v_ids,
+                v_scores,
+                b_ids,
+                b_scores,
+                top_k,
+                lambda i: _passage_at(i, passages, delta, n_base),
+                lambda rows: _embs_at(rows, passage_embs, delta, n_base),
+            )
+        )
+
+    return out
+
+
+def _live(ids: np.ndarray, delta: DeltaSegment) -> np.ndarray:
+    """
+    Boolean mask of global ids (base rows first, then delta rows) that are not tombstoned.
+    """
+    if not delta.tombstones:
+        return np.ones(len(ids), dtype=bool)
+    return ~delta.dead[ids]
+
+
+def _merge(base_ids, base_scores, delta_ids, delta_scores, delta, n_base, n_candidates):
+    """
+    Merge base + delta candidates (delta ids are local to the segment),
+    drop tombstoned ones and keep the best n_candidates by score.
+    """
+    ids, scores = base_ids, base_scores
+    if delta_ids is not None and len(delta_ids):
+        ids = np.concatenate([ids, n_base + np.asarray(delta_ids, dtype=np.int64)])
+        scores = np.concatenate([scores, np.asarray(delta_scores, dtype=np.float32)])
+        order = np.argsort(-scores, kind="stable")
+        ids, scores = ids[order], scores[order]
+    keep = _live(ids, delta)
+    return ids[keep][:n_candidates], scores[keep][:n_candidates]
+
+
+def _passage_at(i: int, passages, delta: DeltaSegment, n_base: int) -> Dict[str, Any]:
+    return passages[i] if i < n_base else delta.passages[i - n_base]
+
+
+def _embs_at(rows: List[int], passage_embs, delta: DeltaSegment, n_base: int) -> np.ndarray:
+    return np.stack(
+        [
+            np.asarray(passage_embs[i] if i < n_base else delta.embs[i - n_base], dtype="float32")
+            for i in rows
+        ]
+    )
+
+
+def _fuse(q_emb, vec_ids, vec_scores, bm25_ids, bm25_scores, top_k, passage_of, embs_of) -> List[Dict[str, Any]]:
+    fused = bm25_index.reciprocal_rank_fusion([vec_ids, bm25_ids])
+    best = sorted(fused, key=lambda i: (-fused[i], i))[:top_k]
+
+    cosine = dict(zip(vec_ids.tolist(), vec_scores.tolist()))
+    bm25 = dict(zip(bm25_ids.tolist(), bm25_scores.tolist()))
+    missing = [i for i in best if i not in cosine]
+    if missing:
+        rows = embs_of(missing)
+        q_unit = q_emb / (np.linalg.norm(q_emb) + 1e-8)
+        sims = rows @ q_unit / (np.linalg.norm(rows, axis=1) + 1e-8)
+        cosine.update(zip(missing, sims.tolist()))
+
+    results = []
+    for i in best:
+        passage = passage_of(i)
+        results.append(
+            {
+                "id": content_hash(passage["text"]),
+                "text": passage["text"],
+                "score": float(cosine[i]),
+                "bm25_score": float(bm25.get(i, 0.0)),
+                "rrf_score": float(fused[i]),
+                "source": passage.get("source"),
+            }
+        )
     return results
@@ -0,0 +1,92 @@
+# app/agents/singleflight.py
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a call for `key` is in flight, later callers
+    with the same key wait for that result instead of starting their own.
+
+    - do(key, fn)         → for threads (sync code)
+    - ado(key, coro_fn)   → for asyncio (one task per key per event loop)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._acalls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                fut = Future()
+                self._calls[key] = fut
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            calls = self._acalls.setdefault(loop, {})
+            task = calls.get(key)
+            if task is not None:
+                self.coalesced += 1
+            else:
+                task = loop.create_task(coro_fn())
+                calls[key] = task
+                self.leaders += 1
+                task.add_done_callback(lambda _t, k=key: self._forget(calls, k))
+
+        # shield: لو واحد من المنتظرين انلغى، الطلب الأصلي يكمل للباقين
+        return await asyncio.shield(task)
+
+    def _forget(self, calls: Dict[Hashable, asyncio.Task], key: Hashable):
+        with self._lock:
+            calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + sum(len(c) for c in self._acalls.values())
+
+    def reset(self):
+        with self._lock:
+            self.leaders = 0
+            self.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight = self.in_flight()
+        with self._lock:
+            return {
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced,  # upstream calls saved
+                "in_flight": in_flight,
+            }
@@ -1,21 +1,66 @@
 # app/agents/summarizer.py
 
 import os
-import json
-import requests
+import time
+from typing import Any, AsyncIterator, Callable, Dict
+
 from dotenv import load_dotenv
 
+from .llm_client import post_json_hedged, apost_json_hedged, astream_json
+from .llm_cache import get_cache, make_cache_key
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+
 # نتأكد إن .env مقروء هنا أيضاً
 load_dotenv()
 
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
 
+SYSTEM_PROMPT = (
+    "You are a helpful assistant and Formula 1 race engineer. "
+    "Answer clearly and concisely."
+)
+LLM_TEMPERATURE = 0.2
+
+# Identical prompts that are already in flight share one upstream call
+llm_flight = SingleFlight()
+
+# لما الـ LLM طايح نرجع للـ offline مباشرة بدل ما ننتظر الـ timeout
+llm_breaker = CircuitBreaker.from_env()
+
+
+def _build_chat_body(prompt: str, max_tokens: int) -> Dict[str, Any]:
+    """
+    Chat Completions request body shared by every LLM call.
+    """
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "max_tokens": max_tokens,
+        "temperature": LLM_TEMPERATURE,
+    }
+
+
+def _cache_key(prompt: str, max_tokens: int) -> str:
+    return make_cache_key(OPENAI_MODEL, SYSTEM_PROMPT, prompt, max_tokens, LLM_TEMPERATURE)
+
 
 def call_llm_system(prompt: str, max_tokens: int = 250) -> str:
     """
     Calls the OpenAI Chat Completions API (gpt-4o-mini by default)
     to generate a response to the given prompt.
 
+    Requests go through the pooled keep-alive session in llm_client,
+    so repeated calls reuse the same TCP/TLS connection.
+    Successful answers are cached (llm_cache) keyed on the prompt hash;
+    local fallback strings are never cached. Concurrent identical prompts
+    are coalesced into one upstream request (llm_flight), which may be
+    hedged after the running p95 (LLM_HEDGE_ENABLED). While the circuit
+    breaker (llm_breaker) is open the fallback is returned immediately.
+
     If the API call fails for any reason, it returns a safe local
     fallback string so that the rest of the app does not crash.
     """
@@ -27,40 +72,170 @@ def call_llm_system(prompt: str, max_tokens: int = 250) -> str:
         print("WARNING: OPENAI_API_KEY is missing, using local fallback.")
         return "[Local fallback answer] " + prompt[:300]
 
-    url = "https://api.openai.com/v1/chat/completions"
+    cache = get_cache()
+    key = _cache_key(prompt, max_tokens)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
+    body = _build_chat_body(prompt, max_tokens)
 
-    body = {
-        "model": OPENAI_MODEL,
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a helpful assistant and Formula 1 race engineer. "
-                    "Answer clearly and concisely."
-                ),
-            },
-            {"role": "user", "content": prompt},
-        ],
-        "max_tokens": max_tokens,
-        "temperature": 0.2,
-    }
+    def _fetch() -> str:
+        llm_breaker.check()
+        t0 = time.perf_counter()
+        try:
+            data = post_json_hedged("chat/completions", body, api_key)
+            answer = data["choices"][0]["message"]["content"]
+        except Exception:
+            llm_breaker.record_failure(time.perf_counter() - t0)
+            raise
+        llm_breaker.record_success(time.perf_counter() - t0)
+
+        if cache is not None:
+            cache.set(key, answer)
+        return answer
 
     try:
-        resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"]
+        return llm_flight.do(key, _fetch)
+
+    except CircuitOpenError:
+        return "[Local fallback answer] " + prompt[:300]
 
     except Exception as e:
         print("WARNING: OpenAI LLM failed, using local fallback answer:", e)
         return "[Local fallback answer] " + prompt[:300]
 
 
+async def acall_llm_system(prompt: str, max_tokens: int = 250) -> str:
+    """
+    asyncio-native version of call_llm_system.
+    The request is awaited on the shared AsyncClient, so a single worker
+    can keep hundreds of LLM calls in flight (bounded by LLM_MAX_IN_FLIGHT).
+    Same cache, circuit breaker and local fallback behaviour as the sync version
+    (the cache is read and written with aget/aset, so the SQLite tier runs
+    off the event loop).
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+
+    if not api_key:
+        print("WARNING: OPENAI_API_KEY is missing, using local fallback.")
+        return "[Local fallback answer] " + prompt[:300]
+
+    cache = get_cache()
+    key = _cache_key(prompt, max_tokens)
+    if cache is not None:
+        # الـ SQLite tier يشتغل في thread عشان ما يوقف الـ event loop
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+
+    body = _build_chat_body(prompt, max_tokens)
+
+    async def _fetch() -> str:
+        llm_breaker.check()
+        t0 = time.perf_counter()
+        try:
+            data = await apost_json_hedged("chat/completions", body, api_key)
+            answer = data["choices"][0]["message"]["content"]
+        except Exception:
+            llm_breaker.record_failure(time.perf_counter() - t0)
+            raise
+        llm_breaker.record_success(time.perf_counter() - t0)
+
+        if cache is not None:
+            await cache.aset(key, answer)
+        return answer
+
+    try:
+        return await llm_flight.ado(key, _fetch)
+
+    except CircuitOpenError:
+        return "[Local fallback answer] " + prompt[:300]
+
+    except Exception as e:
+        print("WARNING: OpenAI LLM failed, using local fallback answer:", e)
+        return "[Local fallback answer] " + prompt[:300]
+
+
+async def astream_llm_system(prompt: str, max_tokens: int = 250) -> AsyncIterator[str]:
+    """
+    Streaming version of acall_llm_system: yields the answer in pieces as the
+    tokens arrive (stream=True), so the caller can forward them right away.
+    A cached answer is yielded in one piece; on failure before the first
+    token the local fallback string is yielded instead.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY")
+
+    if not api_key:
+        print("WARNING: OPENAI_API_KEY is missing, using local fallback.")
+        yield "[Local fallback answer] " + prompt[:300]
+        return
+
+    cache = get_cache()
+    key = _cache_key(prompt, max_tokens)
+    if cache is not None:
+        cached = await cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+
+    if not llm_breaker.allow_request():
+        yield "[Local fallback answer] " + prompt[:300]
+        return
+
+    body = _build_chat_body(prompt, max_tokens)
+    body["stream"] = True
+    parts = []
+    t0 = time.perf_counter()
+    recorded = False
+
+    try:
+        try:
+            async for event in astream_json("chat/completions", body, api_key):
+                choices = event.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        except Exception as e:
+            llm_breaker.record_failure(time.perf_counter() - t0)
+            recorded = True
+            print("WARNING: OpenAI LLM stream failed:", e)
+            if not parts:
+                yield "[Local fallback answer] " + prompt[:300]
+            return
+
+        llm_breaker.record_success(time.perf_counter() - t0)
+        recorded = True
+        if cache is not None and parts:
+            await cache.aset(key, "".join(parts))
+
+    finally:
+        # العميل قطع (GeneratorExit / CancelledError) قبل أي نتيجة: نرجع خانة الـ probe
+        if not recorded:
+            llm_breaker.release()
+
+
+async def astream_llm_text(
+    prompt: str,
+    fallback: Callable[[], str],
+    max_tokens: int = 250,
+) -> AsyncIterator[str]:
+    """
+    astream_llm_system for agents: when the LLM is unavailable the offline
+    answer from fallback() is yielded instead of the "[Local fallback answer]" tag.
+    """
+    first = True
+    async for piece in astream_llm_system(prompt, max_tokens):
+        if first and piece.startswith("[Local fallback answer]"):
+            yield fallback()
+            return
+        first = False
+        yield piece
+
+
 def summarize_evidence(evidence_list, language: str = "en") -> str:
     """
     Produces a short summary of provided evidence using OpenAI
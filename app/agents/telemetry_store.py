@@ -0,0 +1,300 @@
+# app/agents/telemetry_store.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .versioned_dir import commit_meta, load_versioned, write_arrays
+
+COLUMNS = ("driver", "session", "lap", "score", "order", "key", "payload_offsets", "payload")
+
+# يتغير لما تتغير الأعمدة المحفوظة (store قديم ينبني من جديد)
+STORE_VERSION = 2
+
+# lap مفقود في الـ record (ملخص للسباق كامل مثلاً)
+NO_LAP = -1
+
+
+class TelemetryStore:
+    """
+    Columnar telemetry records, sorted by (driver, lap, session):
+
+    - driver / session: int32 codes into self.drivers / self.sessions
+    - lap:              int32 (NO_LAP when the record has no lap)
+    - score:            float32
+    - order:            int32 position of the record in its driver's source list
+                        (ties in score keep the source order, like sorted())
+    - driver_offsets:   rows of driver d are driver_offsets[d]:driver_offsets[d+1]
+    - key:              int64 (driver << 32) | (lap - NO_LAP), globally sorted,
+                        so lap windows of many drivers are one searchsorted call
+    - payload:          the original records as UTF-8 JSON bytes, sliced by
+                        payload_offsets and decoded only for returned rows
+
+    Exact lap and lap-range lookups are a binary search inside the driver's
+    slice; top-k by score is an argpartition over the matching rows.
+    """
+
+    def __init__(self):
+        self.drivers: List[str] = []
+        self.sessions: List[str] = []
+        self.driver_code: Dict[str, int] = {}
+        self.driver = np.zeros(0, dtype=np.int32)
+        self.session = np.zeros(0, dtype=np.int32)
+        self.lap = np.zeros(0, dtype=np.int32)
+        self.score = np.zeros(0, dtype=np.float32)
+        self.order = np.zeros(0, dtype=np.int32)
+        self.key = np.zeros(0, dtype=np.int64)
+        self.driver_offsets = np.zeros(1, dtype=np.int64)
+        self.payload_offsets = np.zeros(1, dtype=np.int64)
+        self.payload = np.zeros(0, dtype=np.uint8)
+        self.meta: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return int(self.lap.shape[0])
+
+    @classmethod
+    def from_records(cls, index: Dict[str, List[Dict[str, Any]]]) -> "TelemetryStore":
+        """
+        Build from the JSON layout {"44": [{"lap": 30, "meta": {...}, "score": 0.9}, ...]}.
+        """
+        grouped = {str(d): records or [] for d, records in index.items()}
+        store = cls()
+        store.drivers = sorted(grouped)
+        sessions: Dict[str, int] = {}
+
+        driver_col, session_col, lap_col, score_col, order_col, blobs = [], [], [], [], [], []
+        for code, driver in enumerate(store.drivers):
+            for pos, record in enumerate(grouped[driver]):
+                lap = record.get("lap")
+                driver_col.append(code)
+                session_col.append(sessions.setdefault(str(record.get("session", "")), len(sessions)))
+                lap_col.append(int(lap) if lap is not None else NO_LAP)
+                score_col.append(float(record.get("score", 1.0)))
+                order_col.append(pos)
+                blobs.append(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+        store.sessions = list(sessions)
+        driver = np.array(driver_col, dtype=np.int32)
+        session = np.array(session_col, dtype=np.int32)
+        lap = np.array(lap_col, dtype=np.int32)
+        rows = np.lexsort((np.array(order_col, dtype=np.int32), session, lap, driver))
+
+        store.driver = driver[rows]
+        store.session = session[rows]
+        store.lap = lap[rows]
+        store.score = np.array(score_col, dtype=np.float32)[rows]
+        store.order = np.array(order_col, dtype=np.int32)[rows]
+        store.key = _row_key(store.driver, store.lap)
+        store.driver_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(store.driver, minlength=len(store.drivers))))
+        ).astype(np.int64)
+
+        sizes = np.array([len(blobs[i]) for i in rows], dtype=np.int64)
+        store.payload_offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        store.payload = np.frombuffer(b"".join(blobs[i] for i in rows), dtype=np.uint8)
+        store._index_drivers()
+        return store
+
+    def _index_drivers(self):
+        self.driver_code = {d: i for i, d in enumerate(self.drivers)}
+
+    # ---------- lookups (row numbers) ----------
+
+    def driver_rows(self, driver_id) -> Tuple[int, int]:
+        """(start, end) rows of one driver; (0, 0) if unknown."""
+        code = self.driver_code.get(str(driver_id))
+        if code is None:
+            return 0, 0
+        return int(self.driver_offsets[code]), int(self.driver_offsets[code + 1])
+
+    def lap_rows(self, driver_id, lap_min: int, lap_max: Optional[int] = None) -> Tuple[int, int]:
+        """
+        (start, end) rows of a driver with lap_min <= lap <= lap_max
+        (lap_max defaults to lap_min: exact lap).
+        """
+        start, end = self.driver_rows(driver_id)
+        if lap_max is None:
+            lap_max = lap_min
+        laps = self.lap[start:end]
+        lo = int(np.searchsorted(laps, lap_min, side="left"))
+        hi = int(np.searchsorted(laps, lap_max, side="right"))
+        return start + lo, start + max(lo, hi)
+
+    def select(
+        self,
+        drivers: Optional[List[Any]] = None,
+        lap_min: Optional[int] = None,
+        lap_max: Optional[int] = None,
+        sessions: Optional[List[str]] = None,
+    ) -> np.ndarray:
+        """
+        Rows of `drivers` (None = whole field) with lap_min <= lap <= lap_max
+        (None = open end), optionally restricted to `sessions`.
+        All drivers are resolved with one vectorized searchsorted on `key`.
+        """
+        if drivers is None:
+            codes = np.arange(len(self.drivers), dtype=np.int64)
+        else:
+            codes = np.array(
+                sorted({self.driver_code[str(d)] for d in drivers if str(d) in self.driver_code}),
+                dtype=np.int64,
+            )
+
+        if lap_min is None and lap_max is None:
+            starts = self.driver_offsets[codes]
+            ends = self.driver_offsets[codes + 1]
+        else:
+            # window ما يشمل الـ records اللي بدون lap
+            lo = 0 if lap_min is None else max(int(lap_min), 0)
+            hi = np.iinfo(np.int32).max if lap_max is None else int(lap_max)
+            if hi < lo:
+                return np.zeros(0, dtype=np.int64)
+            starts = np.searchsorted(self.key, _row_key(codes, lo), side="left")
+            ends = np.searchsorted(self.key, _row_key(codes, hi), side="right")
+
+        rows = _ranges(starts, ends)
+        if sessions is not None:
+            names = {str(name) for name in sessions}
+            wanted = [i for i, name in enumerate(self.sessions) if name in names]
+            rows = rows[np.isin(self.session[rows], wanted)]
+        return rows
+
+    def top_k(self, rows: np.ndarray, k: int) -> np.ndarray:
+        """
+        The k rows with the highest score (ties: source order), best first.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(max(k, 0), rows.shape[0])
+        if k == 0:
+            return rows[:0]
+        scores = self.score[rows]
+        if k < rows.shape[0]:
+            # كل الصفوف اللي تساوي الحد الأدنى تدخل عشان ترتيب التعادل يكون ثابت
+            kth = np.partition(-scores, k - 1)[k - 1]
+            rows = rows[-scores <= kth]
+            scores = self.score[rows]
+        best = np.lexsort((rows, self.order[rows], -scores))
+        return rows[best][:k]
+
+    def records(self, rows: np.ndarray, with_driver: bool = False) -> List[Dict[str, Any]]:
+        """
+        Decode the original records of `rows` (with_driver adds "driver_id").
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.payload_offsets[rows].tolist()
+        ends = self.payload_offsets[rows + 1].tolist()
+        out = [json.loads(bytes(self.payload[a:b]).decode("utf-8")) for a, b in zip(starts, ends)]
+        if with_driver:
+            for record, code in zip(out, self.driver[rows].tolist()):
+                record.setdefault("driver_id", self.drivers[code])
+        return out
+
+    # ---------- persistence ----------
+
+    def save(self, folder: str, fingerprint: str = ""):
+        """
+        Columns go to a new version folder; meta.json is swapped last and
+        names it, so a reader never pairs columns from two builds.
+        """
+        os.makedirs(folder, exist_ok=True)
+        version = write_arrays(
+            folder, {name: getattr(self, name) for name in COLUMNS + ("driver_offsets",)}
+        )
+        self.meta = commit_meta(
+            folder,
+            {
+                "version": STORE_VERSION,
+                "fingerprint": fingerprint,
+                "records": len(self),
+                "drivers": self.drivers,
+                "sessions": self.sessions,
+            },
+            version,
+        )
+
+    @classmethod
+    def load(cls, folder: str) -> "TelemetryStore":
+        return load_versioned(folder, cls._load_files)
+
+    @classmethod
+    def _load_files(cls, meta: Dict[str, Any], path: str) -> "TelemetryStore":
+        store = cls()
+        store.drivers = meta["drivers"]
+        store.sessions = meta["sessions"]
+        store.driver_offsets = np.load(os.path.join(path, "driver_offsets.npy"))
+        for name in COLUMNS:
+            setattr(store, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        if (
+            meta.get("version") != STORE_VERSION
+            or len(store.driver_offsets) != len(store.drivers) + 1
+            or len(store.driver) != meta["records"]
+        ):
+            raise ValueError("telemetry store does not match its meta.json")
+        store.meta = meta
+        store._index_drivers()
+        return store
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self),
+            "drivers": len(self.drivers),
+            "sessions": len(self.sessions),
+            "payload_bytes": int(self.payload.shape[0]),
+        }
+
+
+def _row_key(driver, lap) -> np.ndarray:
+    driver = np.asarray(driver, dtype=np.int64)
+    lap = np.asarray(lap, dtype=np.int64)
+    return (driver << 32) | (lap - NO_LAP)
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Concatenation of arange(s, e) for every (s, e) pair, without a Python loop.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.maximum(np.asarray(ends, dtype=np.int64) - starts, 0)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    # كل صف = بداية الـ range تبعه + موقعه داخله
+    first = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return first + np.arange(total, dtype=np.int64)
+
+
+def source_fingerprint(path: str) -> str:
+    """
+    Cheap identity of the source JSON (size + mtime), so a restart does
+    not re-parse it when the binary store is already up to date.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ""
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def load_or_build(source_path: str, folder: str, read_source) -> TelemetryStore:
+    """
+    Load the binary store if it was built from the current source file,
+    else read the source (read_source() → dict), build and save the store.
+    """
+    fingerprint = source_fingerprint(source_path)
+    if fingerprint and os.path.exists(os.path.join(folder, "meta.json")):
+        try:
+            store = TelemetryStore.load(folder)
+            if store.meta.get("fingerprint") == fingerprint:
+                return store
+        except (OSError, ValueError, KeyError):
+            pass
+
+    store = TelemetryStore.from_records(read_source())
+    if fingerprint:
+        try:
+            store.save(folder, fingerprint)
+        except OSError as e:
+            print("WARNING: could not save telemetry store:", e)
+    return store
@@ -0,0 +1,76 @@
+# app/agents/versioned_dir.py
+
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Dict, TypeVar
+
+import numpy as np
+
+# مفتاح في meta.json باسم مجلد النسخة اللي فيها الـ arrays
+DATA_KEY = "data"
+
+T = TypeVar("T")
+
+
+def write_arrays(folder: str, arrays: Dict[str, np.ndarray]) -> str:
+    """
+    Save `arrays` as <folder>/<version>/<name>.npy in a new version folder
+    and return the version name. Nothing reads it until commit_meta() names it.
+    """
+    version = f"v-{uuid.uuid4().hex[:12]}"
+    path = os.path.join(folder, version)
+    os.makedirs(path)
+    for name, array in arrays.items():
+        with open(os.path.join(path, f"{name}.npy"), "wb") as f:
+            np.save(f, array)
+    return version
+
+
+def read_meta(folder: str) -> Dict[str, Any]:
+    with open(os.path.join(folder, "meta.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def data_dir(folder: str, meta: Dict[str, Any]) -> str:
+    # stores saved before versioned folders keep their arrays next to meta.json
+    version = meta.get(DATA_KEY)
+    return os.path.join(folder, version) if version else folder
+
+
+def commit_meta(folder: str, meta: Dict[str, Any], version: str) -> Dict[str, Any]:
+    """
+    Point meta.json at `version` (one os.replace: readers see the old
+    build or the new one, never a mix), then remove the previous version
+    folder. Returns the meta that was written.
+    """
+    try:
+        old = read_meta(folder).get(DATA_KEY)
+    except (OSError, ValueError):
+        old = None
+
+    meta = {**meta, DATA_KEY: version}
+    tmp = os.path.join(folder, f"meta.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(folder, "meta.json"))
+
+    if old and old != version:
+        # workers that already mapped the old arrays keep their pages (POSIX);
+        # على Windows الملفات المفتوحة ما تنحذف وتبقى بدون ما ننقراها
+        shutil.rmtree(os.path.join(folder, old), ignore_errors=True)
+    return meta
+
+
+def load_versioned(folder: str, load: Callable[[Dict[str, Any], str], T]) -> T:
+    """
+    load(meta, data folder) for the build meta.json names. Retried once if
+    the folder disappeared in between (a newer build was committed).
+    """
+    meta = read_meta(folder)
+    try:
+        return load(meta, data_dir(folder, meta))
+    except FileNotFoundError:
+        meta = read_meta(folder)
+        return load(meta, data_dir(folder, meta))
@@ -0,0 +1,83 @@
+# app/benchmark_retrieval.py
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.agents.ann_index import IVFIndex, QUANTIZATIONS, exact_search_batch, normalize_rows
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int = 0):
+    """
+    Clustered vectors (closer to real embeddings than pure noise) + queries
+    drawn near random corpus points.
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(max(n // 500, 1), dim)).astype(np.float32)
+    labels = rng.randint(len(centers), size=n)
+    vectors = centers[labels] + 1.0 * rng.normal(size=(n, dim)).astype(np.float32)
+    picks = rng.randint(n, size=n_queries)
+    queries = vectors[picks] + 0.5 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def run_benchmark(
+    n: int = 200_000,
+    dim: int = 64,
+    n_queries: int = 200,
+    k: int = 10,
+    index_mode: str = "ivf",
+) -> List[Dict[str, Any]]:
+    """
+    Build one index per quantization mode and report, side by side:
+    search-matrix memory, recall@k against exact float32 search, and latency.
+    """
+    vectors, queries = synthetic_corpus(n, dim, n_queries)
+    truth, _ = exact_search_batch(normalize_rows(vectors), queries, k)
+    exact_threshold = n + 1 if index_mode == "exact" else 0
+
+    rows = []
+    for mode in QUANTIZATIONS:
+        index = IVFIndex(exact_threshold=exact_threshold, quantization=mode).build(vectors)
+
+        t0 = time.perf_counter()
+        found = [index.search(q, k)[0] for q in queries]
+        elapsed = time.perf_counter() - t0
+
+        hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+        rows.append(
+            {
+                "quantization": mode,
+                "index": index_mode,
+                "memory_mb": round(index.memory_bytes() / 2**20, 2),
+                "recall_at_k": round(hits / float(n_queries * k), 4),
+                "ms_per_query": round(elapsed / n_queries * 1000, 3),
+            }
+        )
+    return rows
+
+
+def main(n: int, dim: int, n_queries: int, k: int, index_mode: str):
+    rows = run_benchmark(n=n, dim=dim, n_queries=n_queries, k=k, index_mode=index_mode)
+
+    print(f"\n=== Retrieval benchmark ({n} x {dim}, {index_mode}, recall@{k}) ===")
+    print(f"{'quantization':<14}{'memory MB':>12}{'recall':>10}{'ms/query':>12}")
+    for row in rows:
+        print(
+            f"{row['quantization']:<14}{row['memory_mb']:>12}"
+            f"{row['recall_at_k']:>10}{row['ms_per_query']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark quantized passage search.")
+    parser.add_argument("--n", type=int, default=200_000, help="number of passages")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index", choices=["ivf", "exact"], default="ivf")
+    args = parser.parse_args()
+
+    main(args.n, args.dim, args.queries, args.k, args.index)
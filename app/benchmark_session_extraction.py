@@ -0,0 +1,100 @@
+# app/benchmark_session_extraction.py
+
+import argparse
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.telemetry_bulk import driver_job, extract_session, get_pool, shutdown_pool
+
+
+def synthetic_session(n_drivers: int = 20, n_laps: int = 57, samples_per_lap: int = 700, seed: int = 0):
+    """
+    FastF1-like data for one race: per driver a whole-session telemetry
+    DataFrame (SessionTime, Speed, RPM, ...) and a laps table
+    (LapNumber, LapStartTime, Time). Returns a list of driver jobs.
+    """
+    rng = np.random.RandomState(seed)
+    jobs = []
+    for d in range(n_drivers):
+        lap_time = 90.0 + rng.rand(n_laps)
+        ends = 3600.0 + np.cumsum(lap_time)
+        starts = ends - lap_time
+
+        n = n_laps * samples_per_lap
+        times = np.linspace(starts[0], ends[-1], n)
+        telemetry = pd.DataFrame(
+            {
+                "SessionTime": pd.to_timedelta(times, unit="s"),
+                "Speed": rng.uniform(80, 330, n),
+                "RPM": rng.randint(9000, 12500, n),
+                "nGear": rng.randint(1, 9, n),
+                "Throttle": rng.randint(0, 101, n),
+                "Brake": rng.rand(n) < 0.2,
+            }
+        )
+        laps = pd.DataFrame(
+            {
+                "LapNumber": np.arange(1, n_laps + 1, dtype=float),
+                "LapStartTime": pd.to_timedelta(starts, unit="s"),
+                "Time": pd.to_timedelta(ends, unit="s"),
+            }
+        )
+        jobs.append(driver_job(f"D{d + 1}", telemetry, laps, track_temp=38.0))
+    return jobs
+
+
+def run_benchmark(processes: List[int], n_drivers: int = 20, n_laps: int = 57, repeats: int = 3) -> List[Dict[str, Any]]:
+    """
+    Seconds to extract every lap of a synthetic session per pool size
+    (best of `repeats`, pool started before timing) + speed-up vs 1 process.
+    """
+    jobs = synthetic_session(n_drivers, n_laps)
+    rows = []
+    for p in processes:
+        if p > 1:
+            # نشغل الـ workers قبل القياس (spawn + import pandas)
+            pool = get_pool(p)
+            list(pool.map(abs, range(p * 4)))
+
+        best = float("inf")
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            n = sum(1 for _ in extract_session(jobs, processes=p))
+            best = min(best, time.perf_counter() - t0)
+
+        rows.append({"processes": p, "laps": n, "seconds": round(best, 3)})
+
+    shutdown_pool()
+    base = rows[0]["seconds"] if rows else 0.0
+    for row in rows:
+        row["speedup"] = round(base / row["seconds"], 2) if row["seconds"] else 0.0
+    return rows
+
+
+def main(processes: List[int], n_drivers: int, n_laps: int):
+    rows = run_benchmark(processes, n_drivers, n_laps)
+
+    print(f"\n=== Session extraction benchmark ({n_drivers} drivers x {n_laps} laps, {os.cpu_count()} cores) ===")
+    print(f"{'processes':>10}{'laps':>8}{'seconds':>10}{'speed-up':>10}")
+    for row in rows:
+        print(f"{row['processes']:>10}{row['laps']:>8}{row['seconds']:>10}{row['speedup']:>10}")
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Benchmark process-pool lap extraction.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))) or [1],
+    )
+    parser.add_argument("--drivers", type=int, default=20)
+    parser.add_argument("--laps", type=int, default=57)
+    args = parser.parse_args()
+
+    main(args.processes, args.drivers, args.laps)
@@ -0,0 +1,101 @@
+# app/benchmark_telemetry.py
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.agents.telemetry_store import TelemetryStore
+
+
+def synthetic_season(n_sessions: int, n_drivers: int = 20, n_laps: int = 60, seed: int = 0):
+    """
+    {driver: [records]} like telemetry_embeddings.json, one record per
+    (session, lap) with a random pace-drop score.
+    """
+    rng = np.random.RandomState(seed)
+    scores = rng.random_sample((n_drivers, n_sessions, n_laps)).round(4)
+    return {
+        str(d + 1): [
+            {
+                "lap": lap + 1,
+                "session": f"S{s}",
+                "meta": {"summary": f"driver {d + 1} session {s} lap {lap + 1}"},
+                "score": float(scores[d, s, lap]),
+            }
+            for s in range(n_sessions)
+            for lap in range(n_laps)
+        ]
+        for d in range(n_drivers)
+    }
+
+
+def _list_scan(index, drivers, lap_min, lap_max, top_k):
+    """The dict-of-lists approach: filter every record, then sort."""
+    hits = [
+        h
+        for d in (drivers or index)
+        for h in index.get(str(d), [])
+        if lap_min <= h.get("lap", -1) <= lap_max
+    ]
+    return sorted(hits, key=lambda x: x.get("score", 1.0), reverse=True)[:top_k]
+
+
+def run_benchmark(sessions: List[int], n_queries: int = 200) -> List[Dict[str, Any]]:
+    """
+    Per season size: ms/query of the columnar store vs a list scan, for
+    "laps 25-35 for 44 and 1" style windows and top-5 across the field.
+    """
+    rows = []
+    for n_sessions in sessions:
+        index = synthetic_season(n_sessions)
+        store = TelemetryStore.from_records(index)
+        rng = np.random.RandomState(1)
+
+        queries = []
+        for _ in range(n_queries):
+            lap_min = int(rng.randint(1, 50))
+            drivers = None if rng.rand() < 0.5 else [str(d) for d in rng.randint(1, 21, size=2)]
+            queries.append((drivers, lap_min, lap_min + 10))
+
+        t0 = time.perf_counter()
+        for drivers, lo, hi in queries:
+            store.records(store.top_k(store.select(drivers, lo, hi), 5), with_driver=True)
+        store_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for drivers, lo, hi in queries:
+            _list_scan(index, drivers, lo, hi, 5)
+        scan_s = time.perf_counter() - t0
+
+        rows.append(
+            {
+                "sessions": n_sessions,
+                "records": len(store),
+                "store_ms": round(store_s / n_queries * 1000, 3),
+                "list_scan_ms": round(scan_s / n_queries * 1000, 3),
+            }
+        )
+    return rows
+
+
+def main(sessions: List[int], n_queries: int):
+    rows = run_benchmark(sessions, n_queries)
+
+    print("\n=== Telemetry query benchmark (lap window, top-5) ===")
+    print(f"{'sessions':>10}{'records':>10}{'store ms':>12}{'list scan ms':>15}")
+    for row in rows:
+        print(
+            f"{row['sessions']:>10}{row['records']:>10}"
+            f"{row['store_ms']:>12}{row['list_scan_ms']:>15}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark telemetry lap-window queries.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.sessions, args.queries)
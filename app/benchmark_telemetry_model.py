@@ -0,0 +1,75 @@
+# app/benchmark_telemetry_model.py
+
+import argparse
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+
+from app.sarah_model import load_telemetry_model, predict_pace_drop, predict_pace_drop_batch
+
+
+def synthetic_sequences(n: int, min_len: int = 300, max_len: int = 800, seed: int = 0) -> List[np.ndarray]:
+    """Lap-like feature matrices (a real lap is ~500-800 telemetry samples)."""
+    rng = np.random.RandomState(seed)
+    return [
+        rng.normal(size=(rng.randint(min_len, max_len + 1), 10)).astype(np.float32)
+        for _ in range(n)
+    ]
+
+
+def run_benchmark(
+    batch_sizes: List[int],
+    n_sequences: int = 256,
+    min_len: int = 300,
+    max_len: int = 800,
+) -> List[Dict[str, Any]]:
+    """
+    Sequences/second on CPU: the one-by-one predict_pace_drop loop vs
+    predict_pace_drop_batch (padded and packed) per batch size.
+    """
+    model = load_telemetry_model()
+    sequences = synthetic_sequences(n_sequences, min_len, max_len)
+
+    # warm-up (أول forward فيه allocation و init)
+    predict_pace_drop_batch(model, sequences[:8], batch_size=4)
+    predict_pace_drop(model, sequences[0])
+
+    t0 = time.perf_counter()
+    single = np.array([predict_pace_drop(model, s) for s in sequences], dtype=np.float32)
+    elapsed = time.perf_counter() - t0
+    rows = [{"mode": "single", "batch_size": 1, "seq_per_s": round(n_sequences / elapsed, 1), "max_abs_diff": 0.0}]
+
+    for mode, pack in (("padded", False), ("packed", True)):
+        for batch_size in batch_sizes:
+            t0 = time.perf_counter()
+            probs = predict_pace_drop_batch(model, sequences, batch_size=batch_size, pack=pack)
+            elapsed = time.perf_counter() - t0
+            rows.append(
+                {
+                    "mode": mode,
+                    "batch_size": batch_size,
+                    "seq_per_s": round(n_sequences / elapsed, 1),
+                    "max_abs_diff": float(np.abs(probs - single).max()),
+                }
+            )
+    return rows
+
+
+def main(batch_sizes: List[int], n_sequences: int):
+    rows = run_benchmark(batch_sizes, n_sequences)
+
+    print(f"\n=== Telemetry model throughput ({n_sequences} sequences, {torch.get_num_threads()} torch threads) ===")
+    print(f"{'mode':<8}{'batch':>8}{'seq/s':>12}{'max |diff|':>14}")
+    for row in rows:
+        print(f"{row['mode']:<8}{row['batch_size']:>8}{row['seq_per_s']:>12}{row['max_abs_diff']:>14.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched pace-drop inference.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument("--n", type=int, default=256, help="number of sequences")
+    args = parser.parse_args()
+
+    main(args.batch_sizes, args.n)
@@ -1,13 +1,14 @@
 # app/evaluate_sentiment.py
 
+import argparse
 import json
 import os
 import re
-from typing import List
+from typing import List, Optional
 
 from sklearn.metrics import accuracy_score, f1_score, classification_report, confusion_matrix
 
-from app.agents.nlp_agent import analyze_sentiment
+from app.agents.nlp_agent import analyze_sentiment, analyze_sentiment_batch
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -40,7 +41,27 @@ def load_dataset(path: str):
     return texts, labels
 
 
-def main():
+def predict_batched(texts: List[str], batch_size: int) -> List[str]:
+    """
+    Score the dataset with analyze_sentiment_batch (batch_size texts per LLM call).
+    Arabic and English texts go in separate batches so each prompt gets a language hint.
+    """
+    y_pred: List[str] = [""] * len(texts)
+
+    for lang in ("en", "ar"):
+        idx = [i for i, t in enumerate(texts) if detect_lang(t) == lang]
+        if not idx:
+            continue
+        results = analyze_sentiment_batch(
+            [texts[i] for i in idx], language=lang, batch_size=batch_size
+        )
+        for i, result in zip(idx, results):
+            y_pred[i] = result.get("label", "neutral")
+
+    return y_pred
+
+
+def main(batch_size: Optional[int] = None):
     if not os.path.exists(DATA_FILE):
         raise FileNotFoundError(f"Dataset not found at {DATA_FILE}")
 
@@ -50,13 +71,19 @@ def main():
 
     y_pred: List[str] = []
 
-    for i, text in enumerate(texts, start=1):
-        lang = detect_lang(text)
-        result = analyze_sentiment(text, language=lang)
-        pred_label = result.get("label", "neutral")
-        y_pred.append(pred_label)
+    if batch_size:
+        print(f"Batch mode: {batch_size} texts per LLM call.")
+        y_pred = predict_batched(texts, batch_size)
+        for i, pred_label in enumerate(y_pred, start=1):
+            print(f"[{i}/{len(texts)}] true={y_true[i-1]}, pred={pred_label}")
+    else:
+        for i, text in enumerate(texts, start=1):
+            lang = detect_lang(text)
+            result = analyze_sentiment(text, language=lang)
+            pred_label = result.get("label", "neutral")
+            y_pred.append(pred_label)
 
-        print(f"[{i}/{len(texts)}] true={y_true[i-1]}, pred={pred_label}")
+            print(f"[{i}/{len(texts)}] true={y_true[i-1]}, pred={pred_label}")
 
     # ====== 1) Accuracy & F1 ======
     acc = accuracy_score(y_true, y_pred)
@@ -107,4 +134,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Evaluate the sentiment agent.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="score N comments per LLM call (0 = one call per comment)",
+    )
+    args = parser.parse_args()
+    main(batch_size=args.batch_size)
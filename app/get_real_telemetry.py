@@ -1,31 +1,50 @@
 # app/get_real_telemetry.py
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 
 import fastf1
+import numpy as np
 
+from app.session_cache import SessionCache
+from app.telemetry_bulk import driver_job, extract_session
+from app.telemetry_cache import cached_lap_features, fastf1_cache_dir
+from app.telemetry_features import array_to_sequence, telemetry_to_array
 
-def load_real_telemetry(
+
+def load_real_telemetry_array(
     year: int = 2023,
     gp: str = "Bahrain",
     session_type: str = "R",  # "R" = Race
     driver: str = "HAM",
     lap_number: int = 10,
-) -> List[Dict[str, Any]]:
+    use_cache: bool = True,
+) -> np.ndarray:
     """
-    Load real F1 telemetry using FastF1 and return it as
-    a list of dicts (sequence of telemetry points).
+    Load real F1 telemetry using FastF1 and return it as a float32
+    (seq_len, 10) feature matrix, ready for sarah_model.
+
+    Laps seen before come from the per-lap feature cache (telemetry_cache.py,
+    memory-mapped .npy) without loading the session at all.
     """
+    def build() -> np.ndarray:
+        return _extract_lap_features(year, gp, session_type, driver, lap_number)
 
-    # Enable cache in ./cache
-    cache_dir = Path("./cache")
-    cache_dir.mkdir(exist_ok=True)
-    fastf1.Cache.enable_cache(str(cache_dir))
+    if not use_cache:
+        return build()
+    return cached_lap_features(year, gp, session_type, driver, lap_number, build)
 
+
+def _extract_lap_features(
+    year: int,
+    gp: str,
+    session_type: str,
+    driver: str,
+    lap_number: int,
+    dtype: Any = np.float32,
+) -> np.ndarray:
     # Load session (e.g. Bahrain 2023 Race)
-    session = fastf1.get_session(year, gp, session_type)
-    session.load()
+    session = _load_session(year, gp, session_type)
 
     # Pick laps for the given driver (HAM, VER, etc.)
     laps = session.laps.pick_driver(driver)
@@ -37,6 +56,36 @@ def load_real_telemetry(
 
     telemetry = lap.get_telemetry()  # pandas DataFrame
 
+    # عمود لكل feature بدل iterrows (dict لكل sample)
+    return telemetry_to_array(telemetry, _track_temp(session), dtype=dtype)
+
+
+# Loaded sessions stay in memory (LRU, FASTF1_SESSION_CACHE_MB / _SIZE), so
+# questions about the same race for other drivers / laps skip session.load()
+session_cache = SessionCache.from_env()
+
+
+def _load_session(year: int, gp: str, session_type: str):
+    key = (int(year), str(gp).strip().lower(), str(session_type).strip().upper())
+
+    def load():
+        # Enable FastF1 cache (<project>/cache, not relative to the CWD)
+        cache_dir = Path(fastf1_cache_dir())
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fastf1.Cache.enable_cache(str(cache_dir))
+
+        session = fastf1.get_session(year, gp, session_type)
+        session.load()
+        return session
+
+    return session_cache.get(key, load)
+
+
+def session_cache_stats() -> Dict[str, Any]:
+    return session_cache.stats()
+
+
+def _track_temp(session) -> float:
     # Track temperature (if available)
     track_temp = 40.0
     try:
@@ -45,23 +94,65 @@ def load_real_telemetry(
             track_temp = float(weather["TrackTemp"].mean())
     except Exception:
         pass
+    return track_temp
+
 
-    sequence: List[Dict[str, Any]] = []
-
-    for _, row in telemetry.iterrows():
-        point: Dict[str, Any] = {
-            "speed": float(row.get("Speed", 0.0)),
-            "throttle": float(row.get("Throttle", 0.0)),
-            "brake": float(row.get("Brake", 0.0)),
-            "gear": float(row.get("nGear", 0.0)),
-            "steering": float(row.get("Steer", 0.0)),
-            # Tyre temp is not always available → default
-            "tyre_temp": float(row.get("TyreTemp", 90.0)),
-            "rpm": float(row.get("RPM", 11000.0)),
-            "lat_g": float(row.get("Lat", 0.0)),
-            "long_g": float(row.get("Long", 0.0)),
-            "track_temp": track_temp,
-        }
-        sequence.append(point)
-
-    return sequence
+def load_session_telemetry(
+    year: int = 2023,
+    gp: str = "Bahrain",
+    session_type: str = "R",
+    drivers: Optional[Iterable[str]] = None,
+    laps: Optional[Iterable[int]] = None,
+    processes: Optional[int] = None,
+) -> Iterator[Tuple[str, int, np.ndarray]]:
+    """
+    Feature matrices for many laps of one session, loading it only once
+    (in this process; the workers never touch FastF1).
+
+    drivers: abbreviations / numbers (None = every driver in the session)
+    laps:    lap numbers to keep (None = all laps)
+
+    Each driver's telemetry is merged here and sent to a process pool
+    (TELEMETRY_PROCESSES, default: all cores) as a trimmed driver_job; the
+    worker slices it into laps and builds the features. Jobs are built
+    lazily, so the next driver is merged while the workers handle the
+    previous ones. Results are streamed as (driver, lap, (seq_len, 10)
+    float32 array) when each driver finishes. Laps are cut from the
+    driver's whole-session telemetry, so samples at lap edges can differ
+    slightly from per-lap get_telemetry().
+    """
+    session = _load_session(year, gp, session_type)
+    track_temp = _track_temp(session)
+    lap_numbers = [int(n) for n in laps] if laps is not None else None
+
+    def jobs():
+        for driver in (list(drivers) if drivers is not None else session.drivers):
+            driver_laps = session.laps.pick_driver(driver)
+            if driver_laps.empty:
+                continue
+            yield driver_job(
+                driver, driver_laps.get_telemetry(), driver_laps, track_temp, lap_numbers
+            )
+
+    yield from extract_session(jobs(), processes=processes)
+
+
+def load_real_telemetry(
+    year: int = 2023,
+    gp: str = "Bahrain",
+    session_type: str = "R",  # "R" = Race
+    driver: str = "HAM",
+    lap_number: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Load real F1 telemetry using FastF1 and return it as
+    a list of dicts (sequence of telemetry points).
+
+    Kept for compatibility; load_real_telemetry_array skips the dicts.
+    The values are the float64 ones the original iterrows loop returned
+    (not the float32 lap cache), so the session may be loaded (session_cache).
+    """
+    # float64 عشان القيم تطابق الـ dicts القديمة بالضبط
+    return array_to_sequence(
+        _extract_lap_features(year, gp, session_type, driver, lap_number, dtype=np.float64)
+    )
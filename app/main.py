@@ -1,25 +1,66 @@
 # app/main.py
 
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import os
 import re
+import sys
 
-from fastapi import FastAPI, Body
+import numpy as np
+from fastapi import FastAPI, Body, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 # نستخدم الـ agents اللي انتي سويتيهم
 from app.agents.nlp_agent import (
-    analyze_sentiment,
-    summarize_text,
+    aanalyze_sentiment,
+    aanalyze_sentiment_batch,
+    asummarize_text,
+    asummarize_text_chunked,
+    astream_summarize_text,
+    SUMMARY_CHUNKED_THRESHOLD,
+    SUMMARY_PARALLELISM,
 )
-from app.agents.planner import handle_query
+from app.agents.planner import handle_query, astream_query
+from app.agents.retriever_text import (
+    add_passages,
+    compact_passages,
+    corpus_stats,
+    delete_passages,
+    text_retriever_batch,
+)
+from app.agents.retriever_telemetry import telemetry_query, telemetry_stats
+from app.agents.llm_client import (
+    pool_stats,
+    gateway_stats,
+    aclose_gateway,
+    hedge_stats,
+    latency_stats,
+)
+from app.agents.llm_cache import cache_stats
+from app.agents.summarizer import llm_flight, llm_breaker
 
 
 # ==========================
 # تهيئة FastAPI + CORS
 # ==========================
 
-app = FastAPI(title="F1 Smart Assistant API (OpenAI + Agents)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # نقفل الـ AsyncClient حق الـ LLM عند إيقاف السيرفر
+    await aclose_gateway()
+    # والـ batcher حق الموديل لو انستخدم (ما نستورد torch عشان نقفله)
+    batcher_module = sys.modules.get("app.telemetry_batcher")
+    if batcher_module is not None:
+        await asyncio.to_thread(batcher_module.shutdown_batcher)
+
+
+app = FastAPI(title="F1 Smart Assistant API (OpenAI + Agents)", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -39,10 +80,20 @@ class SentimentPayload(BaseModel):
     language: str = "auto"  # "auto" / "en" / "ar"
 
 
+class SentimentBatchPayload(BaseModel):
+    texts: List[str]
+    language: str = "auto"
+    batch_size: Optional[int] = None  # comments per LLM call
+
+
 class SummaryPayload(BaseModel):
     text: str
     language: str = "auto"
     length: str = "medium"  # "short" / "medium" / "long"
+    # long texts: words per chunk (map-reduce) / chunks summarized at once.
+    # محدودة عشان طلب واحد ما يفتح آلاف طلبات LLM أو يلغي حد التوازي
+    chunk_words: Optional[int] = Field(None, ge=200, le=4000)
+    parallelism: Optional[int] = Field(None, ge=1, le=max(SUMMARY_PARALLELISM, 1))
 
 
 class QAPayload(BaseModel):
@@ -51,6 +102,28 @@ class QAPayload(BaseModel):
     language: str = "auto"
 
 
+class RetrieveBatchPayload(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+
+
+class TelemetryQueryPayload(BaseModel):
+    drivers: Optional[List[Any]] = None  # None = كل السائقين
+    lap_min: Optional[int] = None
+    lap_max: Optional[int] = None
+    sessions: Optional[List[str]] = None
+    top_k: int = 5
+
+
+class PaceDropPayload(BaseModel):
+    # كل sequence = laps telemetry بشكل (seq_len, 10) بنفس ترتيب sarah_model
+    sequences: List[List[List[float]]]
+
+
+class DeletePassagesPayload(BaseModel):
+    ids: List[str]
+
+
 class PlannerPayload(BaseModel):
     type: str
     question: Optional[str] = None
@@ -81,7 +154,28 @@ def detect_lang(text: str) -> str:
 
 @app.get("/api/health")
 def health():
-    return {"status": "ok"}
+    # circuit: closed = LLM ok, open = offline fallbacks, half_open = probing
+    return {
+        "status": "ok",
+        "llm_circuit": llm_breaker.stats(),
+    }
+
+
+# ==========================
+# LLM gateway stats
+# ==========================
+
+@app.get("/api/llm/stats")
+def llm_stats():
+    return {
+        "pool": pool_stats(),
+        "gateway": gateway_stats(),
+        "latency": latency_stats(),
+        "hedging": hedge_stats(),
+        "cache": cache_stats(),
+        "singleflight": llm_flight.stats(),
+        "breaker": llm_breaker.stats(),
+    }
 
 
 # ==========================
@@ -92,12 +186,12 @@ def health():
 # body: { text, language }
 
 @app.post("/api/ai/sentiment")
-def sentiment_endpoint(payload: SentimentPayload):
+async def sentiment_endpoint(payload: SentimentPayload):
     lang = payload.language
     if lang == "auto":
         lang = detect_lang(payload.text)
 
-    result = analyze_sentiment(payload.text, language=lang)
+    result = await aanalyze_sentiment(payload.text, language=lang)
     # result شكلها من nlp_agent:
     # {
     #   "type": "sentiment",
@@ -120,6 +214,193 @@ def sentiment_endpoint(payload: SentimentPayload):
     }
 
 
+# POST http://127.0.0.1:8000/api/ai/sentiment/batch
+# body: { texts: [...], language, batch_size }
+# كل batch_size تعليق ينرسلون في طلب LLM واحد
+
+@app.post("/api/ai/sentiment/batch")
+async def sentiment_batch_endpoint(payload: SentimentBatchPayload):
+    lang = payload.language
+    if lang == "auto":
+        langs = {detect_lang(t) for t in payload.texts if t}
+        lang = langs.pop() if len(langs) == 1 else None
+
+    results = await aanalyze_sentiment_batch(
+        payload.texts,
+        language=lang,
+        batch_size=payload.batch_size,
+    )
+
+    return {
+        "count": len(results),
+        "results": [
+            {
+                "sentiment": r.get("label", "neutral"),
+                "label": r.get("label", "neutral"),
+                "score": float(r.get("score", 0.0)),
+                "explanation": r.get("explanation", ""),
+            }
+            for r in results
+        ],
+    }
+
+
+# ==========================
+# Batch retrieval
+# ==========================
+# POST http://127.0.0.1:8000/api/retrieve/batch
+# body: { queries: [...], top_k }
+# (def مو async: شغل NumPy، FastAPI يشغله في threadpool)
+
+@app.post("/api/retrieve/batch")
+def retrieve_batch_endpoint(payload: RetrieveBatchPayload):
+    results = text_retriever_batch(payload.queries, top_k=max(payload.top_k, 0))
+    return {
+        "count": len(results),
+        "results": results,
+    }
+
+
+# ==========================
+# Telemetry queries
+# ==========================
+# POST http://127.0.0.1:8000/api/telemetry/query
+# body: { drivers: [44, 1], lap_min: 25, lap_max: 35, top_k: 5 }
+# بدون drivers = الـ field كامل (مثلاً أعلى 5 laps في الـ pace drop)
+
+@app.post("/api/telemetry/query")
+def telemetry_query_endpoint(payload: TelemetryQueryPayload):
+    results = telemetry_query(
+        payload.drivers,
+        payload.lap_min,
+        payload.lap_max,
+        top_k=max(payload.top_k, 0),
+        sessions=payload.sessions,
+    )
+    return {
+        "count": len(results),
+        "results": results,
+    }
+
+
+# records + hot reload (عدد مرات الـ reload، المدة p50/p99، آخر خطأ)
+@app.get("/api/telemetry/stats")
+def telemetry_stats_endpoint():
+    return telemetry_stats()
+
+
+# POST http://127.0.0.1:8000/api/telemetry/pace_drop
+# body: { sequences: [ [[speed, throttle, ..., track_temp], ...], ... ] }
+# الطلبات المتزامنة تتجمع في batch واحد للـ LSTM (app/telemetry_batcher.py)
+# الـ import داخل _load_batcher: torch يتحمل بس لما نحتاج الموديل،
+# وأول تحميل (import + الموديل) في thread عشان ما يوقف الـ event loop
+
+def _load_batcher():
+    from app.telemetry_batcher import get_batcher
+
+    return get_batcher()
+
+
+@app.post("/api/telemetry/pace_drop")
+async def pace_drop_endpoint(payload: PaceDropPayload):
+    for seq in payload.sequences:
+        if not seq or any(len(point) != 10 for point in seq):
+            raise HTTPException(
+                status_code=422,
+                detail="Each sequence needs at least one point of 10 features.",
+            )
+    sequences = payload.sequences
+
+    batcher = await asyncio.to_thread(_load_batcher)
+    try:
+        probs = await asyncio.gather(
+            *(batcher.apredict(np.asarray(seq, dtype=np.float32)) for seq in sequences)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "count": len(probs),
+        "probabilities": probs,
+    }
+
+
+@app.get("/api/telemetry/batcher/stats")
+def batcher_stats_endpoint():
+    # الإحصائيات ما تنشئ الـ batcher (ولا تستورد torch): قبل أول pace_drop نرجع started=False
+    batcher_module = sys.modules.get("app.telemetry_batcher")
+    batcher = getattr(batcher_module, "_batcher", None)
+    if batcher is None:
+        return {"started": False}
+    return {"started": True, **batcher.stats()}
+
+
+# ==========================
+# Passage ingestion (admin)
+# ==========================
+# POST   /api/admin/passages          body: JSONL، كل سطر {"text": ..., "source": ...}
+# DELETE /api/admin/passages          body: { ids: [...] }
+# POST   /api/admin/passages/compact
+# GET    /api/admin/passages/stats
+# لازم header: X-Admin-Token = ADMIN_TOKEN؛ بدون ADMIN_TOKEN الـ endpoints مقفلة (503)
+# الـ ingest يشتغل في threadpool، والـ queries تكمل على النسخة الحالية من الـ corpus
+
+def _check_admin(token: Optional[str]):
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set).")
+    if token != expected:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+@app.post("/api/admin/passages")
+async def ingest_passages_endpoint(
+    request: Request, x_admin_token: Optional[str] = Header(None)
+):
+    _check_admin(x_admin_token)
+
+    body = (await request.body()).decode("utf-8", errors="replace")
+    items, skipped = [], 0
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        if isinstance(item, dict) and isinstance(item.get("text"), str) and item["text"].strip():
+            items.append(item)
+        else:
+            skipped += 1
+
+    ids = await run_in_threadpool(add_passages, items)
+    return {
+        "added": len(ids),
+        "skipped": skipped,
+        "ids": ids,
+    }
+
+
+@app.delete("/api/admin/passages")
+def delete_passages_endpoint(
+    payload: DeletePassagesPayload, x_admin_token: Optional[str] = Header(None)
+):
+    _check_admin(x_admin_token)
+    return {"deleted": delete_passages(payload.ids)}
+
+
+@app.post("/api/admin/passages/compact")
+def compact_passages_endpoint(x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    return compact_passages()
+
+
+@app.get("/api/admin/passages/stats")
+def passage_stats_endpoint(x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    return corpus_stats()
+
+
 # ==========================
 # 2) Summary Agent Endpoint
 # ==========================
@@ -127,21 +408,37 @@ def sentiment_endpoint(payload: SentimentPayload):
 # POST http://127.0.0.1:8000/api/ai/summary
 # body: { text, language, length }
 
+def _summary_max_words(length: str) -> int:
+    # نترجم length → max_words لـ summarize_text
+    if length == "short":
+        return 40
+    elif length == "long":
+        return 160
+    else:  # medium
+        return 80
+
+
 @app.post("/api/ai/summary")
-def summary_endpoint(payload: SummaryPayload):
+async def summary_endpoint(payload: SummaryPayload):
     lang = payload.language
     if lang == "auto":
         lang = detect_lang(payload.text)
 
-    # نترجم length → max_words لـ summarize_text
-    if payload.length == "short":
-        max_words = 40
-    elif payload.length == "long":
-        max_words = 160
-    else:  # medium
-        max_words = 80
-
-    result = summarize_text(payload.text, max_words=max_words)
+    max_words = _summary_max_words(payload.length)
+
+    # النصوص الطويلة (تقارير سباق كاملة) → map-reduce على أجزاء
+    n_words = len(payload.text.split())
+    if n_words > SUMMARY_CHUNKED_THRESHOLD:
+        mode = "chunked"
+        result = await asummarize_text_chunked(
+            payload.text,
+            max_words=max_words,
+            chunk_words=payload.chunk_words,
+            parallelism=payload.parallelism,
+        )
+    else:
+        mode = "single"
+        result = await asummarize_text(payload.text, max_words=max_words)
     # result من nlp_agent:
     # {
     #   "type": "summary",
@@ -156,6 +453,8 @@ def summary_endpoint(payload: SummaryPayload):
         "original_length": result.get("original_length", None),
         "max_words": max_words,
         "language": lang,
+        "mode": mode,
+        "chunks": result.get("chunks", 1),
     }
 
 
@@ -166,47 +465,115 @@ def summary_endpoint(payload: SummaryPayload):
 # POST http://127.0.0.1:8000/api/ai/qa
 # body: { context, question, language }
 
-@app.post("/api/ai/qa")
-def qa_endpoint(payload: Dict[str, Any] = Body(...)):
-    """
-    Q&A endpoint:
-      - لو فيه context ⇒ نستخدم multilingual_qa (type = multi_qa)
-      - لو ما فيه context ⇒ نستخدم planner.handle_query مع type = qa
-        وهذي اللي تشغل calendar_agent / knowledge_agent / qa_agent / general_f1_answer
-    """
+def _qa_planner_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     context = (payload.get("context") or "").strip()
     question = payload.get("question") or ""
     language = payload.get("language") or "auto"
-    driver_id = payload.get("driver_id")
-    lap = payload.get("lap")
-
-    if not question:
-        return {
-            "type": "error",
-            "message": "Question is required.",
-        }
 
     # 1) لو فيه context → Multilingual QA
     if context:
         target_lang = "ar" if language == "ar" else "en"
-        planner_payload = {
+        return {
             "type": "multi_qa",
             "context": context,
             "question": question,
             "target_lang": target_lang,
         }
-    else:
-        # 2) بدون context → نخلي الـ planner يقرر:
-        #    - calendar_agent (next race, last race...)
-        #    - knowledge_agent (drivers / tracks)
-        #    - qa_agent / general_f1_answer
-        planner_payload = {
-            "type": "qa",
-            "question": question,
-            "driver_id": driver_id,
-            "lap": lap,
-            "language": language,
+
+    # 2) بدون context → نخلي الـ planner يقرر:
+    #    - calendar_agent (next race, last race...)
+    #    - knowledge_agent (drivers / tracks)
+    #    - qa_agent / general_f1_answer
+    return {
+        "type": "qa",
+        "question": question,
+        "driver_id": payload.get("driver_id"),
+        "lap": payload.get("lap"),
+        "language": language,
+    }
+
+
+@app.post("/api/ai/qa")
+async def qa_endpoint(payload: Dict[str, Any] = Body(...)):
+    """
+    Q&A endpoint:
+      - لو فيه context ⇒ نستخدم multilingual_qa (type = multi_qa)
+      - لو ما فيه context ⇒ نستخدم planner.handle_query مع type = qa
+        وهذي اللي تشغل calendar_agent / knowledge_agent / qa_agent / general_f1_answer
+    """
+    if not payload.get("question"):
+        return {
+            "type": "error",
+            "message": "Question is required.",
         }
 
-    result = handle_query(planner_payload)
+    result = await handle_query(_qa_planner_payload(payload))
     return result
+
+
+# ==========================
+# 4) Streaming (Server-Sent Events)
+# ==========================
+# POST /api/ai/qa/stream       body: نفس /api/ai/qa
+# POST /api/ai/summary/stream  body: نفس /api/ai/summary
+# الرد text/event-stream:
+#   event: token  data: {"text": "..."}     (يتكرر مع وصول التوكنز)
+#   event: done   data: {"evidence": [...], "confidence": ..., ...}
+
+def _sse(event: Dict[str, Any]) -> str:
+    event = dict(event)
+    name = event.pop("event", "message")
+    return f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    async def body():
+        async for event in events:
+            yield _sse(event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _error_events(message: str):
+    yield {"event": "error", "type": "error", "message": message}
+
+
+@app.post("/api/ai/qa/stream")
+async def qa_stream_endpoint(payload: Dict[str, Any] = Body(...)):
+    if not payload.get("question"):
+        return _sse_response(_error_events("Question is required."))
+
+    return _sse_response(astream_query(_qa_planner_payload(payload)))
+
+
+@app.post("/api/ai/summary/stream")
+async def summary_stream_endpoint(payload: SummaryPayload):
+    lang = payload.language
+    if lang == "auto":
+        lang = detect_lang(payload.text)
+
+    max_words = _summary_max_words(payload.length)
+    chunked = len(payload.text.split()) > SUMMARY_CHUNKED_THRESHOLD
+
+    async def events():
+        async for event in astream_summarize_text(
+            payload.text,
+            max_words=max_words,
+            chunked=chunked,
+            chunk_words=payload.chunk_words,
+            parallelism=payload.parallelism,
+        ):
+            if event["event"] == "done":
+                event = {
+                    **event,
+                    "max_words": max_words,
+                    "language": lang,
+                    "mode": "chunked" if chunked else "single",
+                }
+            yield event
+
+    return _sse_response(events())
@@ -1,10 +1,14 @@
 # app/sarah_model.py
 
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional, Sequence, Union
 
 import numpy as np
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence, pad_sequence
+
+from app.telemetry_features import FEATURE_NAMES
 
 
 class SimpleTelemetryModel(nn.Module):
@@ -26,15 +30,27 @@ class SimpleTelemetryModel(nn.Module):
         self.sigmoid = nn.Sigmoid()
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        # x: (batch, seq_len, input_dim)
+        # x: (batch, seq_len, input_dim), or a PackedSequence of
+        # variable-length sequences (h_n is then each one's last real step)
         _, (h_n, _) = self.lstm(x)   # h_n: (num_layers, batch, hidden_dim)
         h_last = h_n[-1]             # (batch, hidden_dim)
         logits = self.fc(h_last)     # (batch, 1)
         prob = self.sigmoid(logits)  # (batch, 1)
         return prob
 
+    def forward_padded(self, x: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        """
+        Same as forward for a zero-padded batch: the hidden state is read at
+        each sequence's last real step (the LSTM is causal, so the padding
+        after it does not change it).
+        """
+        out, _ = self.lstm(x)                                   # (batch, seq_len, hidden_dim)
+        h_last = out[torch.arange(x.shape[0]), lengths - 1]     # (batch, hidden_dim)
+        return self.sigmoid(self.fc(h_last))                    # (batch, 1)
+
 
 DEFAULT_INPUT_DIM = 10  # must match features we build in preprocess_telemetry_sequence
+DEFAULT_BATCH_SIZE = 64
 
 
 def load_telemetry_model() -> SimpleTelemetryModel:
@@ -47,43 +63,36 @@ def load_telemetry_model() -> SimpleTelemetryModel:
     return model
 
 
-def preprocess_telemetry_sequence(raw_sequence: List[Dict[str, Any]]) -> np.ndarray:
+def preprocess_telemetry_sequence(
+    raw_sequence: Union[List[Dict[str, Any]], np.ndarray],
+) -> np.ndarray:
     """
     Convert a list of telemetry dicts into a feature matrix (seq_len, input_dim).
+    A feature matrix (e.g. from load_real_telemetry_array) is returned as float32 as-is;
+    a flat array is accepted if its length is a multiple of input_dim.
+    Raises ValueError for any other shape.
     """
-    features = []
-    for point in raw_sequence:
-        speed = float(point.get("speed", 0.0))
-        throttle = float(point.get("throttle", 0.0))
-        brake = float(point.get("brake", 0.0))
-        gear = float(point.get("gear", 0.0))
-        steering = float(point.get("steering", 0.0))
-        tyre_temp = float(point.get("tyre_temp", 0.0))
-        rpm = float(point.get("rpm", 0.0))
-        lat_g = float(point.get("lat_g", 0.0))
-        long_g = float(point.get("long_g", 0.0))
-        track_temp = float(point.get("track_temp", 0.0))
-
-        feature_vec = [
-            speed,
-            throttle,
-            brake,
-            gear,
-            steering,
-            tyre_temp,
-            rpm,
-            lat_g,
-            long_g,
-            track_temp,
-        ]
-        features.append(feature_vec)
-
-    return np.array(features, dtype=np.float32)
+    if isinstance(raw_sequence, np.ndarray):
+        features = np.asarray(raw_sequence, dtype=np.float32)
+        if features.ndim == 1 and features.size % DEFAULT_INPUT_DIM == 0:
+            return features.reshape(-1, DEFAULT_INPUT_DIM)
+        if features.ndim != 2 or features.shape[1] != DEFAULT_INPUT_DIM:
+            raise ValueError(
+                f"Telemetry features must have shape (seq_len, {DEFAULT_INPUT_DIM}), "
+                f"got {features.shape}"
+            )
+        return features
+
+    features = [
+        [float(point.get(name, 0.0)) for name in FEATURE_NAMES]
+        for point in raw_sequence
+    ]
+    return np.array(features, dtype=np.float32).reshape(-1, DEFAULT_INPUT_DIM)
 
 
 def predict_pace_drop(
     model: SimpleTelemetryModel,
-    telemetry_sequence: List[Dict[str, Any]],
+    telemetry_sequence: Union[List[Dict[str, Any]], np.ndarray],
 ) -> float:
     """
     High-level helper:
@@ -100,3 +109,52 @@ def predict_pace_drop(
         prob = model(x)  # (1, 1)
 
     return float(prob.item())
+
+
+TelemetrySequence = Union[List[Dict[str, Any]], np.ndarray]
+
+
+def predict_pace_drop_batch(
+    model: SimpleTelemetryModel,
+    sequences: Sequence[TelemetrySequence],
+    batch_size: Optional[int] = None,
+    pack: bool = False,
+) -> np.ndarray:
+    """
+    predict_pace_drop for many sequences (dict lists or (seq_len, 10) arrays)
+    of different lengths. Returns a float32 array of probabilities, same
+    order as `sequences`.
+
+    Sequences are sorted by length so each batch pads as little as possible,
+    then each batch runs as one forward pass:
+    - default: zero-padded batch, hidden state taken at each sequence's
+      last real step (forward_padded)
+    - pack=True: pack_padded_sequence (slower on CPU in benchmark_telemetry_model)
+    Both match the one-by-one path up to float32 rounding of the batched matmuls.
+    batch_size defaults to TELEMETRY_BATCH_SIZE (64).
+    """
+    batch_size = batch_size or int(os.environ.get("TELEMETRY_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+    batch_size = max(batch_size, 1)
+    features = [torch.from_numpy(preprocess_telemetry_sequence(seq)) for seq in sequences]
+
+    lengths = np.array([f.shape[0] for f in features], dtype=np.int64)
+    if (lengths == 0).any():
+        raise ValueError(f"Empty telemetry sequence at index {int(np.argmax(lengths == 0))}")
+
+    probs = np.empty(len(features), dtype=np.float32)
+    # الأطول أول: كل batch أطواله متقاربة فالـ padding قليل
+    order = np.argsort(-lengths, kind="stable")
+
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            padded = pad_sequence([features[i] for i in idx], batch_first=True)
+            batch_lengths = torch.from_numpy(lengths[idx])
+            if pack:
+                packed = pack_padded_sequence(padded, batch_lengths, batch_first=True)
+                out = model(packed)
+            else:
+                out = model.forward_padded(padded, batch_lengths)
+            probs[idx] = out.squeeze(1).numpy()
+
+    return probs
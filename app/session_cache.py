@@ -0,0 +1,148 @@
+# app/session_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+from app.agents.singleflight import SingleFlight
+
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_SESSIONS = 8
+
+# attributes of a loaded fastf1 Session that hold the bulk of its memory
+SESSION_FRAMES = (
+    "laps",
+    "car_data",
+    "pos_data",
+    "weather_data",
+    "results",
+    "track_status",
+    "session_status",
+    "race_control_messages",
+)
+
+
+def _frame_bytes(value: Any) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, dict):
+        return sum(_frame_bytes(v) for v in value.values())
+    return 0
+
+
+def estimate_session_bytes(session: Any) -> int:
+    """
+    Approximate resident size of a loaded session: the DataFrames it holds
+    (car_data / pos_data are dicts of per-driver frames).
+    """
+    total = 0
+    for name in SESSION_FRAMES:
+        try:
+            total += _frame_bytes(getattr(session, name, None))
+        except Exception:
+            # fastf1 يرفع DataNotLoadedError للأجزاء اللي ما انحملت
+            continue
+    return total
+
+
+class SessionCache:
+    """
+    Bounded LRU of loaded sessions (OrderedDict: least recently used first).
+
+    - eviction is size-aware: entries are dropped until the estimated bytes
+      fit in max_bytes (and at most max_sessions are kept); the newest
+      entry is always kept, even if it alone is over the budget
+    - concurrent misses for the same key share one load (SingleFlight)
+    """
+
+    def __init__(self, max_bytes: int, max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionCache":
+        max_mb = float(os.environ.get("FASTF1_SESSION_CACHE_MB", DEFAULT_MAX_MB))
+        max_sessions = int(os.environ.get("FASTF1_SESSION_CACHE_SIZE", DEFAULT_MAX_SESSIONS))
+        return cls(max_bytes=int(max_mb * 2**20), max_sessions=max_sessions)
+
+    def _lookup(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        self._data.move_to_end(key)
+        return item[0]
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        The cached session for `key`, or load() it (once, however many
+        threads ask at the same time) and keep it.
+        """
+        with self._lock:
+            session = self._lookup(key)
+            if session is not None:
+                self.hits += 1
+                return session
+            self.misses += 1
+
+        return self._flight.do(key, lambda: self._load(key, load))
+
+    def _load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            # حمّله thread ثاني بين الـ miss وبداية الـ flight
+            session = self._lookup(key)
+            if session is not None:
+                return session
+
+        session = load()
+        size = estimate_session_bytes(session)
+
+        with self._lock:
+            self.loads += 1
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.resident_bytes -= old[1]
+            self._data[key] = (session, size)
+            self.resident_bytes += size
+            self._evict()
+        return session
+
+    def _evict(self):
+        while len(self._data) > 1 and (
+            self.resident_bytes > self.max_bytes or len(self._data) > self.max_sessions
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.resident_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.resident_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._data),
+                "keys": [list(k) if isinstance(k, tuple) else k for k in self._data],
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "loads": self.loads,
+                "coalesced": self._flight.coalesced,
+                "evictions": self.evictions,
+            }
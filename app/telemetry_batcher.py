@@ -0,0 +1,207 @@
+# app/telemetry_batcher.py
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.agents.latency import LatencyHistogram
+from app.sarah_model import (
+    SimpleTelemetryModel,
+    TelemetrySequence,
+    load_telemetry_model,
+    predict_pace_drop_batch,
+    preprocess_telemetry_sequence,
+)
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+_STOP = object()
+
+
+class TelemetryBatcher:
+    """
+    Dynamic micro-batching in front of SimpleTelemetryModel.
+
+    Callers submit one sequence each and get a Future; a single worker
+    thread takes the first waiting request, collects more for up to
+    max_wait_ms or until max_batch are queued, runs them as one padded
+    batch (predict_pace_drop_batch) and resolves every caller's future.
+
+    - predict(seq)        → blocking, for threads
+    - await apredict(seq) → asyncio (the event loop is not blocked)
+    """
+
+    def __init__(
+        self,
+        model: Optional[SimpleTelemetryModel] = None,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ):
+        self.model = model if model is not None else load_telemetry_model()
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.latency = LatencyHistogram()
+        self.batch_sizes: Dict[int, int] = {}
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, model: Optional[SimpleTelemetryModel] = None) -> "TelemetryBatcher":
+        return cls(
+            model=model,
+            max_batch=int(os.environ.get("TELEMETRY_BATCH_MAX", DEFAULT_MAX_BATCH)),
+            max_wait_ms=float(os.environ.get("TELEMETRY_BATCH_WAIT_MS", DEFAULT_MAX_WAIT_MS)),
+        )
+
+    # ---------- callers ----------
+
+    def submit(self, sequence: TelemetrySequence) -> Future:
+        # الـ preprocessing في thread المستدعي؛ sequence فاضية ترجع خطأ لها لحالها
+        features = preprocess_telemetry_sequence(sequence)
+        if features.shape[0] == 0:
+            raise ValueError("Empty telemetry sequence")
+
+        fut: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("TelemetryBatcher is closed")
+            self._ensure_worker()
+            self._queue.put((features, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, sequence: TelemetrySequence, timeout: Optional[float] = None) -> float:
+        return self.submit(sequence).result(timeout=timeout)
+
+    async def apredict(self, sequence: TelemetrySequence) -> float:
+        return await asyncio.wrap_future(self.submit(sequence))
+
+    # ---------- worker ----------
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="telemetry-batcher", daemon=True)
+            self._thread.start()
+
+    def _collect(self) -> Tuple[List[Tuple[np.ndarray, Future, float]], bool]:
+        """
+        Block for the first request, then gather until max_batch or the
+        max_wait deadline. Returns (batch, stop requested).
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._run_batch(batch)
+            if stop:
+                return
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future, float]]):
+        # اللي انلغى قبل ما نبدأ ما نحسبه
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            probs = predict_pace_drop_batch(
+                self.model, [features for features, _, _ in batch], batch_size=len(batch)
+            )
+        except Exception as e:
+            with self._lock:
+                self.errors += len(batch)
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+        for (_, fut, submitted), prob in zip(batch, probs.tolist()):
+            self.latency.record(done - submitted)
+            fut.set_result(float(prob))
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Stop the worker after the requests already queued are answered.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None and thread.is_alive():
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    # ---------- metrics ----------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sizes = dict(sorted(self.batch_sizes.items()))
+            batches, items, errors = self.batches, self.items, self.errors
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "batches": batches,
+            "items": items,
+            "errors": errors,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_sizes": {str(k): v for k, v in sizes.items()},
+            "latency": self.latency.stats(),
+        }
+
+
+# Shared batcher for the API (created on first use: loads the model)
+_batcher: Optional[TelemetryBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> TelemetryBatcher:
+    global _batcher
+
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = TelemetryBatcher.from_env()
+        return _batcher
+
+
+def shutdown_batcher():
+    global _batcher
+
+    with _batcher_lock:
+        if _batcher is not None:
+            _batcher.close()
+        _batcher = None
@@ -0,0 +1,146 @@
+# app/telemetry_bulk.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.telemetry_features import FEATURE_COLUMNS, telemetry_to_array
+
+# أعمدة الـ telemetry اللي تنرسل للـ workers (الباقي ما نحتاجه)
+TELEMETRY_COLUMNS = ["SessionTime"] + [c for _, c, _ in FEATURE_COLUMNS if c]
+
+# One driver's work: (driver, telemetry, lap numbers, lap start s, lap end s, track temp)
+DriverJob = Tuple[str, pd.DataFrame, np.ndarray, np.ndarray, np.ndarray, float]
+LapFeatures = Tuple[str, int, np.ndarray]
+
+
+def _seconds(values) -> np.ndarray:
+    """Timedelta / numeric column → float64 seconds (NaT → NaN)."""
+    series = pd.Series(values)
+    if pd.api.types.is_timedelta64_dtype(series):
+        return series.dt.total_seconds().to_numpy(dtype=np.float64)
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def driver_job(
+    driver: str,
+    telemetry: pd.DataFrame,
+    laps: pd.DataFrame,
+    track_temp: float,
+    lap_numbers: Optional[Iterable[int]] = None,
+) -> DriverJob:
+    """
+    Pack one driver's data for a worker: only the telemetry columns the
+    model uses + lap boundaries (LapStartTime → Time, in session seconds).
+    """
+    if lap_numbers is not None:
+        laps = laps[laps["LapNumber"].isin(list(lap_numbers))]
+
+    columns = [c for c in TELEMETRY_COLUMNS if c in telemetry.columns]
+    return (
+        str(driver),
+        telemetry[columns].reset_index(drop=True),
+        pd.to_numeric(laps["LapNumber"], errors="coerce").to_numpy(dtype=np.float64),
+        _seconds(laps["LapStartTime"]),
+        _seconds(laps["Time"]),
+        float(track_temp),
+    )
+
+
+def extract_driver_laps(job: DriverJob) -> List[LapFeatures]:
+    """
+    Worker: slice the driver's telemetry into laps (binary search on
+    SessionTime) and build each lap's (seq_len, 10) feature matrix.
+    """
+    driver, telemetry, numbers, starts, ends, track_temp = job
+    times = _seconds(telemetry["SessionTime"])
+
+    ok = ~(np.isnan(numbers) | np.isnan(starts) | np.isnan(ends))
+    lo = np.searchsorted(times, starts[ok], side="left")
+    hi = np.searchsorted(times, ends[ok], side="right")
+
+    return [
+        (driver, int(lap), telemetry_to_array(telemetry.iloc[a:b], track_temp))
+        for lap, a, b in zip(numbers[ok].tolist(), lo.tolist(), hi.tolist())
+    ]
+
+
+# ==========================
+# Process pool
+# ==========================
+# pool لكل عدد processes يعيش مع الـ process (تشغيل workers بـ spawn غالي)؛
+# spawn بدل fork عشان السيرفر فيه threads (LLM client, reload, ...).
+# ما نقفل pool من get_pool: ممكن مستدعي ثاني ينتظر نتائجه.
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def default_processes() -> int:
+    return int(os.environ.get("TELEMETRY_PROCESSES", os.cpu_count() or 1))
+
+
+def get_pool(processes: int) -> ProcessPoolExecutor:
+    with _pool_lock:
+        pool = _pools.get(processes)
+        if pool is None:
+            pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pools[processes] = pool
+        return pool
+
+
+def shutdown_pool():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def extract_session(
+    jobs: Iterable[Any],
+    processes: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    worker: Callable[[Any], List[LapFeatures]] = extract_driver_laps,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[LapFeatures]:
+    """
+    Run worker(job) for every job (default: extract_driver_laps on a
+    DriverJob) and stream (driver, lap, features) tuples as jobs finish
+    (order not guaranteed). processes=1 runs in this process.
+
+    Jobs are pulled from the iterable lazily: at most max_in_flight
+    (default 2 x processes) are submitted at a time, so a generator of
+    jobs is not materialized up front.
+    """
+    processes = processes or default_processes()
+    if executor is None and processes <= 1:
+        for job in jobs:
+            yield from worker(job)
+        return
+
+    pool = executor or get_pool(processes)
+    limit = max(int(max_in_flight or 2 * processes), 1)
+    jobs = iter(jobs)
+    pending = {pool.submit(worker, job) for job in islice(jobs, limit)}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # نعبي الخانات الفاضية قبل ما نسلّم النتائج: الـ workers ما يوقفون
+            for job in islice(jobs, len(done)):
+                pending.add(pool.submit(worker, job))
+            for future in done:
+                yield from future.result()
+    finally:
+        # المستهلك وقف بدري: ما نكمل شغل ما أحد بياخذه
+        for future in pending:
+            future.cancel()
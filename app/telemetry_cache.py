@@ -0,0 +1,130 @@
+# app/telemetry_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from app.telemetry_features import FEATURE_COLUMNS, N_FEATURES
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# غيّره لما يتغير شكل الـ features (غير الأعمدة نفسها، اللي داخلة في الـ hash)
+FEATURE_CACHE_VERSION = 1
+
+
+def schema_hash() -> str:
+    """
+    Hash of the feature layout (version, columns, defaults, dtype).
+    Files written with another layout live under another folder and are never read.
+    """
+    schema = {
+        "version": FEATURE_CACHE_VERSION,
+        "features": FEATURE_COLUMNS,
+        "dtype": "float32",
+    }
+    data = json.dumps(schema, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=6).hexdigest()
+
+
+def fastf1_cache_dir() -> str:
+    """
+    FastF1's raw HTTP cache (override with FASTF1_CACHE_DIR).
+    Anchored at the project root instead of the current directory.
+    """
+    return os.environ.get("FASTF1_CACHE_DIR", os.path.join(PROJECT_ROOT, "cache"))
+
+
+def feature_cache_dir() -> str:
+    """
+    Per-lap feature cache (override with TELEMETRY_FEATURE_CACHE_DIR).
+    """
+    default = os.path.join(fastf1_cache_dir(), "features")
+    return os.environ.get("TELEMETRY_FEATURE_CACHE_DIR", default)
+
+
+def _slug(value) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", str(value).lower()).strip("_") or "_"
+
+
+def lap_path(year: int, gp: str, session_type: str, driver: str, lap_number: int) -> str:
+    """
+    <cache>/<schema hash>/<year>_<gp>_<session>/<driver>_<lap>.npy
+    """
+    session_dir = f"{int(year)}_{_slug(gp)}_{_slug(session_type)}"
+    return os.path.join(
+        feature_cache_dir(),
+        schema_hash(),
+        session_dir,
+        f"{_slug(driver)}_{int(lap_number)}.npy",
+    )
+
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def load_lap_features(path: str) -> Optional[np.ndarray]:
+    """
+    Memory-mapped (seq_len, N_FEATURES) float32 matrix, or None if the
+    file is missing or not a valid feature file.
+    """
+    try:
+        features = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if features.dtype != np.float32 or features.ndim != 2 or features.shape[1] != N_FEATURES:
+        return None
+    return features
+
+
+def save_lap_features(path: str, features: np.ndarray):
+    """Atomic write: readers see the old file or the complete new one."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(features, dtype=np.float32))
+    os.replace(tmp, path)
+
+
+def cached_lap_features(
+    year: int,
+    gp: str,
+    session_type: str,
+    driver: str,
+    lap_number: int,
+    build: Callable[[], np.ndarray],
+) -> np.ndarray:
+    """
+    Features of one lap from the cache; on a miss `build()` computes them
+    (session load + extraction) and the result is written for next time.
+    """
+    path = lap_path(year, gp, session_type, driver, lap_number)
+
+    features = load_lap_features(path)
+    if features is not None:
+        _count("hits")
+        return features
+
+    _count("misses")
+    features = np.asarray(build(), dtype=np.float32)
+    try:
+        save_lap_features(path, features)
+        _count("writes")
+    except OSError as e:
+        print("WARNING: could not write telemetry feature cache:", e)
+    return features
+
+
+def cache_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
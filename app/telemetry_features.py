@@ -0,0 +1,59 @@
+# app/telemetry_features.py
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# (feature, FastF1 telemetry column, default when the column is missing)
+# الترتيب لازم يطابق sarah_model.preprocess_telemetry_sequence
+FEATURE_COLUMNS = [
+    ("speed", "Speed", 0.0),
+    ("throttle", "Throttle", 0.0),
+    ("brake", "Brake", 0.0),
+    ("gear", "nGear", 0.0),
+    ("steering", "Steer", 0.0),
+    # Tyre temp is not always available → default
+    ("tyre_temp", "TyreTemp", 90.0),
+    ("rpm", "RPM", 11000.0),
+    ("lat_g", "Lat", 0.0),
+    ("long_g", "Long", 0.0),
+    ("track_temp", None, 40.0),  # from session weather, same for every sample
+]
+
+FEATURE_NAMES = [name for name, _, _ in FEATURE_COLUMNS]
+N_FEATURES = len(FEATURE_COLUMNS)
+
+
+def telemetry_to_array(
+    telemetry: pd.DataFrame,
+    track_temp: float = 40.0,
+    dtype: Any = np.float32,
+) -> np.ndarray:
+    """
+    FastF1 telemetry DataFrame → (seq_len, N_FEATURES) feature matrix
+    (float32 by default, what the model uses). Each feature is one column
+    copy; missing columns are filled with their default in one go (no
+    per-sample Python objects). dtype=np.float64 keeps the exact values.
+    """
+    n = len(telemetry)
+    features = np.empty((n, N_FEATURES), dtype=dtype)
+
+    for j, (_, column, default) in enumerate(FEATURE_COLUMNS):
+        if column is None:
+            features[:, j] = track_temp
+        elif column in telemetry.columns:
+            features[:, j] = telemetry[column].to_numpy(dtype=dtype, na_value=np.nan)
+        else:
+            features[:, j] = default
+
+    return features
+
+
+def array_to_sequence(features: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Feature matrix → list of telemetry dicts (the original load_real_telemetry format).
+    Values are Python floats: exact for a float64 matrix, float32-rounded
+    for a float32 one.
+    """
+    return [dict(zip(FEATURE_NAMES, row)) for row in np.asarray(features, dtype=np.float64).tolist()]
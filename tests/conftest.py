@@ -0,0 +1,140 @@
+# tests/conftest.py
+
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the OpenAI Chat Completions endpoint.
+    Answers every POST with "stub: <user prompt>" and records
+    each request + the client port it came on (to check keep-alive).
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.client_ports = set()
+        self.delay = 0.0
+        self.status = 200
+        self.reply = None
+        self.responder = None  # optional fn(request_body) -> content
+        self.stream_delay = 0.0  # pause between streamed chunks
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}/v1"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server: StubLLMServer = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        with server.lock:
+            server.requests.append(body)
+            server.client_ports.add(self.client_address[1])
+
+        if server.delay:
+            threading.Event().wait(server.delay)
+
+        if server.status != 200:
+            payload = json.dumps({"error": "stub failure"}).encode()
+            self.send_response(server.status)
+        else:
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            if server.responder is not None:
+                content = server.responder(body)
+            elif server.reply is not None:
+                content = server.reply
+            else:
+                content = f"stub: {prompt}"
+
+            if body.get("stream"):
+                self._stream(content)
+                return
+
+            payload = json.dumps(
+                {"choices": [{"message": {"role": "assistant", "content": content}}]}
+            ).encode()
+            self.send_response(200)
+
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, content: str):
+        """
+        Chat Completions streaming: one SSE chunk per word, chunked encoding.
+        """
+        server: StubLLMServer = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def _chunk(data: str):
+            raw = data.encode()
+            self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+            self.wfile.flush()
+
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == len(words) - 1 else word + " "
+            event = {"choices": [{"delta": {"content": piece}}]}
+            _chunk(f"data: {json.dumps(event)}\n\n")
+            if server.stream_delay:
+                threading.Event().wait(server.stream_delay)
+
+        _chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def llm_stub(monkeypatch):
+    """
+    Start a stub LLM server and point call_llm_system at it.
+    """
+    from app.agents import llm_cache, llm_client, summarizer
+
+    server = StubLLMServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.delenv("LLM_CACHE_SQLITE_PATH", raising=False)
+    llm_client.reset_session()
+    llm_cache.reset_cache()
+    summarizer.llm_flight.reset()
+    summarizer.llm_breaker.reset()
+
+    yield server
+
+    llm_client.reset_session()
+    llm_cache.reset_cache()
+    summarizer.llm_breaker.reset()
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,89 @@
+# tests/test_ann_index.py
+
+import os
+
+import numpy as np
+
+from app.agents.ann_index import (
+    IVFIndex,
+    exact_search,
+    load_or_build,
+    normalize_rows,
+    recall_at_k,
+)
+
+
+def _clustered(n=6000, dim=32, clusters=60, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.randint(clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, dim))
+    queries = centers[rng.randint(clusters, size=50)] + 0.3 * rng.normal(size=(50, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def test_ivf_recall_against_exact():
+    vectors, queries = _clustered()
+    index = IVFIndex(n_lists=60, n_probe=6, exact_threshold=0).build(vectors)
+
+    assert not index.is_exact
+    assert index.offsets[-1] == len(vectors)
+    assert recall_at_k(index, normalize_rows(vectors), queries, k=10) >= 0.9
+
+
+def test_small_corpus_uses_exact_search():
+    vectors, queries = _clustered(n=500)
+    index = IVFIndex().build(vectors)
+
+    assert index.is_exact
+    for q in queries[:10]:
+        ids, scores = index.search(q, top_k=5)
+        exact_ids, exact_scores = exact_search(normalize_rows(vectors), q, 5)
+        np.testing.assert_array_equal(ids, exact_ids)
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-6)
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_top_k_larger_than_probed_lists_falls_back():
+    vectors, queries = _clustered(n=3000)
+    index = IVFIndex(n_lists=300, n_probe=1, exact_threshold=0).build(vectors)
+
+    ids, _ = index.search(queries[0], top_k=200)
+
+    assert len(ids) == 200
+    assert len(set(ids.tolist())) == 200
+
+
+def test_save_load_roundtrip(tmp_path):
+    vectors, queries = _clustered()
+    index = IVFIndex(n_lists=60, n_probe=6, exact_threshold=0).build(vectors)
+    index.save(str(tmp_path / "idx"), fingerprint="abc")
+
+    loaded = IVFIndex.load(str(tmp_path / "idx"))
+
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.meta["fingerprint"] == "abc"
+    for q in queries[:10]:
+        a_ids, a_scores = index.search(q, 10)
+        b_ids, b_scores = loaded.search(q, 10)
+        np.testing.assert_array_equal(a_ids, b_ids)
+        np.testing.assert_allclose(a_scores, b_scores)
+
+
+def test_load_or_build_rebuilds_on_new_fingerprint(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANN_EXACT_THRESHOLD", "1000")
+    vectors, _ = _clustered(n=4000)
+    folder = str(tmp_path / "idx")
+
+    first = load_or_build(vectors, folder, "v1")
+    assert not first.is_exact
+    assert first.stats()["recall_at_10"] > 0.5
+
+    again = load_or_build(vectors, folder, "v1")
+    assert isinstance(again.vectors, np.memmap)
+
+    rebuilt = load_or_build(vectors[:2000], folder, "v2")
+    assert rebuilt.size == 2000
+    assert rebuilt.meta["fingerprint"] == "v2"
+    # the rebuild replaced the whole build folder named by meta.json
+    assert [p for p in os.listdir(folder) if p.startswith("v-")] == [rebuilt.meta["data"]]
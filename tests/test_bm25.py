@@ -0,0 +1,108 @@
+# tests/test_bm25.py
+
+import json
+import math
+
+import numpy as np
+
+from app.agents import retriever_text
+from app.agents.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = [
+    "Hamilton pitted for medium tyres on lap 30.",
+    "Verstappen stayed out on soft tyres until lap 42.",
+    "Leclerc lost time in traffic after his pit stop.",
+    "The safety car came out on lap 12 after a crash.",
+]
+
+
+def test_tokenize_keeps_names_numbers_and_compounds():
+    assert tokenize("Hamilton pitted for Medium tyres on lap 30!") == [
+        "hamilton", "pit", "medium", "tyre", "lap", "30",
+    ]
+    assert tokenize("the Softs") == ["soft"]
+
+
+def test_bm25_matches_formula_on_small_corpus():
+    index = BM25Index().build(DOCS)
+
+    ids, scores = index.search("verstappen", top_k=3)
+
+    assert ids.tolist() == [1]
+    n, df = len(DOCS), 1
+    idf = math.log1p((n - df + 0.5) / (df + 0.5))
+    lens = [len(tokenize(d)) for d in DOCS]
+    dl, avgdl = lens[1], sum(lens) / n
+    expected = idf * 2.5 / (1 + 1.5 * (0.25 + 0.75 * dl / avgdl))
+    assert abs(scores[0] - expected) < 1e-5
+
+
+def test_bm25_ranks_multi_term_matches_first():
+    index = BM25Index().build(DOCS)
+
+    ids, _ = index.search("lap 42 soft", top_k=4)
+
+    assert ids[0] == 1
+    assert set(ids.tolist()) == {0, 1, 3}
+
+
+def test_truncated_postings_keep_rare_terms_exact():
+    texts = [f"lap {i} report" for i in range(5000)] + ["verstappen lap 7 report"]
+    index = BM25Index().build(texts)
+
+    ids, _ = index.search("verstappen lap", top_k=1, max_postings=16)
+
+    assert ids.tolist() == [5000]
+
+
+def test_save_load_roundtrip(tmp_path):
+    index = BM25Index().build(DOCS)
+    index.save(str(tmp_path / "bm25"), fingerprint="f")
+
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+
+    for q in ("hamilton medium", "lap", "pit stop traffic"):
+        a_ids, a_scores = index.search(q, 4)
+        b_ids, b_scores = loaded.search(q, 4)
+        np.testing.assert_array_equal(a_ids, b_ids)
+        np.testing.assert_allclose(a_scores, b_scores)
+
+
+def test_resave_swaps_csr_arrays_together(tmp_path):
+    folder = tmp_path / "bm25"
+    BM25Index().build(DOCS).save(str(folder), fingerprint="a")
+    BM25Index().build(DOCS[:2]).save(str(folder), fingerprint="b")
+
+    loaded = BM25Index.load(str(folder))
+
+    assert [p.name for p in folder.iterdir() if p.is_dir()] == [loaded.meta["data"]]
+    assert loaded.meta["fingerprint"] == "b" and loaded.n_docs == 2
+    assert loaded.indptr[-1] == len(loaded.doc_ids)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([np.array([3, 1, 2]), np.array([1, 4])], k=60)
+
+    assert max(fused, key=fused.get) == 1
+    assert abs(fused[1] - (1 / 62 + 1 / 61)) < 1e-12
+    assert abs(fused[4] - 1 / 62) < 1e-12
+
+
+def test_text_retriever_finds_lexical_match(tmp_path, monkeypatch):
+    passages = [{"text": t, "source": f"s{i}"} for i, t in enumerate(DOCS)]
+    passages += [{"text": f"Filler passage number {i}.", "source": "filler"} for i in range(200)]
+    passages_file = tmp_path / "passages.json"
+    passages_file.write_text(json.dumps(passages))
+
+    monkeypatch.delenv("PASSAGE_EMBEDDINGS_FILE", raising=False)
+    monkeypatch.delenv("PASSAGE_INDEX_DIR", raising=False)
+    monkeypatch.setattr(retriever_text, "PASSAGES_FILE", str(passages_file))
+    retriever_text.reset_passage_cache()
+    try:
+        results = retriever_text.text_retriever("When did the safety car come out?", top_k=3)
+    finally:
+        retriever_text.reset_passage_cache()
+
+    assert results[0]["source"] == "s3"
+    assert results[0]["bm25_score"] > 0
+    assert set(results[0]) >= {"text", "score", "bm25_score", "rrf_score", "source"}
@@ -0,0 +1,134 @@
+# tests/test_circuit_breaker.py
+
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.agents import summarizer
+from app.agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.agents.nlp_agent import analyze_sentiment
+from app.agents.summarizer import acall_llm_system, call_llm_system
+from app.main import app
+
+
+def _fast_breaker(monkeypatch, **kwargs) -> CircuitBreaker:
+    opts = dict(window=30.0, min_requests=3, error_rate=0.5, open_seconds=0.2)
+    opts.update(kwargs)
+    breaker = CircuitBreaker(**opts)
+    monkeypatch.setattr(summarizer, "llm_breaker", breaker)
+    return breaker
+
+
+def test_breaker_opens_after_errors_and_fails_fast(llm_stub, monkeypatch):
+    breaker = _fast_breaker(monkeypatch, open_seconds=60.0)
+    llm_stub.status = 500
+
+    for i in range(3):
+        assert call_llm_system(f"q{i}").startswith("[Local fallback answer]")
+    assert breaker.state == OPEN
+    upstream = len(llm_stub.requests)
+
+    t0 = time.perf_counter()
+    for i in range(100):
+        answer = call_llm_system(f"fast {i}")
+    elapsed = time.perf_counter() - t0
+
+    assert answer.startswith("[Local fallback answer]")
+    assert len(llm_stub.requests) == upstream
+    assert elapsed < 0.5
+    assert breaker.stats()["rejected"] == 100
+
+
+def test_open_breaker_uses_offline_sentiment(llm_stub, monkeypatch):
+    breaker = _fast_breaker(monkeypatch, open_seconds=60.0)
+    llm_stub.status = 500
+    for i in range(3):
+        call_llm_system(f"q{i}")
+    assert breaker.state == OPEN
+
+    result = analyze_sentiment("What an amazing win, brilliant drive!")
+
+    assert result["label"] == "positive"
+    assert "offline" in result["explanation"].lower()
+
+
+def test_half_open_probe_success_closes(llm_stub, monkeypatch):
+    breaker = _fast_breaker(monkeypatch)
+    llm_stub.status = 500
+    for i in range(3):
+        call_llm_system(f"q{i}")
+    assert breaker.state == OPEN
+
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+
+    llm_stub.status = 200
+    assert call_llm_system("probe") == "stub: probe"
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens(llm_stub, monkeypatch):
+    breaker = _fast_breaker(monkeypatch)
+    llm_stub.status = 500
+    for i in range(3):
+        call_llm_system(f"q{i}")
+
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+
+    async def probe():
+        return await acall_llm_system("probe")
+
+    assert asyncio.run(probe()).startswith("[Local fallback answer]")
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+
+def test_slow_calls_open_breaker():
+    breaker = CircuitBreaker(min_requests=3, slow_seconds=1.0, slow_rate=0.6)
+
+    for _ in range(3):
+        breaker.record_success(latency=2.0)
+
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+
+
+def test_health_reports_circuit_state(llm_stub):
+    llm_stub.status = 500
+
+    with TestClient(app) as client:
+        assert client.get("/api/health").json()["llm_circuit"]["state"] == CLOSED
+
+        for i in range(5):
+            call_llm_system(f"q{i}")
+
+        body = client.get("/api/health").json()
+
+    assert body["status"] == "ok"
+    assert body["llm_circuit"]["state"] == OPEN
+    assert body["llm_circuit"]["retry_in_seconds"] > 0
+
+
+def test_closed_stream_releases_half_open_probe(llm_stub, monkeypatch):
+    breaker = _fast_breaker(monkeypatch)
+    llm_stub.status = 500
+    for i in range(3):
+        call_llm_system(f"q{i}")
+
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+
+    llm_stub.status = 200
+    llm_stub.reply = "the probe answer has several words"
+
+    async def read_one_then_close():
+        stream = summarizer.astream_llm_system("probe")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(read_one_then_close()) == "the "
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is True
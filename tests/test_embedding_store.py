@@ -0,0 +1,118 @@
+# tests/test_embedding_store.py
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from app.agents import retriever_text
+from app.agents.embedding_store import content_hash, load_store, sync_embeddings
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+
+
+def _counting_embed(calls):
+    def embed(texts):
+        calls.append(list(texts))
+        return retriever_text._local_embed(texts)
+
+    return embed
+
+
+def test_embedding_is_stable_across_processes():
+    code = (
+        "from app.agents.retriever_text import _local_embed_one;"
+        "print(_local_embed_one('Hamilton pitted on lap 30').tolist())"
+    )
+    outputs = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        outputs.append(json.loads(out))
+
+    here = retriever_text._local_embed_one("Hamilton pitted on lap 30").tolist()
+    assert outputs[0] == outputs[1] == here
+
+
+def test_sync_reembeds_only_changed_passages(tmp_path):
+    path = str(tmp_path / "embs.npy")
+    texts = [f"passage {i}" for i in range(10)]
+    calls = []
+
+    first, stats = sync_embeddings(texts, _counting_embed(calls), path)
+    assert stats == {"reused": 0, "embedded": 10}
+    assert isinstance(first, np.memmap)
+    assert first.dtype == np.float32 and first.shape == (10, 64)
+
+    texts[3] = "passage 3 (edited)"
+    texts.append("passage 10")
+    second, stats = sync_embeddings(texts, _counting_embed(calls), path)
+
+    assert stats == {"reused": 9, "embedded": 2}
+    assert calls[-1] == ["passage 3 (edited)", "passage 10"]
+    np.testing.assert_array_equal(second[0], first[0])
+    np.testing.assert_array_equal(second[3], retriever_text._local_embed_one(texts[3]))
+
+    _, stats = sync_embeddings(texts, _counting_embed(calls), path)
+    assert stats == {"reused": 11, "embedded": 0}
+    assert len(calls) == 2
+
+
+def test_store_is_keyed_by_content_hash(tmp_path):
+    path = str(tmp_path / "embs.npy")
+    texts = ["a", "b", "c"]
+    sync_embeddings(texts, retriever_text._local_embed, path)
+
+    hashes, matrix = load_store(path)
+    assert hashes == [content_hash(t) for t in texts]
+
+    # reordering reuses every row
+    reordered, stats = sync_embeddings(["c", "a", "b"], retriever_text._local_embed, path)
+    assert stats["embedded"] == 0
+    np.testing.assert_array_equal(reordered[0], matrix[2])
+
+
+def test_save_swaps_matrix_and_index_together(tmp_path):
+    path = str(tmp_path / "embs.npy")
+    sync_embeddings(["a", "b"], retriever_text._local_embed, path)
+    first = json.loads((tmp_path / "embs.json").read_text())["matrix"]
+
+    sync_embeddings(["a", "b", "c"], retriever_text._local_embed, path)
+    second = json.loads((tmp_path / "embs.json").read_text())["matrix"]
+
+    # a new matrix file is named by the new index; the old one is gone
+    assert second != first
+    assert sorted(p.name for p in tmp_path.glob("embs*.npy")) == [second]
+    hashes, matrix = load_store(path)
+    assert matrix.shape == (3, 64) and len(hashes) == 3
+
+
+def test_text_retriever_uses_store_next_to_passages(tmp_path, monkeypatch):
+    passages = [
+        {"text": "Hamilton pitted for medium tires on lap 30.", "source": "log"},
+        {"text": "Verstappen set the fastest lap.", "source": "news"},
+    ]
+    passages_file = tmp_path / "passages.json"
+    passages_file.write_text(json.dumps(passages))
+
+    monkeypatch.delenv("PASSAGE_EMBEDDINGS_FILE", raising=False)
+    monkeypatch.setattr(retriever_text, "PASSAGES_FILE", str(passages_file))
+    retriever_text.reset_passage_cache()
+    try:
+        results = retriever_text.text_retriever(passages[1]["text"], top_k=1)
+    finally:
+        retriever_text.reset_passage_cache()
+
+    assert results[0]["source"] == "news"
+    index = json.loads((tmp_path / "passage_embeddings.json").read_text())
+    assert index["matrix"].startswith("passage_embeddings.")
+    assert (tmp_path / index["matrix"]).exists()
@@ -0,0 +1,121 @@
+# tests/test_hedging.py
+
+import asyncio
+import itertools
+import threading
+import time
+
+from app.agents import llm_client
+from app.agents.latency import LatencyHistogram
+from app.agents.summarizer import acall_llm_system, call_llm_system
+
+
+def _tail_responder(slow_every: int, slow: float, fast: float = 0.01):
+    """
+    Every `slow_every`-th upstream request is slow, the rest are fast.
+    A hedge is a new request, so it usually lands on a fast one.
+    """
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    def responder(body):
+        with lock:
+            n = next(counter)
+        threading.Event().wait(slow if n % slow_every == 0 else fast)
+        return "stub: " + body["messages"][-1]["content"]
+
+    return responder
+
+
+def _run_calls(prefix: str, n: int):
+    for i in range(n):
+        assert call_llm_system(f"{prefix} {i}") == f"stub: {prefix} {i}"
+
+
+def test_histogram_percentiles():
+    hist = LatencyHistogram(window=100)
+    for i in range(1, 101):
+        hist.record(i / 1000.0)
+
+    assert hist.running_percentile(95, min_samples=200) is None
+    assert abs(hist.running_percentile(95) - 0.095) < 0.002
+
+    stats = hist.stats()
+    assert stats["count"] == 100
+    assert 0.04 <= stats["p50"] <= 0.065
+    assert 0.09 <= stats["p99"] <= 0.1
+    assert sum(stats["buckets"].values()) == 100
+
+
+def test_hedging_cuts_tail_latency(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_LATENCY_MIN_SAMPLES", "10")
+    monkeypatch.setenv("LLM_HEDGE_BUDGET", "0.2")
+    llm_stub.responder = _tail_responder(slow_every=20, slow=0.6)
+
+    # baseline: no hedging
+    _run_calls("plain", 40)
+    baseline_p99 = llm_client.call_latency.stats()["p99"]
+    assert baseline_p99 >= 0.5
+
+    llm_client.call_latency.reset()
+    monkeypatch.setenv("LLM_HEDGE_ENABLED", "1")
+    _run_calls("hedged", 40)
+
+    hedged_p99 = llm_client.call_latency.stats()["p99"]
+    stats = llm_client.hedge_stats()
+    assert hedged_p99 < 0.3 < baseline_p99
+    assert stats["hedged"] >= 1
+    assert stats["hedge_wins"] >= 1
+    assert stats["hedged"] <= 0.2 * stats["calls"]
+
+
+def test_hedge_budget_zero_never_hedges(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_LATENCY_MIN_SAMPLES", "10")
+    monkeypatch.setenv("LLM_HEDGE_ENABLED", "1")
+    monkeypatch.setenv("LLM_HEDGE_BUDGET", "0")
+    llm_stub.responder = _tail_responder(slow_every=10, slow=0.2)
+
+    _run_calls("q", 25)
+
+    assert llm_client.hedge_stats()["hedged"] == 0
+    assert len(llm_stub.requests) == 25
+
+
+def test_async_hedge_wins_and_cancels_loser(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_LATENCY_MIN_SAMPLES", "10")
+    monkeypatch.setenv("LLM_HEDGE_ENABLED", "1")
+    monkeypatch.setenv("LLM_HEDGE_BUDGET", "0.5")
+    llm_stub.responder = _tail_responder(slow_every=12, slow=1.0)
+
+    async def run():
+        for i in range(11):
+            await acall_llm_system(f"warm {i}")
+        t0 = time.perf_counter()
+        answer = await acall_llm_system("tail")
+        return answer, time.perf_counter() - t0
+
+    answer, elapsed = asyncio.run(run())
+
+    assert answer == "stub: tail"
+    assert elapsed < 0.5
+    assert llm_client.hedge_stats()["hedge_wins"] == 1
+
+
+def test_read_timeout_adapts_to_observed_latency(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_LATENCY_MIN_SAMPLES", "5")
+    monkeypatch.setenv("LLM_MIN_READ_TIMEOUT", "0.3")
+
+    assert llm_client.get_timeouts()[1] == 30.0
+    _run_calls("fast", 5)
+    assert llm_client.get_timeouts()[1] == 0.3
+
+    llm_stub.delay = 1.5
+    t0 = time.perf_counter()
+    answer = call_llm_system("stuck")
+    elapsed = time.perf_counter() - t0
+
+    assert answer.startswith("[Local fallback answer]")
+    assert elapsed < 1.0
+
+    monkeypatch.setenv("LLM_ADAPTIVE_TIMEOUT", "0")
+    assert llm_client.get_timeouts()[1] == 30.0
@@ -0,0 +1,92 @@
+# tests/test_llm_async.py
+
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.agents import llm_client, qa_agent
+from app.agents.planner import handle_query
+from app.agents.summarizer import acall_llm_system
+from app.main import app
+
+
+def test_acall_llm_system_runs_calls_concurrently(llm_stub):
+    llm_stub.delay = 0.2
+
+    async def run():
+        return await asyncio.gather(*[acall_llm_system(f"q{i}") for i in range(50)])
+
+    t0 = time.perf_counter()
+    answers = asyncio.run(run())
+    elapsed = time.perf_counter() - t0
+
+    assert answers == [f"stub: q{i}" for i in range(50)]
+    # 50 x 0.2s sequentially would be 10s
+    assert elapsed < 3.0
+    assert llm_client.gateway_stats()["peak_in_flight"] > 1
+
+
+def test_semaphore_bounds_in_flight_requests(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_IN_FLIGHT", "4")
+    llm_stub.delay = 0.05
+
+    async def run():
+        return await asyncio.gather(*[acall_llm_system(f"q{i}") for i in range(12)])
+
+    asyncio.run(run())
+
+    stats = llm_client.gateway_stats()
+    assert stats["max_in_flight"] == 4
+    assert stats["peak_in_flight"] <= 4
+    assert stats["waits"] > 0
+
+
+def test_planner_awaits_llm(llm_stub):
+    llm_stub.reply = "DRS opens the rear wing flap."
+
+    result = asyncio.run(handle_query({"type": "general", "question": "what is drs"}))
+
+    assert result["type"] == "general"
+    assert result["answer"] == "DRS opens the rear wing flap."
+
+
+def test_qa_retrieval_does_not_block_event_loop(llm_stub, monkeypatch):
+    def slow_retriever(question, top_k=3):
+        time.sleep(0.3)
+        return []
+
+    monkeypatch.setattr(qa_agent, "text_retriever", slow_retriever)
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        result, _ = await asyncio.gather(
+            qa_agent.aanswer_question(question="why did hamilton pit?"), ticker()
+        )
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+
+    assert result["type"] == "qa"
+    # the loop kept running while retrieval slept in a worker thread
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+
+
+def test_async_sentiment_endpoint(llm_stub):
+    llm_stub.reply = json.dumps(
+        {"label": "positive", "score": 0.8, "explanation": "Fan is happy."}
+    )
+
+    with TestClient(app) as client:
+        res = client.post("/api/ai/sentiment", json={"text": "What a race!"})
+
+    assert res.status_code == 200
+    assert res.json()["label"] == "positive"
+    assert res.json()["score"] == 0.8
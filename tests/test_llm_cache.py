@@ -0,0 +1,128 @@
+# tests/test_llm_cache.py
+
+import asyncio
+import threading
+import time
+
+from app.agents import llm_cache
+from app.agents.llm_cache import LLMResponseCache, MemoryCache, SQLiteCache, make_cache_key
+from app.agents.summarizer import acall_llm_system, call_llm_system
+
+
+def test_cache_key_normalizes_whitespace_and_covers_params():
+    base = make_cache_key("gpt-4o-mini", "sys", "what is  DRS ", 250, 0.2)
+
+    assert base == make_cache_key("gpt-4o-mini", "sys", "what is DRS", 250, 0.2)
+    assert base != make_cache_key("gpt-4o-mini", "sys", "what is DRS", 100, 0.2)
+    assert base != make_cache_key("gpt-4o", "sys", "what is DRS", 250, 0.2)
+    assert base != make_cache_key("gpt-4o-mini", "sys", "what is DRS", 250, 0.7)
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2, ttl=0.05)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # a is now most recent
+    cache.set("c", "3")           # evicts b
+
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_repeated_prompt_is_served_from_cache(llm_stub):
+    assert call_llm_system("next race") == "stub: next race"
+    assert call_llm_system("next race") == "stub: next race"
+    assert asyncio.run(acall_llm_system("next race")) == "stub: next race"
+
+    assert len(llm_stub.requests) == 1
+    stats = llm_cache.cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_fallback_answers_are_not_cached(llm_stub):
+    llm_stub.status = 503
+    assert call_llm_system("what is drs").startswith("[Local fallback answer]")
+
+    llm_stub.status = 200
+    assert call_llm_system("what is drs") == "stub: what is drs"
+    assert len(llm_stub.requests) == 2
+
+
+def test_sqlite_tier_survives_restart(llm_stub, monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE_SQLITE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    llm_cache.reset_cache()
+
+    call_llm_system("what is drs")
+    llm_cache.reset_cache()  # simulate a new process: memory tier is gone
+
+    assert call_llm_system("what is drs") == "stub: what is drs"
+    assert len(llm_stub.requests) == 1
+    tiers = llm_cache.cache_stats()["tiers"]
+    assert tiers["sqlite"]["hits"] == 1
+    assert tiers["memory"]["size"] == 1  # back-filled from disk
+
+
+def test_sqlite_cache_expires(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "c.sqlite"), ttl=0.01)
+    cache.set("k", "v")
+    time.sleep(0.02)
+
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+    cache.close()
+
+
+def test_backfill_keeps_the_stored_expiry(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "c.sqlite"), ttl=3600)
+    disk.set("k", "v")
+    stored = disk.get_entry("k")[1]
+    # the entry was written 59 minutes ago: one minute left on disk
+    disk.set("k", "v", expires_at=stored - 3540)
+
+    memory = MemoryCache(ttl=3600)
+    cache = LLMResponseCache([memory, disk])
+    assert cache.get("k") == "v"
+    assert memory.get_entry("k")[1] == disk.get_entry("k")[1]
+    assert memory.get_entry("k")[1] < time.time() + 61
+
+    memory.clear()
+    assert asyncio.run(cache.aget("k")) == "v"
+    assert memory.get_entry("k")[1] == disk.get_entry("k")[1]
+    disk.close()
+
+
+def test_async_paths_run_sqlite_off_the_event_loop(llm_stub, monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE_SQLITE_PATH", str(tmp_path / "llm_cache.sqlite"))
+    llm_cache.reset_cache()
+
+    loop_threads = []
+    sqlite_threads = []
+    real_get_entry, real_set = SQLiteCache.get_entry, SQLiteCache.set
+
+    def get_entry(self, key):
+        sqlite_threads.append(threading.get_ident())
+        return real_get_entry(self, key)
+
+    def set_(self, key, value, expires_at=None):
+        sqlite_threads.append(threading.get_ident())
+        return real_set(self, key, value, expires_at)
+
+    monkeypatch.setattr(SQLiteCache, "get_entry", get_entry)
+    monkeypatch.setattr(SQLiteCache, "set", set_)
+
+    async def run():
+        loop_threads.append(threading.get_ident())
+        first = await acall_llm_system("tyre strategy")   # miss: sqlite get + set
+        llm_cache.get_cache().tiers[0].clear()
+        second = await acall_llm_system("tyre strategy")  # sqlite hit
+        return first, second
+
+    assert asyncio.run(run()) == ("stub: tyre strategy", "stub: tyre strategy")
+    assert len(llm_stub.requests) == 1
+    assert len(sqlite_threads) == 3
+    assert loop_threads[0] not in sqlite_threads
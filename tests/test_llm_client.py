@@ -0,0 +1,45 @@
+# tests/test_llm_client.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.agents import llm_client
+from app.agents.summarizer import call_llm_system
+
+
+def test_call_llm_system_reuses_connection(llm_stub):
+    for i in range(5):
+        assert call_llm_system(f"question {i}") == f"stub: question {i}"
+
+    stats = llm_client.pool_stats()
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    assert stats["reuse_rate"] == 0.8
+    # one keep-alive socket on the server side too
+    assert len(llm_stub.client_ports) == 1
+
+
+def test_pool_size_bounds_connections_and_counts_waits(llm_stub, monkeypatch):
+    monkeypatch.setenv("LLM_POOL_SIZE", "2")
+    llm_client.reset_session()
+    llm_stub.delay = 0.05
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        answers = list(pool.map(call_llm_system, [f"q{i}" for i in range(8)]))
+
+    assert answers == [f"stub: q{i}" for i in range(8)]
+
+    stats = llm_client.pool_stats()
+    assert stats["pool_size"] == 2
+    assert stats["peak_in_flight"] <= 2
+    assert stats["new_connections"] <= 2
+    assert stats["waits"] > 0
+
+
+def test_http_error_uses_local_fallback(llm_stub):
+    llm_stub.status = 500
+
+    answer = call_llm_system("what is drs")
+
+    assert answer.startswith("[Local fallback answer]")
+    assert llm_client.pool_stats()["errors"] == 1
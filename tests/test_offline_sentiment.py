@@ -0,0 +1,58 @@
+# tests/test_offline_sentiment.py
+
+import random
+
+from app.agents.nlp_agent import (
+    _NEGATIVE_WORDS,
+    _POSITIVE_WORDS,
+    _offline_sentiment,
+    offline_sentiment_batch,
+)
+
+
+def _reference_label_score(text):
+    """
+    The original per-text keyword loop (English only).
+    """
+    t = (text or "").lower()
+    pos = sum(w in t for w in _POSITIVE_WORDS)
+    neg = sum(w in t for w in _NEGATIVE_WORDS)
+    if pos > neg:
+        return "positive", min(1.0, (pos - neg) / 5.0)
+    if neg > pos:
+        return "negative", -min(1.0, (neg - pos) / 5.0)
+    return "neutral", 0.0
+
+
+def test_batch_matches_per_text_loop_on_english():
+    rng = random.Random(0)
+    vocab = sorted(_POSITIVE_WORDS | _NEGATIVE_WORDS) + [
+        "lap", "pit", "Verstappen", "lovely", "whatever", "breakfast", "tyres", "!!", "",
+    ]
+    texts = [" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 12))) for _ in range(500)]
+    texts += ["", None, "GREAT GREAT great!!!", "so-bad,slow;terrible"]
+
+    results = offline_sentiment_batch(texts)
+
+    assert len(results) == len(texts)
+    for text, res in zip(texts, results):
+        assert (res["label"], res["score"]) == _reference_label_score(text)
+        assert res["raw_text"] == text
+        assert res["type"] == "sentiment"
+
+
+def test_arabic_lexicon():
+    results = offline_sentiment_batch([
+        "احب سباقات الفورمولا 1 خصوصاً لما يكون في منافسة قوية",
+        "آخر سباق كان ممل جداً، ما في تجاوزات",
+        "انتهى السباق بدون حوادث كبيرة",
+    ])
+
+    assert [r["label"] for r in results] == ["positive", "negative", "neutral"]
+
+
+def test_single_text_helper_uses_same_scorer():
+    assert _offline_sentiment("amazing start, awful pit stop, love it") == (
+        offline_sentiment_batch(["amazing start, awful pit stop, love it"])[0]
+    )
+    assert offline_sentiment_batch([]) == []
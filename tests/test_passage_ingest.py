@@ -0,0 +1,220 @@
+# tests/test_passage_ingest.py
+
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import retriever_text
+from app.agents.embedding_store import content_hash
+from app.agents.passage_ingest import DeltaSegment
+from app.main import app
+
+NEW_TEXT = "Piastri undercut Russell with a two stop strategy on lap 44."
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    drivers = ["Hamilton", "Verstappen", "Leclerc", "Norris"]
+    passages = [
+        {"text": f"{drivers[i % 4]} pitted for soft tyres on lap {i}.", "source": f"s{i}"}
+        for i in range(200)
+    ]
+    passages_file = tmp_path / "passages.json"
+    passages_file.write_text(json.dumps(passages))
+
+    monkeypatch.delenv("PASSAGE_EMBEDDINGS_FILE", raising=False)
+    monkeypatch.delenv("PASSAGE_INDEX_DIR", raising=False)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    monkeypatch.setenv("PASSAGE_COMPACT_AFTER", "0")
+    monkeypatch.setattr(retriever_text, "PASSAGES_FILE", str(passages_file))
+    retriever_text.reset_passage_cache()
+    yield passages
+    retriever_text.reset_passage_cache()
+
+
+def _sources(query, top_k=3):
+    # the local test embeddings are hash-based, so a passage found only by
+    # BM25 ties in RRF with the best vector hit: check the top-k, not rank 1
+    return [r["source"] for r in retriever_text.text_retriever(query, top_k=top_k)]
+
+
+def test_added_passage_is_searchable(corpus):
+    ids = retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+
+    assert ids == [content_hash(NEW_TEXT)]
+    assert "new" in _sources("Piastri undercut Russell")
+    assert retriever_text.corpus_stats()["delta_passages"] == 1
+
+
+def test_add_is_idempotent(corpus):
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}, corpus[0]])
+
+    stats = retriever_text.corpus_stats()
+    assert stats["delta_passages"] == 1
+    assert stats["live_passages"] == len(corpus) + 1
+
+
+def test_deleted_passages_are_hidden(corpus):
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    removed = retriever_text.delete_passages([content_hash(NEW_TEXT), content_hash(corpus[1]["text"])])
+
+    assert removed == 2
+    sources = _sources("Piastri undercut Russell Verstappen lap 1", top_k=10)
+    assert "new" not in sources
+    assert "s1" not in sources
+    assert retriever_text.corpus_stats()["live_passages"] == len(corpus) - 1
+
+    # re-adding revives it
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    assert "new" in _sources("Piastri undercut Russell")
+
+
+def test_journal_is_replayed_after_restart(corpus):
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    retriever_text.delete_passages([content_hash(corpus[0]["text"])])
+
+    retriever_text.reset_passage_cache()  # a fresh worker
+
+    assert "new" in _sources("Piastri undercut Russell")
+    assert retriever_text.corpus_stats()["tombstones"] == 1
+
+
+def test_delta_segment_updates_only_changed_rows():
+    base = [content_hash(t) for t in ["a", "b", "a", "c"]]  # "a" twice
+    seg = DeltaSegment(base, dim=4)
+    added = seg.with_added([{"text": "d"}, {"text": "e"}], np.ones((2, 4), dtype=np.float32))
+    deleted = added.with_deleted([content_hash("a"), content_hash("e"), "unknown"])
+
+    assert deleted.bm25 is added.bm25  # no text changed → no BM25 rebuild
+    assert deleted.dead.tolist() == [True, False, True, False, False, True]
+    assert (deleted.tombstones, deleted.base_tombstones) == (3, 2)
+    assert not added.dead.any()  # older segments are untouched
+
+    revived = deleted.with_added([{"text": "a"}], np.ones((1, 4), dtype=np.float32))
+    assert revived.bm25 is deleted.bm25
+    assert revived.dead.tolist() == [False, False, False, False, False, True]
+    assert (revived.tombstones, revived.base_tombstones) == (1, 0)
+    assert revived.deleted == frozenset({content_hash("e")})
+
+
+def test_compaction_folds_delta_into_base(corpus):
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    retriever_text.delete_passages([content_hash(corpus[0]["text"])])
+
+    result = retriever_text.compact_passages()
+
+    assert result == {"passages": len(corpus), "removed": 1, "merged": 1}
+    assert not os.path.exists(retriever_text.journal_file())
+    with open(retriever_text.PASSAGES_FILE, encoding="utf-8") as f:
+        on_disk = json.load(f)
+    assert [p["source"] for p in on_disk][-1] == "new"
+    assert "s0" not in {p["source"] for p in on_disk}
+
+    stats = retriever_text.corpus_stats()
+    assert (stats["base_passages"], stats["delta_passages"], stats["tombstones"]) == (len(corpus), 0, 0)
+    assert "new" in _sources("Piastri undercut Russell")
+
+    # nothing was re-embedded when reloading the compacted store
+    retriever_text.reset_passage_cache()
+    retriever_text.load_passage_embeddings()
+    assert retriever_text._embedding_stats["embedded"] == 0
+
+
+def test_ops_written_during_compaction_are_kept(corpus, monkeypatch):
+    retriever_text.add_passages([{"text": NEW_TEXT, "source": "new"}])
+    late = {"text": "Alonso gained four places on the opening lap.", "source": "late"}
+    seen = {}
+    real_build = retriever_text.load_or_build
+
+    def build_with_writers(*args, **kwargs):
+        monkeypatch.setattr(retriever_text, "load_or_build", real_build)
+        # another worker appends to the journal; a query and an ingest in
+        # this process must not wait for the rebuild
+        other = threading.Thread(
+            target=lambda: seen.update(
+                query=retriever_text.text_retriever("Hamilton soft tyres", top_k=3),
+                ids=retriever_text.add_passages([late]),
+            )
+        )
+        other.start()
+        other.join(timeout=5)
+        seen["blocked"] = other.is_alive()
+        return real_build(*args, **kwargs)
+
+    monkeypatch.setattr(retriever_text, "load_or_build", build_with_writers)
+    result = retriever_text.compact_passages()
+
+    assert seen["blocked"] is False
+    assert len(seen["query"]) == 3
+    assert result["merged"] == 1  # only the rotated op was compacted
+    stats = retriever_text.corpus_stats()
+    assert (stats["base_passages"], stats["delta_passages"]) == (len(corpus) + 1, 1)
+    assert "late" in _sources("Alonso gained four places", top_k=10)
+
+    # the late op is still in the journal for other workers / a restart
+    retriever_text.reset_passage_cache()
+    assert retriever_text.corpus_stats()["delta_passages"] == 1
+
+
+def test_queries_run_during_ingestion(corpus):
+    errors = []
+
+    def query_loop():
+        try:
+            for _ in range(30):
+                assert len(retriever_text.text_retriever("Hamilton soft tyres", top_k=3)) == 3
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    retriever_text.text_retriever("warm up")
+    readers = [threading.Thread(target=query_loop) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(20):
+        retriever_text.add_passages([{"text": f"Ingested passage number {i} about Alonso.", "source": f"n{i}"}])
+    retriever_text.compact_passages()
+    for t in readers:
+        t.join()
+
+    assert errors == []
+    assert retriever_text.corpus_stats()["base_passages"] == len(corpus) + 20
+
+
+def test_admin_endpoints_disabled_without_token(corpus):
+    with TestClient(app) as client:
+        res = client.post("/api/admin/passages", content=json.dumps({"text": NEW_TEXT}))
+        stats = client.get("/api/admin/passages/stats")
+
+    assert res.status_code == 503
+    assert stats.status_code == 503
+    assert retriever_text.corpus_stats()["delta_passages"] == 0
+
+
+def test_admin_endpoints(corpus, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    body = "\n".join(
+        [json.dumps({"text": NEW_TEXT, "source": "new"}), "not json", json.dumps({"source": "no text"}), ""]
+    )
+
+    with TestClient(app) as client:
+        denied = client.post("/api/admin/passages", content=body)
+        res = client.post("/api/admin/passages", content=body, headers={"X-Admin-Token": "secret"})
+        found = client.post("/api/retrieve/batch", json={"queries": ["Piastri undercut"], "top_k": 3})
+        deleted = client.request(
+            "DELETE",
+            "/api/admin/passages",
+            json={"ids": res.json()["ids"]},
+            headers={"X-Admin-Token": "secret"},
+        )
+        stats = client.get("/api/admin/passages/stats", headers={"X-Admin-Token": "secret"})
+
+    assert denied.status_code == 403
+    assert res.json() == {"added": 1, "skipped": 2, "ids": [content_hash(NEW_TEXT)]}
+    assert "new" in [r["source"] for r in found.json()["results"][0]]
+    assert deleted.json() == {"deleted": 1}
+    assert stats.json()["tombstones"] == 1
@@ -0,0 +1,86 @@
+# tests/test_quantization.py
+
+import numpy as np
+import pytest
+
+from app.agents import ann_index
+from app.agents.ann_index import IVFIndex, exact_search, normalize_rows, quantize_rows
+from app.benchmark_retrieval import run_benchmark, synthetic_corpus
+
+
+def test_int8_rows_roundtrip_within_one_step():
+    unit = normalize_rows(np.random.RandomState(0).normal(size=(500, 64)))
+    codes, scales = quantize_rows(unit, "int8")
+
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    err = np.abs(codes.astype(np.float32) * scales[:, None] - unit)
+    assert np.all(err <= scales[:, None] / 2 + 1e-7)
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+@pytest.mark.parametrize("exact_threshold", [10**9, 0])
+def test_quantized_search_reranks_in_float32(mode, exact_threshold):
+    vectors, queries = synthetic_corpus(3000, 32, 40)
+    unit = normalize_rows(vectors)
+    index = IVFIndex(
+        n_lists=30, n_probe=30, exact_threshold=exact_threshold, quantization=mode
+    ).build(vectors)
+
+    for q in queries:
+        ids, scores = index.search(q, 10)
+        exact_ids, exact_scores = exact_search(unit, q, 10)
+        # re-ranked scores are exact float32 cosines
+        np.testing.assert_allclose(scores, unit[ids] @ normalize_rows(q[None])[0], rtol=1e-5)
+        assert len(np.intersect1d(ids, exact_ids)) >= 9
+
+
+def test_quantized_matrix_is_smaller():
+    vectors, _ = synthetic_corpus(2000, 64, 1)
+
+    sizes = {
+        mode: IVFIndex(quantization=mode).build(vectors).memory_bytes()
+        for mode in ("none", "float16", "int8")
+    }
+
+    assert sizes["float16"] == sizes["none"] // 2
+    assert sizes["int8"] < sizes["none"] // 3
+
+
+def test_save_load_keeps_codes(tmp_path):
+    vectors, queries = synthetic_corpus(2000, 32, 5)
+    index = IVFIndex(exact_threshold=0, n_lists=20, quantization="int8").build(vectors)
+    index.save(str(tmp_path / "idx"))
+
+    loaded = IVFIndex.load(str(tmp_path / "idx"))
+
+    assert loaded.quantization == "int8"
+    assert loaded.codes.dtype == np.int8
+    assert isinstance(loaded.vectors, np.memmap)
+    for q in queries:
+        np.testing.assert_array_equal(index.search(q, 5)[0], loaded.search(q, 5)[0])
+
+
+def test_unknown_quantization_is_rejected():
+    with pytest.raises(ValueError):
+        IVFIndex(quantization="int4")
+
+
+def test_benchmark_reports_memory_and_recall():
+    rows = run_benchmark(n=3000, dim=32, n_queries=20, k=5)
+
+    assert [r["quantization"] for r in rows] == ["none", "float16", "int8"]
+    assert rows[2]["memory_mb"] < rows[1]["memory_mb"] < rows[0]["memory_mb"]
+    assert all(r["recall_at_k"] > 0.8 for r in rows)
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_blockwise_quantized_scan_matches_full_scan(mode, monkeypatch):
+    vectors, queries = synthetic_corpus(3000, 32, 20)
+    index = IVFIndex(exact_threshold=10**9, quantization=mode).build(vectors)
+    q = normalize_rows(queries)
+    full = np.sort(index._quantized_candidates(q, 40), axis=1)
+
+    monkeypatch.setattr(ann_index, "_DEQUANT_BLOCK", 256)  # 12 blocks
+    blocked = np.sort(index._quantized_candidates(q, 40), axis=1)
+
+    np.testing.assert_array_equal(blocked, full)
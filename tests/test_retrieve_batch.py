@@ -0,0 +1,90 @@
+# tests/test_retrieve_batch.py
+
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import retriever_text
+from app.agents.ann_index import IVFIndex, exact_search, normalize_rows
+from app.main import app
+
+QUERIES = [
+    "Why did Hamilton pit on lap 30?",
+    "Verstappen soft tyres",
+    "safety car crash",
+    "nothing relevant here at all",
+    "lap 12",
+]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    drivers = ["Hamilton", "Verstappen", "Leclerc", "Norris"]
+    compounds = ["soft", "medium", "hard"]
+    passages = [
+        {
+            "text": f"{drivers[i % 4]} pitted for {compounds[i % 3]} tyres on lap {i % 60}.",
+            "source": f"s{i}",
+        }
+        for i in range(400)
+    ]
+    passages_file = tmp_path / "passages.json"
+    passages_file.write_text(json.dumps(passages))
+
+    monkeypatch.delenv("PASSAGE_EMBEDDINGS_FILE", raising=False)
+    monkeypatch.delenv("PASSAGE_INDEX_DIR", raising=False)
+    monkeypatch.setattr(retriever_text, "PASSAGES_FILE", str(passages_file))
+    retriever_text.reset_passage_cache()
+    yield passages
+    retriever_text.reset_passage_cache()
+
+
+@pytest.mark.parametrize("exact_threshold", ["100000", "50"])
+def test_batch_matches_single_query(corpus, monkeypatch, exact_threshold):
+    monkeypatch.setenv("ANN_EXACT_THRESHOLD", exact_threshold)
+    retriever_text.reset_passage_cache()
+
+    batch = retriever_text.text_retriever_batch(QUERIES, top_k=5)
+
+    assert len(batch) == len(QUERIES)
+    for query, results in zip(QUERIES, batch):
+        single = retriever_text.text_retriever(query, top_k=5)
+        assert len(results) == 5
+        # same passages, same order; the cosine can differ in the last
+        # float32 bit (matrix-matrix vs matrix-vector BLAS kernels)
+        assert [r["source"] for r in results] == [r["source"] for r in single]
+        for a, b in zip(results, single):
+            assert a["rrf_score"] == b["rrf_score"]
+            assert a["bm25_score"] == b["bm25_score"]
+            assert a["score"] == pytest.approx(b["score"], abs=1e-6)
+
+
+def test_exact_batch_search_matches_loop():
+    rng = np.random.RandomState(1)
+    unit = normalize_rows(rng.normal(size=(1000, 16)))
+    queries = rng.normal(size=(300, 16)).astype(np.float32)
+
+    index = IVFIndex().build(unit)
+    ids, scores = index.search_batch(queries, top_k=7)
+
+    assert ids.shape == scores.shape == (300, 7)
+    for row, q in enumerate(queries):
+        exact_ids, _ = exact_search(unit, q, 7)
+        np.testing.assert_array_equal(ids[row], exact_ids)
+
+
+def test_empty_batch():
+    assert retriever_text.text_retriever_batch([]) == []
+
+
+def test_retrieve_batch_endpoint(corpus):
+    with TestClient(app) as client:
+        res = client.post("/api/retrieve/batch", json={"queries": QUERIES[:2], "top_k": 2})
+
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == 2
+    assert [len(r) for r in body["results"]] == [2, 2]
+    assert "Hamilton" in body["results"][0][0]["text"]
@@ -0,0 +1,73 @@
+# tests/test_sentiment_batch.py
+
+import json
+import re
+
+from fastapi.testclient import TestClient
+
+from app.agents.nlp_agent import analyze_sentiment_batch
+from app.main import app
+
+
+def _batch_responder(body):
+    """
+    Reply like the LLM: a JSON array for batch prompts, an object for single ones.
+    """
+    prompt = body["messages"][-1]["content"]
+    items = [json.loads(line) for line in re.findall(r"^\{\"id\".*\}$", prompt, re.M)]
+    if items:
+        return json.dumps([
+            {
+                "id": it["id"],
+                "label": "positive" if "love" in it["text"] else "negative",
+                "score": 0.9 if "love" in it["text"] else -0.9,
+                "explanation": "stub",
+            }
+            for it in items
+        ])
+    return json.dumps({"label": "neutral", "score": 0.0, "explanation": "single"})
+
+
+def test_batch_packs_comments_into_few_calls(llm_stub):
+    llm_stub.responder = _batch_responder
+    texts = [f"I love lap {i}" if i % 2 else f"boring lap {i}" for i in range(45)]
+
+    results = analyze_sentiment_batch(texts, batch_size=20)
+
+    assert len(llm_stub.requests) == 3  # 20 + 20 + 5
+    assert [r["label"] for r in results] == [
+        "positive" if i % 2 else "negative" for i in range(45)
+    ]
+    assert results[3]["raw_text"] == "I love lap 3"
+
+
+def test_unparseable_chunk_is_retried_per_item(llm_stub):
+    def responder(body):
+        prompt = body["messages"][-1]["content"]
+        if "JSON array" in prompt:
+            return "sorry, I cannot do that"
+        return _batch_responder(body)
+
+    llm_stub.responder = responder
+
+    results = analyze_sentiment_batch(["great race", "bad strategy", ""], batch_size=10)
+
+    # 1 batch call + 2 single retries; the empty text is never sent
+    assert len(llm_stub.requests) == 3
+    assert [r["label"] for r in results] == ["neutral", "neutral", "unknown"]
+
+
+def test_batch_endpoint(llm_stub):
+    llm_stub.responder = _batch_responder
+
+    with TestClient(app) as client:
+        res = client.post(
+            "/api/ai/sentiment/batch",
+            json={"texts": ["love it", "hate it", "love the pit stop"], "batch_size": 2},
+        )
+
+    data = res.json()
+    assert res.status_code == 200
+    assert data["count"] == 3
+    assert [r["label"] for r in data["results"]] == ["positive", "negative", "positive"]
+    assert len(llm_stub.requests) == 2
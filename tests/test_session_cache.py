@@ -0,0 +1,116 @@
+# tests/test_session_cache.py
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.session_cache import SessionCache, estimate_session_bytes
+
+
+class FakeSession:
+    """Stand-in for a loaded fastf1 Session (same DataFrame attributes)."""
+
+    def __init__(self, rows=1000, drivers=2):
+        self.laps = pd.DataFrame({"LapNumber": np.arange(rows, dtype=float), "Driver": ["HAM"] * rows})
+        self.car_data = {str(d): pd.DataFrame({"Speed": np.zeros(rows)}) for d in range(drivers)}
+
+    @property
+    def weather_data(self):
+        raise RuntimeError("not loaded")  # like fastf1's DataNotLoadedError
+
+
+def test_estimate_counts_dataframes():
+    session = FakeSession(rows=1000, drivers=3)
+    expected = session.laps.memory_usage(deep=True).sum() + sum(
+        df.memory_usage(deep=True).sum() for df in session.car_data.values()
+    )
+    assert estimate_session_bytes(session) == expected
+    assert estimate_session_bytes(object()) == 0
+
+
+def test_hits_and_misses():
+    cache = SessionCache(max_bytes=10**9)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return FakeSession()
+
+    a = cache.get((2023, "bahrain", "R"), load)
+    b = cache.get((2023, "bahrain", "R"), load)
+    cache.get((2023, "jeddah", "R"), load)
+
+    assert a is b
+    assert len(loads) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["sessions"]) == (1, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+    assert stats["resident_bytes"] == 2 * estimate_session_bytes(a)
+
+
+def test_size_aware_lru_eviction():
+    one = estimate_session_bytes(FakeSession())
+    cache = SessionCache(max_bytes=int(one * 2.5))
+
+    cache.get("a", FakeSession)
+    cache.get("b", FakeSession)
+    cache.get("a", FakeSession)  # a is now most recently used
+    cache.get("c", FakeSession)  # over budget → evict b (LRU)
+
+    stats = cache.stats()
+    assert stats["keys"] == ["a", "c"]
+    assert stats["evictions"] == 1
+    assert stats["resident_bytes"] <= cache.max_bytes
+
+
+def test_big_session_is_still_kept():
+    cache = SessionCache(max_bytes=1)
+    session = cache.get("big", FakeSession)
+    assert cache.get("big", FakeSession) is session
+    assert cache.stats()["sessions"] == 1
+
+
+def test_max_sessions():
+    cache = SessionCache(max_bytes=10**9, max_sessions=2)
+    for key in "abc":
+        cache.get(key, FakeSession)
+    assert cache.stats()["keys"] == ["b", "c"]
+
+
+def test_concurrent_misses_load_once():
+    cache = SessionCache(max_bytes=10**9)
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.1)
+        return FakeSession()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get((2023, "bahrain", "R"), slow_load)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert cache.stats()["loads"] == 1
+
+
+def test_failed_load_is_not_cached():
+    cache = SessionCache(max_bytes=10**9)
+
+    def broken():
+        raise ValueError("no such session")
+
+    with pytest.raises(ValueError):
+        cache.get("x", broken)
+    assert cache.get("x", FakeSession) is not None
+    assert cache.stats()["sessions"] == 1
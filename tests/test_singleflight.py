@@ -0,0 +1,51 @@
+# tests/test_singleflight.py
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from app.agents.summarizer import acall_llm_system, call_llm_system, llm_flight
+
+
+def test_concurrent_identical_prompts_share_one_request(llm_stub):
+    llm_stub.delay = 0.2
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        answers = list(pool.map(lambda _: call_llm_system("who won the race?"), range(20)))
+
+    assert set(answers) == {"stub: who won the race?"}
+    assert len(llm_stub.requests) == 1
+    stats = llm_flight.stats()
+    assert stats["upstream_calls"] == 1
+    # the rest either waited on the in-flight call or hit the cache afterwards
+    assert stats["coalesced"] >= 1
+
+
+def test_async_callers_are_coalesced(llm_stub):
+    llm_stub.delay = 0.2
+
+    async def run():
+        prompts = ["who won the race?"] * 50 + ["fastest lap?"] * 50
+        return await asyncio.gather(*[acall_llm_system(p) for p in prompts])
+
+    answers = asyncio.run(run())
+
+    assert answers.count("stub: who won the race?") == 50
+    assert answers.count("stub: fastest lap?") == 50
+    assert len(llm_stub.requests) == 2
+    assert llm_flight.stats()["coalesced"] == 98
+    assert llm_flight.stats()["in_flight"] == 0
+
+
+def test_failure_is_shared_and_not_sticky(llm_stub):
+    llm_stub.delay = 0.1
+    llm_stub.status = 500
+
+    async def run():
+        return await asyncio.gather(*[acall_llm_system("pit window?") for _ in range(5)])
+
+    answers = asyncio.run(run())
+    assert all(a.startswith("[Local fallback answer]") for a in answers)
+    assert len(llm_stub.requests) == 1
+
+    llm_stub.status = 200
+    assert call_llm_system("pit window?") == "stub: pit window?"
@@ -0,0 +1,108 @@
+# tests/test_streaming.py
+
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.agents.summarizer import astream_llm_system
+from app.main import app
+
+
+def _parse_sse(raw: str):
+    events = []
+    for block in raw.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_tokens_arrive_before_completion_finishes(llm_stub):
+    llm_stub.reply = "Hamilton pitted on lap 30 for mediums"
+    llm_stub.stream_delay = 0.1
+
+    async def run():
+        t0 = time.perf_counter()
+        first_at = None
+        pieces = []
+        async for piece in astream_llm_system("why did hamilton pit?"):
+            if first_at is None:
+                first_at = time.perf_counter() - t0
+            pieces.append(piece)
+        return first_at, time.perf_counter() - t0, pieces
+
+    ttfb, total, pieces = asyncio.run(run())
+
+    assert "".join(pieces) == "Hamilton pitted on lap 30 for mediums"
+    assert len(pieces) == 7
+    assert ttfb < total / 3
+
+
+def test_streamed_answer_is_cached(llm_stub):
+    async def collect():
+        return [p async for p in astream_llm_system("what is drs")]
+
+    assert "".join(asyncio.run(collect())) == "stub: what is drs"
+    assert asyncio.run(collect()) == ["stub: what is drs"]  # one piece from cache
+    assert len(llm_stub.requests) == 1
+
+
+def test_qa_stream_endpoint_sends_tokens_then_evidence(llm_stub):
+    llm_stub.reply = "He pitted because tyre temps were rising"
+
+    with TestClient(app) as client:
+        res = client.post(
+            "/api/ai/qa/stream",
+            json={"question": "Why did Hamilton pit?", "driver_id": "44", "lap": 30},
+        )
+
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(res.text)
+    tokens = [data["text"] for name, data in events if name == "token"]
+    name, done = events[-1]
+
+    assert "".join(tokens) == "He pitted because tyre temps were rising"
+    assert len(tokens) > 1
+    assert name == "done"
+    assert done["type"] == "qa"
+    assert isinstance(done["confidence"], float)
+    assert any(e.get("source") == "fastf1_log" for e in done["evidence"])
+
+
+def test_qa_stream_uses_offline_answer_when_llm_down(llm_stub):
+    llm_stub.status = 500
+
+    with TestClient(app) as client:
+        res = client.post(
+            "/api/ai/qa/stream",
+            json={"question": "Why did Hamilton pit?", "driver_id": "44", "lap": 30},
+        )
+
+    events = _parse_sse(res.text)
+    assert events[0][1]["text"].startswith("Based on the available context")
+    assert events[-1][0] == "done"
+
+
+def test_summary_stream_endpoint(llm_stub):
+    llm_stub.reply = "Verstappen won from pole"
+
+    with TestClient(app) as client:
+        res = client.post(
+            "/api/ai/summary/stream",
+            json={"text": "Max Verstappen started on pole and won the race.", "length": "short"},
+        )
+
+    events = _parse_sse(res.text)
+    assert "".join(d["text"] for n, d in events if n == "token") == "Verstappen won from pole"
+    assert events[-1][1]["mode"] == "single"
+    assert events[-1][1]["max_words"] == 40
+
+
+def test_stream_requires_question(llm_stub):
+    with TestClient(app) as client:
+        res = client.post("/api/ai/qa/stream", json={"question": ""})
+
+    assert _parse_sse(res.text) == [
+        ("error", {"type": "error", "message": "Question is required."})
+    ]
@@ -0,0 +1,116 @@
+# tests/test_summary_chunked.py
+
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.agents.nlp_agent import (
+    _split_into_chunks,
+    asummarize_text_chunked,
+    summarize_text_chunked,
+)
+from app.main import app
+
+
+def _race_report(n_sentences: int) -> str:
+    sentences = [
+        f"On lap {i} the leader lapped in 1:3{i % 10}.{i % 7}00 while the chasing car lost time."
+        for i in range(n_sentences)
+    ]
+    paragraphs = [" ".join(sentences[i:i + 10]) for i in range(0, n_sentences, 10)]
+    return "\n\n".join(paragraphs)
+
+
+def _summary_responder(body):
+    prompt = body["messages"][-1]["content"]
+    if "Combine them" in prompt:
+        return "Final race summary."
+    return "Part summary with a few key events."
+
+
+def test_chunks_follow_sentence_boundaries():
+    text = _race_report(100)  # ~1500 words
+    chunks = _split_into_chunks(text, chunk_words=200)
+
+    assert len(chunks) > 1
+    assert all(len(c.split()) <= 200 for c in chunks)
+    assert all(c.endswith("time.") for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_long_sentence_is_cut_by_words():
+    chunks = _split_into_chunks("word " * 250, chunk_words=100)
+    assert [len(c.split()) for c in chunks] == [100, 100, 50]
+
+
+def test_map_reduce_wall_clock_scales_with_parallelism(llm_stub):
+    llm_stub.responder = _summary_responder
+    llm_stub.delay = 0.15
+    text = _race_report(1350)  # ~20k words
+
+    def run(parallelism):
+        t0 = time.perf_counter()
+        result = asyncio.run(
+            asummarize_text_chunked(text, max_words=80, chunk_words=2000, parallelism=parallelism)
+        )
+        return result, time.perf_counter() - t0
+
+    serial, t_serial = run(1)
+    parallel, t_parallel = run(10)
+
+    assert serial["summary"] == parallel["summary"] == "Final race summary."
+    assert serial["chunks"] == parallel["chunks"] >= 10
+    # 11 sequential round-trips vs 2 (one map wave + reduce)
+    assert t_parallel < t_serial / 3
+
+
+def test_sync_chunked_summary_and_fallback(llm_stub):
+    llm_stub.responder = _summary_responder
+    text = _race_report(300)
+
+    result = summarize_text_chunked(text, max_words=50, chunk_words=1000, parallelism=4)
+    assert result["summary"] == "Final race summary."
+    assert result["original_length"] == len(text.split())
+
+    llm_stub.status = 500
+    fallback = summarize_text_chunked(text + " extra", max_words=50, chunk_words=1000)
+    assert fallback["summary"] == " ".join(text.split()[:50])
+
+
+def test_summary_endpoint_switches_to_chunked_mode(llm_stub, monkeypatch):
+    import app.main as main
+
+    llm_stub.responder = _summary_responder
+    monkeypatch.setattr(main, "SUMMARY_CHUNKED_THRESHOLD", 1000)
+
+    with TestClient(app) as client:
+        short = client.post("/api/ai/summary", json={"text": _race_report(10)}).json()
+        long = client.post(
+            "/api/ai/summary", json={"text": _race_report(300), "chunk_words": 1000}
+        ).json()
+
+    assert short["mode"] == "single"
+    assert long["mode"] == "chunked"
+    assert long["chunks"] == len(_split_into_chunks(_race_report(300), 1000))
+    assert long["summary"] == "Final race summary."
+
+
+def test_summary_endpoint_rejects_out_of_range_chunking(llm_stub):
+    from app.agents.nlp_agent import SUMMARY_PARALLELISM
+
+    bad_bodies = [
+        {"chunk_words": 1},
+        {"chunk_words": 100000},
+        {"parallelism": 0},
+        {"parallelism": SUMMARY_PARALLELISM + 1},
+    ]
+    with TestClient(app) as client:
+        for body in bad_bodies:
+            resp = client.post("/api/ai/summary", json={"text": "Lap 1.", **body})
+            assert resp.status_code == 422, body
+        ok = client.post(
+            "/api/ai/summary",
+            json={"text": "Lap 1.", "chunk_words": 200, "parallelism": SUMMARY_PARALLELISM},
+        )
+    assert ok.status_code == 200
@@ -0,0 +1,61 @@
+# tests/test_telemetry_batch.py
+
+import numpy as np
+import pytest
+import torch
+
+from app.benchmark_telemetry_model import run_benchmark, synthetic_sequences
+from app.sarah_model import load_telemetry_model, predict_pace_drop, predict_pace_drop_batch
+from app.telemetry_features import array_to_sequence
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return load_telemetry_model()
+
+
+@pytest.fixture(scope="module")
+def sequences():
+    return synthetic_sequences(40, min_len=1, max_len=120, seed=3)
+
+
+@pytest.mark.parametrize("pack", [False, True])
+@pytest.mark.parametrize("batch_size", [1, 3, 16, 256])
+def test_batch_matches_single(model, sequences, batch_size, pack):
+    single = np.array([predict_pace_drop(model, s) for s in sequences], dtype=np.float32)
+    batch = predict_pace_drop_batch(model, sequences, batch_size=batch_size, pack=pack)
+
+    assert batch.shape == (len(sequences),) and batch.dtype == np.float32
+    np.testing.assert_allclose(batch, single, rtol=0, atol=1e-6)
+
+
+def test_dict_sequences_and_order(model, sequences):
+    dicts = [array_to_sequence(s) for s in sequences[:5]]
+    reversed_probs = predict_pace_drop_batch(model, dicts[::-1], batch_size=2)
+    probs = predict_pace_drop_batch(model, dicts, batch_size=2)
+
+    np.testing.assert_allclose(probs[::-1], reversed_probs, atol=1e-6)
+
+
+def test_batch_size_from_env(model, sequences, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_BATCH_SIZE", "7")
+    np.testing.assert_allclose(
+        predict_pace_drop_batch(model, sequences),
+        predict_pace_drop_batch(model, sequences, batch_size=40),
+        atol=1e-6,
+    )
+
+
+def test_empty_sequence_is_rejected(model, sequences):
+    with pytest.raises(ValueError, match="index 1"):
+        predict_pace_drop_batch(model, [sequences[0], np.zeros((0, 10), dtype=np.float32)])
+    assert predict_pace_drop_batch(model, []).shape == (0,)
+
+
+def test_benchmark_runs():
+    rows = run_benchmark([1, 4], n_sequences=6, min_len=5, max_len=20)
+    assert [(r["mode"], r["batch_size"]) for r in rows] == [
+        ("single", 1), ("padded", 1), ("padded", 4), ("packed", 1), ("packed", 4)
+    ]
+    assert max(r["max_abs_diff"] for r in rows) < 1e-5
@@ -0,0 +1,115 @@
+# tests/test_telemetry_batcher.py
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+import torch
+from fastapi.testclient import TestClient
+
+from app import telemetry_batcher
+from app.benchmark_telemetry_model import synthetic_sequences
+from app.main import app
+from app.sarah_model import load_telemetry_model, predict_pace_drop
+from app.telemetry_batcher import TelemetryBatcher
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return load_telemetry_model()
+
+
+@pytest.fixture
+def sequences():
+    return synthetic_sequences(32, min_len=5, max_len=60, seed=4)
+
+
+def test_concurrent_requests_share_batches(model, sequences):
+    batcher = TelemetryBatcher(model, max_batch=8, max_wait_ms=50)
+    results = [None] * len(sequences)
+    start = threading.Barrier(len(sequences))
+
+    def call(i):
+        start.wait()
+        results[i] = batcher.predict(sequences[i], timeout=10)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(sequences))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    expected = [predict_pace_drop(model, s) for s in sequences]
+    np.testing.assert_allclose(results, expected, atol=1e-6)
+
+    stats = batcher.stats()
+    assert stats["items"] == len(sequences)
+    assert stats["batches"] < len(sequences)
+    assert max(int(k) for k in stats["batch_sizes"]) <= 8
+    assert stats["latency"]["count"] == len(sequences)
+    assert stats["latency"]["p99"] >= stats["latency"]["p50"] > 0
+    assert stats["queue_depth"] == 0
+
+
+def test_single_request_waits_at_most_max_wait(model, sequences):
+    batcher = TelemetryBatcher(model, max_batch=64, max_wait_ms=1)
+    assert batcher.predict(sequences[0], timeout=5) == pytest.approx(predict_pace_drop(model, sequences[0]), abs=1e-6)
+    assert batcher.stats()["batch_sizes"] == {"1": 1}
+    batcher.close()
+
+
+def test_async_callers(model, sequences):
+    batcher = TelemetryBatcher(model, max_batch=16, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.apredict(s) for s in sequences[:16]))
+
+    probs = asyncio.run(main())
+    batcher.close()
+
+    np.testing.assert_allclose(probs, [predict_pace_drop(model, s) for s in sequences[:16]], atol=1e-6)
+    assert batcher.stats()["batches"] <= 2
+
+
+def test_bad_input_and_closed_batcher(model, sequences):
+    batcher = TelemetryBatcher(model)
+    with pytest.raises(ValueError):
+        batcher.submit(np.zeros((0, 10), dtype=np.float32))
+    with pytest.raises(ValueError):
+        batcher.submit(np.zeros((20, 5), dtype=np.float32))
+
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(sequences[0])
+
+
+def test_pace_drop_endpoint(sequences):
+    telemetry_batcher.shutdown_batcher()
+    body = {"sequences": [s.tolist() for s in sequences[:3]]}
+
+    with TestClient(app) as client:
+        res = client.post("/api/telemetry/pace_drop", json=body)
+        bad = client.post("/api/telemetry/pace_drop", json={"sequences": [[[1.0, 2.0]]]})
+        stats = client.get("/api/telemetry/batcher/stats").json()
+
+    assert res.json()["count"] == 3
+    assert all(0.0 <= p <= 1.0 for p in res.json()["probabilities"])
+    assert bad.status_code == 422
+    assert stats["started"] is True
+    assert stats["items"] == 3
+    # the app's shutdown closed the shared batcher
+    assert telemetry_batcher._batcher is None
+
+
+def test_batcher_stats_do_not_start_the_batcher():
+    telemetry_batcher.shutdown_batcher()
+
+    with TestClient(app) as client:
+        stats = client.get("/api/telemetry/batcher/stats").json()
+        # not created by the stats call
+        assert telemetry_batcher._batcher is None
+
+    assert stats == {"started": False}
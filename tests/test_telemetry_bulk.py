@@ -0,0 +1,184 @@
+# tests/test_telemetry_bulk.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import telemetry_bulk
+from app.benchmark_session_extraction import run_benchmark, synthetic_session
+from app.telemetry_features import telemetry_to_array
+
+
+@pytest.fixture(scope="module")
+def jobs():
+    yield synthetic_session(n_drivers=4, n_laps=6, samples_per_lap=50)
+    telemetry_bulk.shutdown_pool()
+
+
+def _by_key(results):
+    return {(driver, lap): features for driver, lap, features in results}
+
+
+def test_laps_are_sliced_by_session_time(jobs):
+    driver, telemetry, numbers, starts, ends, track_temp = jobs[0]
+    results = telemetry_bulk.extract_driver_laps(jobs[0])
+
+    assert [lap for _, lap, _ in results] == list(range(1, 7))
+    times = telemetry["SessionTime"].dt.total_seconds().to_numpy()
+    for (_, lap, features), start, end in zip(results, starts, ends):
+        expected = telemetry_to_array(telemetry[(times >= start) & (times <= end)], track_temp)
+        np.testing.assert_array_equal(features, expected)
+        assert features.dtype == np.float32 and features.shape[1] == 10
+
+
+def test_lap_filter_and_missing_lap_times():
+    telemetry = pd.DataFrame(
+        {"SessionTime": pd.to_timedelta(np.arange(0, 30, 1.0), unit="s"), "Speed": np.arange(30.0)}
+    )
+    laps = pd.DataFrame(
+        {
+            "LapNumber": [1.0, 2.0, 3.0],
+            "LapStartTime": pd.to_timedelta([0.0, 10.0, np.nan], unit="s"),
+            "Time": pd.to_timedelta([9.5, 19.5, 29.5], unit="s"),
+        }
+    )
+
+    all_laps = telemetry_bulk.extract_driver_laps(telemetry_bulk.driver_job("HAM", telemetry, laps, 40.0))
+    only_two = telemetry_bulk.extract_driver_laps(telemetry_bulk.driver_job("HAM", telemetry, laps, 40.0, [2]))
+
+    # lap 3 has no start time (e.g. red flag) → skipped
+    assert [lap for _, lap, _ in all_laps] == [1, 2]
+    assert [lap for _, lap, _ in only_two] == [2]
+    assert only_two[0][2][:, 0].tolist() == list(range(10, 20))
+
+
+def test_process_pool_matches_in_process(jobs):
+    serial = _by_key(telemetry_bulk.extract_session(jobs, processes=1))
+    pooled = _by_key(telemetry_bulk.extract_session(jobs, processes=2))
+
+    assert len(serial) == 4 * 6
+    assert serial.keys() == pooled.keys()
+    for key in serial:
+        np.testing.assert_array_equal(serial[key], pooled[key])
+
+
+def test_stream_can_stop_early(jobs):
+    stream = telemetry_bulk.extract_session(jobs, processes=2)
+    first = next(stream)
+    stream.close()
+
+    assert first[0].startswith("D")
+
+
+def test_pools_of_other_sizes_do_not_cancel_running_work(jobs):
+    stream = telemetry_bulk.extract_session(jobs, processes=2)
+    first = next(stream)
+
+    # another caller asks for a different pool size mid-stream
+    other = _by_key(telemetry_bulk.extract_session(jobs[:1], processes=3))
+    rest = [first] + list(stream)
+
+    assert telemetry_bulk.get_pool(2) is not telemetry_bulk.get_pool(3)
+    assert len(other) == 6
+    assert len(rest) == 4 * 6
+
+
+def test_in_flight_jobs_are_bounded():
+    lock = threading.Lock()
+    pulled = []
+    running = [0, 0]  # now, max
+
+    def job_source():
+        for i in range(20):
+            pulled.append(i)
+            yield i
+
+    def worker(i):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        threading.Event().wait(0.01)
+        with lock:
+            running[0] -= 1
+        return [("D", i, np.zeros((1, 10), dtype=np.float32))]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        stream = telemetry_bulk.extract_session(
+            job_source(), executor=executor, worker=worker, max_in_flight=3
+        )
+        next(stream)
+        assert len(pulled) <= 2 * 3  # the first batch + its refills, not all 20
+        laps = [lap for _, lap, _ in stream]
+
+    assert running[1] <= 3
+    assert len(laps) == 19
+
+
+def test_benchmark_reports_speedup():
+    rows = run_benchmark([1], n_drivers=2, n_laps=3, repeats=1)
+    assert [(r["processes"], r["laps"]) for r in rows] == [(1, 6)]
+    assert set(rows[0]) == {"processes", "laps", "seconds", "speedup"}
+
+
+class _DriverLaps(pd.DataFrame):
+    """FastF1 Laps stand-in: a laps table + the driver's merged telemetry."""
+
+    _metadata = ["telemetry"]
+
+    @property
+    def _constructor(self):
+        return _DriverLaps
+
+    def get_telemetry(self):
+        return self.telemetry
+
+
+class _FakeSession:
+    def __init__(self, jobs):
+        self.drivers = [job[0] for job in jobs] + ["NOLAPS"]
+        self.weather_data = pd.DataFrame({"TrackTemp": [38.0, 38.0]})
+        self._laps = {}
+        for driver, telemetry, numbers, starts, ends, _ in jobs:
+            laps = _DriverLaps(
+                {
+                    "LapNumber": numbers,
+                    "LapStartTime": pd.to_timedelta(starts, unit="s"),
+                    "Time": pd.to_timedelta(ends, unit="s"),
+                }
+            )
+            laps.telemetry = telemetry
+            self._laps[driver] = laps
+
+    @property
+    def laps(self):
+        return self
+
+    def pick_driver(self, driver):
+        return self._laps.get(driver, _DriverLaps({"LapNumber": []}))
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_load_session_telemetry_loads_session_once(jobs, monkeypatch, processes):
+    pytest.importorskip("fastf1")
+    from app import get_real_telemetry
+
+    session = _FakeSession(jobs)
+    loads = []
+    monkeypatch.setattr(
+        get_real_telemetry, "_load_session", lambda *key: loads.append(key) or session
+    )
+
+    results = list(get_real_telemetry.load_session_telemetry(2023, "Bahrain", "R", laps=[2, 5], processes=processes))
+
+    assert loads == [(2023, "Bahrain", "R")]
+    expected = _by_key(
+        r for job in jobs for r in telemetry_bulk.extract_driver_laps(job) if r[1] in (2, 5)
+    )
+    got = _by_key(results)
+    assert got.keys() == expected.keys() and len(results) == 4 * 2
+    for key, features in got.items():
+        assert isinstance(features, np.ndarray) and features.dtype == np.float32
+        np.testing.assert_array_equal(features, expected[key])
@@ -0,0 +1,94 @@
+# tests/test_telemetry_cache.py
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app import telemetry_cache
+from app.telemetry_features import telemetry_to_array
+from tests.test_telemetry_features import synthetic_lap
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_FEATURE_CACHE_DIR", str(tmp_path / "features"))
+    return tmp_path / "features"
+
+
+def _builder(calls, seed=0):
+    def build():
+        calls.append(1)
+        return telemetry_to_array(synthetic_lap(seed=seed), track_temp=38.0)
+
+    return build
+
+
+def test_miss_builds_then_hit_is_memory_mapped(cache_dir):
+    calls = []
+    first = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls))
+    second = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls))
+
+    assert calls == [1]
+    assert isinstance(second, np.memmap)
+    assert second.dtype == np.float32 and second.shape == (600, 10)
+    np.testing.assert_array_equal(first, second)
+
+    path = telemetry_cache.lap_path(2023, "Bahrain", "R", "HAM", 10)
+    assert path.startswith(str(cache_dir))
+    assert telemetry_cache.schema_hash() in path
+
+
+def test_laps_are_keyed_separately(cache_dir):
+    calls = []
+    a = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls, 1))
+    b = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 11, _builder(calls, 2))
+    c = telemetry_cache.cached_lap_features(2023, "Saudi Arabia", "R", "HAM", 10, _builder(calls, 3))
+
+    assert len(calls) == 3
+    assert not np.array_equal(a, b) and not np.array_equal(a, c)
+
+
+def test_repeat_access_is_fast(cache_dir):
+    telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "VER", 5, _builder([]))
+
+    t0 = time.perf_counter()
+    for _ in range(100):
+        telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "VER", 5, _builder([]))
+    per_call = (time.perf_counter() - t0) / 100
+
+    assert per_call < 0.005
+
+
+def test_schema_change_invalidates(cache_dir, monkeypatch):
+    calls = []
+    telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls))
+    monkeypatch.setattr(telemetry_cache, "FEATURE_CACHE_VERSION", telemetry_cache.FEATURE_CACHE_VERSION + 1)
+    telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls))
+
+    assert calls == [1, 1]
+
+
+def test_corrupt_file_is_rebuilt(cache_dir):
+    path = telemetry_cache.lap_path(2023, "Bahrain", "R", "HAM", 10)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"not a npy file")
+
+    calls = []
+    features = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 10, _builder(calls))
+
+    assert calls == [1]
+    assert features.shape == (600, 10)
+    assert telemetry_cache.load_lap_features(path) is not None
+
+
+def test_empty_lap_round_trip(cache_dir):
+    calls = []
+    empty = lambda: (calls.append(1), np.zeros((0, 10), dtype=np.float32))[1]  # noqa: E731
+    telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 99, empty)
+    again = telemetry_cache.cached_lap_features(2023, "Bahrain", "R", "HAM", 99, empty)
+
+    assert again.shape == (0, 10)
+    assert calls == [1]
@@ -0,0 +1,150 @@
+# tests/test_telemetry_features.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.sarah_model import load_telemetry_model, predict_pace_drop, preprocess_telemetry_sequence
+from app.telemetry_features import FEATURE_NAMES, array_to_sequence, telemetry_to_array
+
+
+def synthetic_lap(n=600, seed=0, with_optional=False):
+    """A FastF1-like telemetry DataFrame for one lap."""
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame(
+        {
+            "Distance": np.linspace(0, 5400, n),
+            "Speed": rng.uniform(80, 330, n),
+            "RPM": rng.randint(9000, 12500, n),
+            "nGear": rng.randint(1, 9, n),
+            "Throttle": rng.randint(0, 101, n),
+            "Brake": rng.rand(n) < 0.2,
+            "DRS": rng.randint(0, 15, n),
+        }
+    )
+    if with_optional:
+        df["TyreTemp"] = rng.uniform(80, 110, n)
+        df["Steer"] = rng.uniform(-1, 1, n)
+    return df
+
+
+def _iterrows_reference(telemetry, track_temp):
+    """The original dict-per-sample loop of load_real_telemetry."""
+    sequence = []
+    for _, row in telemetry.iterrows():
+        sequence.append(
+            {
+                "speed": float(row.get("Speed", 0.0)),
+                "throttle": float(row.get("Throttle", 0.0)),
+                "brake": float(row.get("Brake", 0.0)),
+                "gear": float(row.get("nGear", 0.0)),
+                "steering": float(row.get("Steer", 0.0)),
+                "tyre_temp": float(row.get("TyreTemp", 90.0)),
+                "rpm": float(row.get("RPM", 11000.0)),
+                "lat_g": float(row.get("Lat", 0.0)),
+                "long_g": float(row.get("Long", 0.0)),
+                "track_temp": track_temp,
+            }
+        )
+    return sequence
+
+
+@pytest.mark.parametrize("with_optional", [False, True])
+def test_array_matches_iterrows_path(with_optional):
+    lap = synthetic_lap(with_optional=with_optional)
+    features = telemetry_to_array(lap, track_temp=37.5)
+
+    expected = preprocess_telemetry_sequence(_iterrows_reference(lap, 37.5))
+    assert features.dtype == np.float32
+    assert features.shape == (len(lap), 10)
+    np.testing.assert_array_equal(features, expected)
+
+
+def test_missing_columns_get_defaults():
+    features = telemetry_to_array(pd.DataFrame({"Speed": [100.0, 200.0]}), track_temp=41.0)
+    row = dict(zip(FEATURE_NAMES, features[0]))
+
+    assert row["speed"] == 100.0
+    assert row["tyre_temp"] == 90.0
+    assert row["rpm"] == 11000.0
+    assert row["track_temp"] == 41.0
+    assert telemetry_to_array(pd.DataFrame(), 40.0).shape == (0, 10)
+
+
+def test_dict_sequence_compatibility():
+    lap = synthetic_lap(n=50)
+    features = telemetry_to_array(lap, 40.0)
+    sequence = array_to_sequence(features)
+
+    assert len(sequence) == 50
+    assert list(sequence[0]) == FEATURE_NAMES
+    assert isinstance(sequence[0]["speed"], float)
+    np.testing.assert_array_equal(preprocess_telemetry_sequence(sequence), features)
+
+
+@pytest.mark.parametrize("with_optional", [False, True])
+def test_float64_sequence_matches_original_dicts(with_optional):
+    # the load_real_telemetry compatibility path keeps the original float64 values
+    lap = synthetic_lap(n=50, with_optional=with_optional)
+    sequence = array_to_sequence(telemetry_to_array(lap, 37.5, dtype=np.float64))
+
+    assert sequence == _iterrows_reference(lap, 37.5)
+    # a float32 matrix is rounded (what the model and the lap cache use)
+    assert array_to_sequence(telemetry_to_array(lap, 37.5)) != sequence
+
+
+def test_model_accepts_array_or_dicts():
+    model = load_telemetry_model()
+    features = telemetry_to_array(synthetic_lap(n=80), 40.0)
+
+    assert predict_pace_drop(model, features) == predict_pace_drop(model, array_to_sequence(features))
+
+
+def test_preprocess_rejects_wrong_feature_width():
+    flat = np.arange(20, dtype=np.float32)
+    assert preprocess_telemetry_sequence(flat).shape == (2, 10)
+
+    with pytest.raises(ValueError):
+        preprocess_telemetry_sequence(np.zeros((20, 5), dtype=np.float32))
+    with pytest.raises(ValueError):
+        preprocess_telemetry_sequence(np.zeros(15, dtype=np.float32))
+    with pytest.raises(ValueError):
+        preprocess_telemetry_sequence(np.zeros((2, 5, 10), dtype=np.float32))
+
+
+
+class _Laps(pd.DataFrame):
+    """FastF1 Laps stand-in: a laps table + the lap's telemetry."""
+
+    _metadata = ["telemetry"]
+
+    @property
+    def _constructor(self):
+        return _Laps
+
+    def get_telemetry(self):
+        return self.telemetry
+
+
+class _Session:
+    def __init__(self, telemetry):
+        self.weather_data = pd.DataFrame({"TrackTemp": [37.5, 37.5]})
+        self._laps = _Laps({"LapNumber": [10]})
+        self._laps.telemetry = telemetry
+
+    @property
+    def laps(self):
+        return self
+
+    def pick_driver(self, driver):
+        return self._laps
+
+
+def test_load_real_telemetry_keeps_float64_values(monkeypatch):
+    pytest.importorskip("fastf1")
+    from app import get_real_telemetry
+
+    lap = synthetic_lap(n=40, with_optional=True)
+    monkeypatch.setattr(get_real_telemetry, "_load_session", lambda *key: _Session(lap))
+
+    assert get_real_telemetry.load_real_telemetry(lap_number=10) == _iterrows_reference(lap, 37.5)
@@ -0,0 +1,141 @@
+# tests/test_telemetry_reload.py
+
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import retriever_telemetry
+from app.main import app
+
+
+def _write(path, records):
+    # كتابة ذرية مثل ما يسويها الـ pipeline
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"44": records}, f)
+    os.replace(tmp, path)
+
+
+def _wait_for_reloads(n, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        retriever_telemetry.current_telemetry_store()
+        if retriever_telemetry._reload_stats["reloads"] >= n and not retriever_telemetry._reload_lock.locked():
+            return
+        time.sleep(0.01)
+    raise AssertionError("telemetry store was not reloaded")
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    path = tmp_path / "telemetry_embeddings.json"
+    _write(path, [{"lap": 30, "meta": {"summary": "v1"}, "score": 0.9}])
+    monkeypatch.setenv("TELEMETRY_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setenv("TELEMETRY_RELOAD_INTERVAL", "0")
+
+    original = retriever_telemetry.TELEMETRY_EMB_FILE
+    retriever_telemetry.TELEMETRY_EMB_FILE = str(path)
+    assert retriever_telemetry.reload_telemetry_store()
+    yield path
+    retriever_telemetry.TELEMETRY_EMB_FILE = original
+    monkeypatch.delenv("TELEMETRY_STORE_DIR")
+    retriever_telemetry.reload_telemetry_store()
+
+
+def _summary():
+    return retriever_telemetry.telemetry_retriever(44, 30)[0]["meta"]["summary"]
+
+
+def test_changed_file_is_reloaded_in_background(source):
+    before = retriever_telemetry._reload_stats["reloads"]
+    count = retriever_telemetry.reload_latency.count
+    assert _summary() == "v1"
+
+    _write(source, [{"lap": 30, "meta": {"summary": "v2 with a longer text"}, "score": 0.9}])
+    _wait_for_reloads(before + 1)
+
+    assert _summary() == "v2 with a longer text"
+    assert retriever_telemetry.reload_latency.count == count + 1
+    assert retriever_telemetry.telemetry_stats()["reload"]["duration"]["count"] >= 1
+
+
+def test_broken_file_keeps_old_store(source):
+    failures = retriever_telemetry._reload_stats["failures"]
+    with open(source, "w", encoding="utf-8") as f:
+        f.write('{"44": [{"lap": 30')  # نص ملف
+
+    retriever_telemetry.current_telemetry_store()
+    deadline = time.monotonic() + 5
+    while retriever_telemetry._reload_stats["failures"] == failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert retriever_telemetry._reload_stats["failures"] == failures + 1
+    assert _summary() == "v1"
+
+
+def test_readers_see_old_or_new_store(source):
+    seen, errors = set(), []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                seen.add(_summary())
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    before = retriever_telemetry._reload_stats["reloads"]
+    for i in range(2, 6):
+        _write(source, [{"lap": 30, "meta": {"summary": f"v{i}" + "x" * i}, "score": 0.9}])
+        _wait_for_reloads(before + i - 1)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert seen <= {"v1"} | {f"v{i}" + "x" * i for i in range(2, 6)}
+    assert _summary() == "v5xxxxx"
+
+
+def test_hot_reload_can_be_disabled(source, monkeypatch):
+    monkeypatch.setenv("TELEMETRY_HOT_RELOAD", "0")
+    _write(source, [{"lap": 30, "meta": {"summary": "v2 ignored"}, "score": 0.9}])
+    time.sleep(0.05)
+
+    assert _summary() == "v1"
+    assert not retriever_telemetry._reload_lock.locked()
+
+
+def test_telemetry_stats_endpoint(source):
+    with TestClient(app) as client:
+        body = client.get("/api/telemetry/stats").json()
+
+    assert body["store"]["records"] == 1
+    assert body["reload"]["reloads"] >= 1
+
+
+def test_malformed_records_do_not_kill_reload(source):
+    failures = retriever_telemetry._reload_stats["failures"]
+    reloads = retriever_telemetry._reload_stats["reloads"]
+    _write(source, [{"lap": 30, "meta": {"summary": "bad"}, "score": {"x": 1}}])  # TypeError
+
+    assert retriever_telemetry.reload_telemetry_store() is False
+    assert retriever_telemetry._reload_stats["failures"] == failures + 1
+    assert _summary() == "v1"
+
+    # the broken file is not rebuilt again on every check
+    retriever_telemetry.current_telemetry_store()
+    time.sleep(0.05)
+    assert retriever_telemetry._reload_stats["failures"] == failures + 1
+
+    # a fixed file is picked up again
+    _write(source, [{"lap": 30, "meta": {"summary": "v3"}, "score": 0.9}])
+    _wait_for_reloads(reloads + 1)
+    assert _summary() == "v3"
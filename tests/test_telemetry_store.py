@@ -0,0 +1,205 @@
+# tests/test_telemetry_store.py
+
+import json
+import random
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import retriever_telemetry
+from app.agents.telemetry_store import TelemetryStore, load_or_build
+from app.benchmark_telemetry import run_benchmark
+from app.main import app
+
+
+def _synthetic_index(n_drivers=20, laps=60, seed=0):
+    rng = random.Random(seed)
+    index = {}
+    for d in range(1, n_drivers + 1):
+        records = [
+            {
+                "lap": lap,
+                "session": rng.choice(["FP1", "Q", "R"]),
+                "meta": {"summary": f"driver {d} lap {lap}"},
+                # few distinct values → many score ties
+                "score": rng.choice([0.1, 0.5, 0.9]),
+            }
+            for lap in rng.sample(range(1, laps + 1), laps // 2)
+        ]
+        records.append({"meta": {"summary": "race summary"}, "score": 0.7})
+        index[str(d)] = records
+    return index
+
+
+def _reference(index, driver_id, lap=None, top_k=1):
+    """The original list-scan telemetry_retriever."""
+    hits = index.get(str(driver_id), [])
+    if not hits:
+        return []
+    if lap is not None:
+        lap_hits = [h for h in hits if h.get("lap") == lap]
+        hits = lap_hits or hits
+    return sorted(hits, key=lambda x: x.get("score", 1.0), reverse=True)[:top_k]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    index = _synthetic_index()
+    source = tmp_path / "telemetry_embeddings.json"
+    source.write_text(json.dumps(index))
+    monkeypatch.setenv("TELEMETRY_STORE_DIR", str(tmp_path / "store"))
+
+    original = retriever_telemetry.TELEMETRY_EMB_FILE
+    retriever_telemetry.TELEMETRY_EMB_FILE = str(source)
+    assert retriever_telemetry.reload_telemetry_store()
+    yield index
+    retriever_telemetry.TELEMETRY_EMB_FILE = original
+    monkeypatch.delenv("TELEMETRY_STORE_DIR")
+    retriever_telemetry.reload_telemetry_store()
+
+
+def test_retriever_matches_list_scan(store):
+    rng = random.Random(1)
+    for _ in range(300):
+        driver = rng.choice([1, 5, "12", 20, 99])
+        lap = rng.choice([None, rng.randint(0, 61)])
+        top_k = rng.choice([1, 2, 5, 100])
+        assert retriever_telemetry.telemetry_retriever(driver, lap, top_k) == _reference(
+            store, driver, lap, top_k
+        )
+
+
+def test_lap_range_lookup():
+    store = TelemetryStore.from_records(_synthetic_index())
+    start, end = store.lap_rows("7", 25, 35)
+    laps = store.lap[start:end]
+
+    expected = sorted(r["lap"] for r in _synthetic_index()["7"] if 25 <= r.get("lap", -1) <= 35)
+    assert laps.tolist() == expected
+    assert store.lap_rows("7", 40, 30)[0] == store.lap_rows("7", 40, 30)[1]
+    assert store.lap_rows("999", 1, 60) == (0, 0)
+
+
+def test_top_k_over_rows():
+    store = TelemetryStore.from_records(_synthetic_index())
+    rows = np.arange(len(store))
+    best = store.top_k(rows, 10)
+
+    assert len(best) == 10
+    assert np.all(np.diff(store.score[best]) <= 0)
+    assert store.score[best[0]] == store.score.max()
+
+
+def test_store_is_loaded_from_binary_files(tmp_path):
+    source = tmp_path / "telemetry.json"
+    source.write_text(json.dumps(_synthetic_index()))
+    calls = []
+
+    def read_source():
+        calls.append(1)
+        return json.loads(source.read_text())
+
+    built = load_or_build(str(source), str(tmp_path / "store"), read_source)
+    loaded = load_or_build(str(source), str(tmp_path / "store"), read_source)
+
+    assert len(calls) == 1
+    assert isinstance(loaded.lap, np.memmap)
+    np.testing.assert_array_equal(built.lap, loaded.lap)
+    assert loaded.records(np.arange(5)) == built.records(np.arange(5))
+
+
+def test_rebuild_swaps_all_columns_at_once(tmp_path):
+    folder = tmp_path / "store"
+    first = TelemetryStore.from_records({"44": [{"lap": 1, "score": 0.1}]})
+    second = TelemetryStore.from_records({"1": [{"lap": 2, "score": 0.2}, {"lap": 3, "score": 0.3}]})
+
+    first.save(str(folder), "a")
+    old = TelemetryStore.load(str(folder))
+    second.save(str(folder), "b")
+    new = TelemetryStore.load(str(folder))
+
+    # one data folder per build, named by meta.json; the old one is removed
+    versions = [p.name for p in folder.iterdir() if p.is_dir()]
+    assert versions == [json.loads((folder / "meta.json").read_text())["data"]]
+    assert not list(folder.glob("*.npy"))
+    assert (new.meta["fingerprint"], new.lap.tolist()) == ("b", [2, 3])
+    assert old.lap.tolist() == [1]  # already-mapped columns stay readable
+
+
+def test_empty_store():
+    store = TelemetryStore.from_records({})
+    assert len(store) == 0
+    assert store.driver_rows(44) == (0, 0)
+    assert store.top_k(np.arange(0), 3).tolist() == []
+
+
+def _brute_force(index, drivers, lap_min, lap_max, sessions=None):
+    return sorted(
+        (d, r["lap"], r["session"])
+        for d, records in index.items()
+        if drivers is None or d in {str(x) for x in drivers}
+        for r in records
+        if "lap" in r
+        and (lap_min is None or r["lap"] >= lap_min)
+        and (lap_max is None or r["lap"] <= lap_max)
+        and (sessions is None or r["session"] in sessions)
+    )
+
+
+def test_select_matches_brute_force():
+    index = _synthetic_index()
+    store = TelemetryStore.from_records(index)
+    rng = random.Random(2)
+
+    for _ in range(200):
+        drivers = rng.choice([None, [44], ["3", 7], [1, 2, 3, 20, 99]])
+        lap_min = rng.choice([None, rng.randint(1, 60)])
+        lap_max = rng.choice([None, rng.randint(1, 60)])
+        if lap_min is None and lap_max is None:
+            continue
+        sessions = rng.choice([None, ["R"], ["FP1", "Q"]])
+
+        rows = store.select(drivers, lap_min, lap_max, sessions)
+        found = sorted(
+            (store.drivers[store.driver[r]], int(store.lap[r]), store.sessions[store.session[r]])
+            for r in rows
+        )
+        assert found == _brute_force(index, drivers, lap_min, lap_max, sessions)
+
+
+def test_multi_driver_lap_window(store):
+    results = retriever_telemetry.telemetry_retriever([5, "12"], [25, 35], top_k=4)
+
+    assert len(results) == 4
+    assert {r["driver_id"] for r in results} <= {"5", "12"}
+    assert all(25 <= r["lap"] <= 35 for r in results)
+    scores = [r["score"] for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+    # no fallback to other laps for a window
+    assert retriever_telemetry.telemetry_query([5], 100, 120) == []
+
+
+def test_top_laps_across_the_field(store):
+    results = retriever_telemetry.telemetry_query(top_k=5)
+    best = max(r["score"] for records in store.values() for r in records)
+
+    assert len(results) == 5
+    assert all(r["score"] == best for r in results)
+
+
+def test_telemetry_query_endpoint(store):
+    with TestClient(app) as client:
+        res = client.post(
+            "/api/telemetry/query",
+            json={"drivers": [5, 12], "lap_min": 25, "lap_max": 35, "top_k": 3},
+        )
+
+    assert res.status_code == 200
+    assert res.json()["count"] == 3
+
+
+def test_benchmark_runs():
+    rows = run_benchmark([1, 3], n_queries=5)
+    assert [r["records"] for r in rows] == [1200, 3600]
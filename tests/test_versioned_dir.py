@@ -0,0 +1,49 @@
+# tests/test_versioned_dir.py
+
+import os
+
+import numpy as np
+import pytest
+
+from app.agents import versioned_dir
+
+
+def _load(meta, path):
+    return meta["n"], np.load(os.path.join(path, "x.npy")).tolist()
+
+
+def test_meta_names_one_complete_build(tmp_path):
+    folder = str(tmp_path)
+    v1 = versioned_dir.write_arrays(folder, {"x": np.arange(3)})
+    versioned_dir.commit_meta(folder, {"n": 3}, v1)
+
+    # a build that was written but never committed is not visible
+    versioned_dir.write_arrays(folder, {"x": np.arange(5)})
+    assert versioned_dir.load_versioned(folder, _load) == (3, [0, 1, 2])
+
+
+def test_load_retries_when_build_is_replaced(tmp_path):
+    folder = str(tmp_path)
+    v1 = versioned_dir.write_arrays(folder, {"x": np.arange(3)})
+    versioned_dir.commit_meta(folder, {"n": 3}, v1)
+    calls = []
+
+    def racing_load(meta, path):
+        if not calls:
+            # another worker commits a new build after meta.json was read
+            v2 = versioned_dir.write_arrays(folder, {"x": np.arange(2)})
+            versioned_dir.commit_meta(folder, {"n": 2}, v2)
+        calls.append(path)
+        return _load(meta, path)
+
+    assert versioned_dir.load_versioned(folder, racing_load) == (2, [0, 1])
+    assert len(calls) == 2
+
+
+def test_legacy_layout_is_still_read(tmp_path):
+    np.save(tmp_path / "x.npy", np.arange(4))
+    (tmp_path / "meta.json").write_text('{"n": 4}')
+
+    assert versioned_dir.load_versioned(str(tmp_path), _load) == (4, [0, 1, 2, 3])
+    with pytest.raises(FileNotFoundError):
+        versioned_dir.load_versioned(str(tmp_path / "missing"), _load)